@@ -0,0 +1,16 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Benchmarks for the 'runmd' CLI Tool
+
+Local, offline benchmarks run from the root of the repository, e.g.:
+
+    python -m benchmarks.bench_parser --output results.json --baseline baseline.json
+"""
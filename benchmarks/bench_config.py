@@ -0,0 +1,186 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Configuration Startup Benchmark
+
+This script measures the time runmd takes to load its configuration, with the configuration file
+parsed and validated on every run and with the compiled snapshot of a previous run. The
+configuration holds the default language sections and many synthetic ones. `startup` cases time a
+whole `runmd list` command in a new process, the others time `ConfigLoader` in this process. Run it
+from the root of the repository:
+
+    python -m benchmarks.bench_config --output results.json
+
+Functions:
+    - write_config: Write a configuration file with many language sections.
+    - load_config: Load the configuration as a runmd command does.
+    - bench_load: Benchmark the loading of the configuration.
+    - bench_startup: Benchmark a whole runmd command.
+    - run_benchmarks: Run all the benchmark cases.
+    - main: Entry point of the benchmark script.
+
+Constants:
+    - LANGUAGE_SECTIONS: Number of synthetic language sections at scale 1.
+"""
+
+import importlib.resources
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from runmd.config import CONFIG_DIR_NAME, CONFIG_FILE_NAME, ConfigLoader
+
+from .common import create_parser, measure_time, report_results
+
+LANGUAGE_SECTIONS = 50
+
+
+def write_config(home: Path, sections: int) -> Path:
+    """
+    Write a configuration file with many language sections.
+
+    Args:
+        home (Path): The home directory of the configuration.
+        sections (int): Number of synthetic language sections added to the default ones.
+
+    Returns:
+        Path: Path to the configuration file.
+    """
+    path = home / ".config" / CONFIG_DIR_NAME / CONFIG_FILE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    text = (importlib.resources.files("runmd") / CONFIG_FILE_NAME).read_text()
+    for i in range(sections):
+        text += (
+            f"\n[lang.synthetic{i}]\n"
+            f"aliases = syn{i}, synthetic{i}\n"
+            f"command = interpreter{i}\n"
+            "options = -c\n"
+            "timeout = 5m\n"
+        )
+    path.write_text(text)
+    return path
+
+
+def load_config(path: Path) -> ConfigLoader:
+    """
+    Load the configuration as a runmd command does.
+
+    Args:
+        path (Path): Path to the configuration file.
+
+    Returns:
+        ConfigLoader: The loaded configuration.
+    """
+    config = ConfigLoader()
+    config.default_config_path = path
+    config.get_histsize()
+    config.get_all_aliases()
+    config.find_language("python")
+    return config
+
+
+def bench_load(path: Path, snapshot: bool, repeat: int) -> dict:
+    """
+    Benchmark the loading of the configuration.
+
+    Args:
+        path (Path): Path to the configuration file.
+        snapshot (bool): Whether the snapshot of a previous run is available.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The metrics of the case.
+    """
+    snapshot_path = load_config(path).snapshot_path
+
+    def run():
+        if not snapshot:
+            snapshot_path.unlink(missing_ok=True)
+        return load_config(path)
+
+    # Many runs per timing, the load takes about a millisecond
+    runs = 20
+    seconds, _ = measure_time(lambda: [run() for _ in range(runs)], repeat)
+    return {"seconds": round(seconds / runs, 6), "ms": round(seconds / runs * 1e3, 3)}
+
+
+def bench_startup(home: Path, snapshot: bool, repeat: int) -> dict:
+    """
+    Benchmark a whole runmd command.
+
+    Args:
+        home (Path): The home directory of the configuration.
+        snapshot (bool): Whether the snapshot of a previous run is available.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The metrics of the case.
+    """
+    env = dict(os.environ, HOME=str(home), XDG_CACHE_HOME=str(home / ".cache"))
+    command = [sys.executable, "-m", "runmd.cli", "list", "--no-cache"]
+    snapshots = home / ".cache" / "runmd" / "config"
+
+    def run():
+        if not snapshot:
+            shutil.rmtree(snapshots, ignore_errors=True)
+        subprocess.run(
+            command, env=env, cwd=home, stdout=subprocess.DEVNULL, check=True
+        )
+
+    run()
+    seconds, _ = measure_time(run, repeat)
+    return {"seconds": round(seconds, 6), "ms": round(seconds * 1e3, 3)}
+
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 3) -> dict:
+    """
+    Run all the benchmark cases.
+
+    Args:
+        scale (float): Scale factor of the number of language sections.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Metrics by benchmark case.
+    """
+    sections = max(1, int(LANGUAGE_SECTIONS * scale))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        home = Path(tmpdir)
+        os.environ["XDG_CACHE_HOME"] = str(home / ".cache")
+        path = write_config(home, sections)
+        for name, snapshot in (("parse", False), ("snapshot", True)):
+            results[f"load_{name}"] = bench_load(path, snapshot, repeat)
+        for name, snapshot in (("parse", False), ("snapshot", True)):
+            results[f"startup_{name}"] = bench_startup(home, snapshot, repeat)
+    return results
+
+
+def main(command_line: Optional[list] = None) -> int:
+    """
+    Entry point of the benchmark script.
+
+    Args:
+        command_line (list): The command-line arguments. If None, it uses sys.argv.
+
+    Returns:
+        int: The exit status, 1 if regressions were found.
+    """
+    parser = create_parser("Benchmark the loading of the configuration.")
+    args = parser.parse_args(command_line)
+    return report_results(args, "config", run_benchmarks(args.scale, args.repeat))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
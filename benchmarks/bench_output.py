@@ -0,0 +1,170 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Output Streaming Benchmark
+
+This script measures how fast the output of a code block is relayed to the terminal, in lines and
+megabytes per second, comparing the chunked streaming of `run_code_block` with the previous
+line-by-line loop. The output is written to the null device. `cpu_seconds` is the CPU time spent
+relaying the output, which excludes the time of the child process. Run it from the root of the
+repository:
+
+    python -m benchmarks.bench_output --output results.json
+
+Functions:
+    - readline_relay: Relay the output of a process line by line, as runmd used to.
+    - chunked_relay: Relay the output of a process with `OutputRelay`.
+    - bench_relay: Benchmark a relay function on a code block printing many lines.
+    - run_benchmarks: Run all the benchmark cases.
+    - main: Entry point of the benchmark script.
+
+Constants:
+    - LINE_WIDTHS: Width of the printed lines, by output shape.
+    - BLOCK: Template of the code block printing the lines.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Optional, TextIO
+
+from runmd.runner import CHUNK_SIZE, OutputRelay
+
+from .common import create_parser, measure_time, report_results
+
+LINE_WIDTHS = {"short_lines": 20, "long_lines": 400}
+BLOCK = "import sys\nline = 'x' * {width} + '\\n'\nfor _ in range({lines}):\n    sys.stdout.write(line)\n"
+
+
+def readline_relay(process: subprocess.Popen, out: TextIO) -> str:
+    """
+    Relay the output of a process line by line, as runmd used to.
+
+    Args:
+        process (subprocess.Popen): The process.
+        out (TextIO): Stream receiving the output.
+
+    Returns:
+        str: The last line of output.
+    """
+    last = ""
+    while True:
+        output = process.stdout.readline().rstrip().decode("utf-8")
+        if output == "" and process.poll() is not None:
+            break
+        if output:
+            print(output.strip(), file=out)
+        last = output
+    return last
+
+
+def chunked_relay(process: subprocess.Popen, out: TextIO) -> str:
+    """
+    Relay the output of a process with `OutputRelay`, as `run_code_block` does.
+
+    Args:
+        process (subprocess.Popen): The process.
+        out (TextIO): Stream receiving the output.
+
+    Returns:
+        str: The last line of output.
+    """
+    relay = OutputRelay(out)
+    fd = process.stdout.fileno()
+    while True:
+        data = os.read(fd, CHUNK_SIZE)
+        if not data:
+            break
+        relay.feed(data)
+    process.wait()
+    return relay.close()
+
+
+def bench_relay(relay: Callable, width: int, lines: int, repeat: int = 3) -> dict:
+    """
+    Benchmark a relay function on a code block printing many lines.
+
+    Args:
+        relay (Callable): The relay function.
+        width (int): Number of characters of each line.
+        lines (int): Number of lines printed by the block.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The metrics of the case.
+    """
+    code = BLOCK.format(width=width, lines=lines)
+
+    with open(os.devnull, "w") as out:
+
+        def run():
+            process = subprocess.Popen(
+                [sys.executable, "-c", code],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            # CPU time spent in runmd itself, the child and the pipe excluded
+            start = time.process_time()
+            relay(process, out)
+            cpu = time.process_time() - start
+            process.stdout.close()
+            process.wait()
+            return cpu
+
+        seconds, cpu = measure_time(run, repeat)
+
+    size = lines * (width + 1)
+    return {
+        "lines": lines,
+        "bytes": size,
+        "seconds": round(seconds, 6),
+        "cpu_seconds": round(cpu, 6),
+        "lines_per_s": round(lines / seconds, 1) if seconds else 0.0,
+        "mb_per_s": round(size / 1e6 / seconds, 3) if seconds else 0.0,
+    }
+
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 3) -> dict:
+    """
+    Run all the benchmark cases.
+
+    Args:
+        scale (float): Scale factor of the number of lines.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Metrics by benchmark case.
+    """
+    lines = max(1, int(1_000_000 * scale))
+    results = {}
+    for shape, width in LINE_WIDTHS.items():
+        for name, relay in (("readline", readline_relay), ("chunked", chunked_relay)):
+            results[f"{shape}_{name}"] = bench_relay(relay, width, lines, repeat)
+    return results
+
+
+def main(command_line: Optional[list] = None) -> int:
+    """
+    Entry point of the benchmark script.
+
+    Args:
+        command_line (list): The command-line arguments. If None, it uses sys.argv.
+
+    Returns:
+        int: The exit status, 1 if regressions were found.
+    """
+    parser = create_parser("Benchmark the streaming of the output of code blocks.")
+    args = parser.parse_args(command_line)
+    return report_results(args, "output", run_benchmarks(args.scale, args.repeat))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Parser and Discovery Benchmark
+
+This script measures the throughput and peak memory of `parse_markdown` and
+`process_markdown_files` on synthetic corpora, and how the processing time scales with the number
+of files. Run it from the root of the repository:
+
+    python -m benchmarks.bench_parser --output results.json
+    python -m benchmarks.bench_parser --baseline results.json
+
+The exit status is 1 when a case is slower or uses more memory than the baseline by more than the
+threshold.
+
+Functions:
+    - bench_parse: Benchmark `parse_markdown` on a list of files.
+    - bench_process: Benchmark `process_markdown_files` on a directory.
+    - run_benchmarks: Generate the corpora and run all the benchmark cases.
+    - main: Entry point of the benchmark script.
+
+Classes:
+    - BenchConfig: Minimal configuration providing the language aliases.
+"""
+
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+from runmd.parser import parse_markdown
+from runmd.process import process_markdown_files
+
+from . import corpus
+from .common import create_parser, measure_peak_memory, measure_time, report_results
+
+
+class BenchConfig:
+    """
+    Minimal configuration providing the language aliases.
+
+    It keeps the benchmark independent from the configuration file of the user.
+
+    Attributes:
+        aliases (list): The configured language aliases.
+    """
+
+    def __init__(self, aliases: List[str]):
+        self.aliases = aliases
+
+    def get_all_aliases(self) -> List[str]:
+        return self.aliases
+
+
+def _metrics(files: int, size: int, blocks: int, seconds: float, peak: float) -> dict:
+    return {
+        "files": files,
+        "bytes": size,
+        "blocks": blocks,
+        "seconds": round(seconds, 6),
+        "mb_per_s": round(size / 1e6 / seconds, 3) if seconds else 0.0,
+        "blocks_per_s": round(blocks / seconds, 1) if seconds else 0.0,
+        "peak_kb": round(peak, 1),
+    }
+
+
+def bench_parse(paths: List[str], languages: List[str], repeat: int = 3) -> dict:
+    """
+    Benchmark `parse_markdown` on a list of files.
+
+    Args:
+        paths (List[str]): Paths to the Markdown files.
+        languages (List[str]): The configured language aliases.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The metrics of the case.
+    """
+
+    def parse():
+        return sum(len(parse_markdown(path, languages)) for path in paths)
+
+    seconds, blocks = measure_time(parse, repeat)
+    size = sum(os.path.getsize(path) for path in paths)
+    return _metrics(len(paths), size, blocks, seconds, measure_peak_memory(parse))
+
+
+def bench_process(
+    root: str, languages: List[str], repeat: int = 3, jobs: int = 1
+) -> dict:
+    """
+    Benchmark `process_markdown_files` on a directory, without block index.
+
+    Args:
+        root (str): Directory of the corpus.
+        languages (List[str]): The configured language aliases.
+        repeat (int): Number of timed runs.
+        jobs (int): Number of parsing processes.
+
+    Returns:
+        dict: The metrics of the case.
+    """
+    config = BenchConfig(languages)
+
+    def process():
+        return process_markdown_files(root, config, jobs=jobs)
+
+    seconds, registry = measure_time(process, repeat)
+    files = {str(block.file) for block in registry}
+    size = sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+    return _metrics(
+        len(files), size, len(registry), seconds, measure_peak_memory(process)
+    )
+
+
+def run_benchmarks(root: str, scale: float = 1.0, repeat: int = 3) -> dict:
+    """
+    Generate the corpora and run all the benchmark cases.
+
+    Args:
+        root (str): Directory where the corpora are written.
+        scale (float): Scale factor of the corpora.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Metrics by benchmark case.
+    """
+    languages = list(corpus.LANGUAGES)
+    results = {}
+
+    small = os.path.join(root, "small")
+    paths = corpus.write_small_files(small, int(1000 * scale))
+    results["parse_small_files"] = bench_parse(paths, languages, repeat)
+    results["process_small_files"] = bench_process(small, languages, repeat)
+
+    paths = corpus.write_huge_files(os.path.join(root, "huge"), 2, int(8e6 * scale))
+    results["parse_huge_files"] = bench_parse(paths, languages, repeat)
+
+    paths = corpus.write_unterminated(
+        os.path.join(root, "unterminated"), int(2000 * scale)
+    )
+    results["parse_unterminated"] = bench_parse(paths, languages, repeat)
+
+    paths, aliases = corpus.write_many_aliases(
+        os.path.join(root, "aliases"), 500, int(5000 * scale)
+    )
+    results["parse_many_aliases"] = bench_parse(paths, aliases, repeat)
+
+    # File-count scaling: the time per file should stay constant
+    for files in (int(250 * scale), int(500 * scale), int(1000 * scale)):
+        directory = os.path.join(root, f"scaling{files}")
+        corpus.write_small_files(directory, files, seed=files)
+        results[f"process_{files}_files"] = bench_process(directory, languages, repeat)
+
+    return results
+
+
+def main(command_line: Optional[list] = None) -> int:
+    """
+    Entry point of the benchmark script.
+
+    Args:
+        command_line (list): The command-line arguments. If None, it uses sys.argv.
+
+    Returns:
+        int: The exit status, 1 if regressions were found.
+    """
+    parser = create_parser("Benchmark the Markdown parser and file discovery.")
+    args = parser.parse_args(command_line)
+
+    with tempfile.TemporaryDirectory(prefix="runmd-bench-") as root:
+        results = run_benchmarks(root, args.scale, args.repeat)
+
+    return report_results(args, "parser", results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
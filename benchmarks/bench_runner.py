@@ -0,0 +1,166 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Block Execution Benchmark
+
+This script measures how many small code blocks per second `run_code_block` executes, spawning a
+fresh interpreter per block or dispatching the blocks to warm workers. Run it from the root of the
+repository:
+
+    python -m benchmarks.bench_runner --output results.json
+
+Functions:
+    - bench_blocks: Benchmark the execution of a series of code blocks.
+    - run_benchmarks: Run all the benchmark cases.
+    - main: Entry point of the benchmark script.
+
+Classes:
+    - BenchConfig: Configuration of the languages used by the benchmark.
+
+Constants:
+    - LANGUAGES: Command, options and code template of the benchmarked languages.
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+from configparser import ConfigParser
+from typing import List, Optional
+
+from runmd.block import Block
+from runmd.runner import run_code_block
+from runmd.workers import WorkerPool
+
+from .common import create_parser, measure_time, report_results
+
+LANGUAGES = {
+    "python": {"command": sys.executable, "options": "-c", "code": "x = {i} * 2"},
+    "javascript": {"command": "node", "options": "-e", "code": "const x = {i} * 2;"},
+}
+
+
+class BenchConfig:
+    """
+    Configuration of the languages used by the benchmark.
+
+    It keeps the benchmark independent from the configuration file of the user.
+
+    Attributes:
+        config (ConfigParser): The language sections.
+    """
+
+    def __init__(self):
+        self.config = ConfigParser()
+        for lang, settings in LANGUAGES.items():
+            self.config[f"lang.{lang}"] = {
+                "aliases": lang,
+                "command": settings["command"],
+                "options": settings["options"],
+            }
+
+    def find_language(self, alias: str) -> Optional[str]:
+        return alias if f"lang.{alias}" in self.config else None
+
+    def get_language_options(self, language: str) -> List[str]:
+        return self.config[f"lang.{language}"].get("options", "").split()
+
+
+def bench_blocks(
+    config: BenchConfig, lang: str, blocks: int, workers: bool, repeat: int = 3
+) -> dict:
+    """
+    Benchmark the execution of a series of code blocks.
+
+    Args:
+        config (BenchConfig): The configuration.
+        lang (str): Language of the blocks.
+        blocks (int): Number of blocks.
+        workers (bool): Run the blocks in warm workers.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The metrics of the case.
+    """
+    code = LANGUAGES[lang]["code"]
+    blocklist = [
+        Block(name=f"b{i}", lang=lang, code=code.format(i=i)) for i in range(blocks)
+    ]
+
+    def run():
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            pool = stack.enter_context(WorkerPool(config)) if workers else None
+            return sum(
+                bool(run_code_block(block, config, {}, pool)) for block in blocklist
+            )
+
+    seconds, succeeded = measure_time(run, repeat)
+    return {
+        "blocks": blocks,
+        "succeeded": succeeded,
+        "seconds": round(seconds, 6),
+        "blocks_per_s": round(blocks / seconds, 1) if seconds else 0.0,
+    }
+
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 3) -> dict:
+    """
+    Run all the benchmark cases.
+
+    Args:
+        scale (float): Scale factor of the number of blocks.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Metrics by benchmark case.
+    """
+    config = BenchConfig()
+    blocks = max(1, int(200 * scale))
+    results = {}
+    for lang, settings in LANGUAGES.items():
+        if shutil.which(settings["command"]) is None:
+            print(f"Skipping {lang}: '{settings['command']}' not found")
+            continue
+        for workers in (False, True):
+            case = f"{lang}_{'workers' if workers else 'spawn'}"
+            results[case] = bench_blocks(config, lang, blocks, workers, repeat)
+    return results
+
+
+def main(command_line: Optional[list] = None) -> int:
+    """
+    Entry point of the benchmark script.
+
+    Args:
+        command_line (list): The command-line arguments. If None, it uses sys.argv.
+
+    Returns:
+        int: The exit status, 1 if regressions were found.
+    """
+    parser = create_parser("Benchmark the execution of code blocks.")
+    args = parser.parse_args(command_line)
+
+    # The runner writes the session file in the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="runmd-bench-") as root:
+        os.chdir(root)
+        try:
+            results = run_benchmarks(args.scale, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    return report_results(args, "runner", results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
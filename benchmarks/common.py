@@ -0,0 +1,228 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Benchmark Helpers
+
+This module provides the helpers shared by the benchmark scripts: timing, peak memory measurement,
+JSON results and comparison against a stored baseline.
+
+Functions:
+    - create_parser: Create the argument parser shared by the benchmark scripts.
+    - measure_time: Return the best wall-clock time of several calls to a function.
+    - measure_peak_memory: Return the peak Python memory allocated by a call to a function.
+    - write_results: Write benchmark results to a JSON file.
+    - load_results: Load benchmark results from a JSON file.
+    - compare_results: Compare benchmark results against a baseline.
+    - print_results: Print benchmark results as a table.
+    - report_results: Print, write and compare benchmark results as requested on the command line.
+
+Constants:
+    - COMPARED_METRICS: Metrics compared against the baseline, lower is better.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+COMPARED_METRICS = ("seconds", "cpu_seconds", "peak_kb")
+
+
+def create_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Create the argument parser shared by the benchmark scripts.
+
+    Args:
+        description (str): Description of the benchmark script.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-o", "--output", help="Write the results to this JSON file", default=None
+    )
+    parser.add_argument(
+        "-b", "--baseline", help="Compare the results to this JSON file", default=None
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown reported as a regression (default: 0.2)",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Scale factor of the synthetic corpora (default: 1.0)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Number of timed runs (default: 3)"
+    )
+    return parser
+
+
+def measure_time(func: Callable, repeat: int = 3) -> tuple:
+    """
+    Return the best wall-clock time of several calls to a function.
+
+    Args:
+        func (Callable): The function to call, without arguments.
+        repeat (int): Number of calls.
+
+    Returns:
+        tuple: The best time in seconds and the result of the last call.
+    """
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure_peak_memory(func: Callable) -> float:
+    """
+    Return the peak Python memory allocated by a call to a function.
+
+    Memory-mapped files are not accounted for, only Python allocations are.
+
+    Args:
+        func (Callable): The function to call, without arguments.
+
+    Returns:
+        float: The peak memory in kilobytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def write_results(path: str, name: str, results: dict) -> None:
+    """
+    Write benchmark results to a JSON file.
+
+    Args:
+        path (str): Path to the JSON file.
+        name (str): Name of the benchmark script.
+        results (dict): Metrics by benchmark case.
+    """
+    data = {
+        "benchmark": name,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as fresults:
+        json.dump(data, fresults, indent=2, sort_keys=True)
+    print(f"Results written to {path}")
+
+
+def load_results(path: str) -> dict:
+    """
+    Load benchmark results from a JSON file.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        dict: Metrics by benchmark case.
+    """
+    with open(path, "r") as fresults:
+        return json.load(fresults).get("results", {})
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+        results (dict): Metrics by benchmark case.
+        baseline (dict): Baseline metrics by benchmark case.
+        threshold (float): Relative increase of a metric reported as a regression.
+
+    Returns:
+        list: Regressions as (case, metric, baseline value, current value) tuples.
+    """
+    regressions = []
+    for case, metrics in results.items():
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = reference.get(metric), metrics.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append((case, metric, old, new))
+    return regressions
+
+
+def print_results(results: dict, baseline: Optional[dict] = None) -> None:
+    """
+    Print benchmark results as a table, one row per case and one column per metric.
+
+    Args:
+        results (dict): Metrics by benchmark case.
+        baseline (dict): Optional baseline metrics, printed as a relative change of the time.
+    """
+    metrics = list(
+        dict.fromkeys(metric for case in results.values() for metric in case)
+    )
+    header = f"{'CASE':<24}" + "".join(f"{metric.upper():>14}" for metric in metrics)
+    print(f"{header}{'CHANGE':>10}")
+    print("-" * (len(header) + 10))
+
+    for case, values in results.items():
+        row = f"{case:<24}"
+        for metric in metrics:
+            value = values.get(metric, "")
+            row += f"{value:>14.4g}" if isinstance(value, float) else f"{value:>14}"
+        change = ""
+        reference = (baseline or {}).get(case)
+        if reference and reference.get("seconds"):
+            change = f"{values['seconds'] / reference['seconds'] - 1:+.0%}"
+        print(f"{row}{change:>10}")
+
+
+def report_results(args: argparse.Namespace, name: str, results: dict) -> int:
+    """
+    Print, write and compare benchmark results as requested on the command line.
+
+    Args:
+        args (argparse.Namespace): The arguments parsed by the parser of `create_parser`.
+        name (str): Name of the benchmark script.
+        results (dict): Metrics by benchmark case.
+
+    Returns:
+        int: The exit status, 1 if regressions were found.
+    """
+    baseline = load_results(args.baseline) if args.baseline else None
+    print_results(results, baseline)
+    if args.output:
+        write_results(args.output, name, results)
+
+    if baseline is not None:
+        regressions = compare_results(results, baseline, args.threshold)
+        for case, metric, old, new in regressions:
+            print(f"Regression: {case} {metric} {old} -> {new}")
+        if regressions:
+            return 1
+        print("No regression.")
+    return 0
@@ -0,0 +1,184 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Synthetic Markdown Corpora
+
+This module generates deterministic Markdown corpora for the benchmarks. The same seed and scale
+always produce the same files, so results can be compared across runs and machines.
+
+Functions:
+    - make_prose: Generate a paragraph of prose.
+    - make_block: Generate a code block.
+    - write_small_files: Write many small Markdown files in nested directories.
+    - write_huge_files: Write a few huge Markdown files.
+    - write_unterminated: Write a file full of unterminated block headers.
+    - write_many_aliases: Write a file using many configured language aliases.
+
+Constants:
+    - WORDS: Vocabulary used to generate prose.
+    - LANGUAGES: Languages of the generated code blocks.
+"""
+
+import os
+import random
+from typing import List
+
+WORDS = (
+    "runbook deploy server cluster token markdown block shell python node check "
+    "install configure restart service backup restore migrate database cache"
+).split()
+LANGUAGES = ("bash", "python", "sh", "js")
+
+
+def make_prose(rng: random.Random, words: int) -> str:
+    """
+    Generate a paragraph of prose.
+
+    Args:
+        rng (random.Random): The random generator.
+        words (int): Number of words.
+
+    Returns:
+        str: The paragraph, ending with a blank line.
+    """
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + ".\n\n"
+
+
+def make_block(rng: random.Random, name: str, lang: str, lines: int) -> str:
+    """
+    Generate a code block.
+
+    Args:
+        rng (random.Random): The random generator.
+        name (str): Name of the block.
+        lang (str): Language of the block.
+        lines (int): Number of lines of code.
+
+    Returns:
+        str: The fenced code block, ending with a blank line.
+    """
+    tag = rng.choice(WORDS)
+    code = "".join(
+        f"echo {rng.choice(WORDS)} {rng.randrange(1000)}\n" for _ in range(lines)
+    )
+    return f"```{lang} {{name={name}, tag={tag}}}\n{code}```\n\n"
+
+
+def _write(path: str, content: str) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fmd:
+        fmd.write(content)
+    return len(content.encode("utf-8"))
+
+
+def write_small_files(root: str, files: int, seed: int = 0) -> List[str]:
+    """
+    Write many small Markdown files in nested directories.
+
+    Args:
+        root (str): Directory of the corpus.
+        files (int): Number of files.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[str]: Paths to the written files.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        path = os.path.join(root, f"d{i % 10}", f"s{i // 10 % 10}", f"doc{i:05d}.md")
+        content = f"# Document {i}\n\n"
+        for j in range(3):
+            content += make_prose(rng, 40)
+            content += make_block(rng, f"b{i}-{j}", rng.choice(LANGUAGES), 5)
+        _write(path, content)
+        paths.append(path)
+    return paths
+
+
+def write_huge_files(root: str, files: int, size: int, seed: int = 0) -> List[str]:
+    """
+    Write a few huge Markdown files.
+
+    Args:
+        root (str): Directory of the corpus.
+        files (int): Number of files.
+        size (int): Approximate size of each file in bytes.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[str]: Paths to the written files.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        parts, written, j = [], 0, 0
+        while written < size:
+            part = make_prose(rng, rng.randrange(20, 200))
+            if j % 2 == 0:
+                part += make_block(
+                    rng, f"h{i}-{j}", rng.choice(LANGUAGES), rng.randrange(2, 40)
+                )
+            parts.append(part)
+            written += len(part)
+            j += 1
+        path = os.path.join(root, f"huge{i}.md")
+        _write(path, "".join(parts))
+        paths.append(path)
+    return paths
+
+
+def write_unterminated(root: str, headers: int, seed: int = 0) -> List[str]:
+    """
+    Write a file full of unterminated block headers.
+
+    Headers with an unclosed attribute list and a last block without closing fence are the worst
+    case of a backtracking regular expression.
+
+    Args:
+        root (str): Directory of the corpus.
+        headers (int): Number of unterminated headers.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[str]: Paths to the written files.
+    """
+    rng = random.Random(seed)
+    content = "".join(
+        f"```python {{name=u{i}, tag=t\n{make_prose(rng, 5)}" for i in range(headers)
+    )
+    content += "```python {name=last}\nprint(1)\n"
+    path = os.path.join(root, "unterminated.md")
+    _write(path, content)
+    return [path]
+
+
+def write_many_aliases(root: str, aliases: int, blocks: int, seed: int = 0) -> tuple:
+    """
+    Write a file using many configured language aliases.
+
+    Args:
+        root (str): Directory of the corpus.
+        aliases (int): Number of language aliases.
+        blocks (int): Number of code blocks.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        tuple: Paths to the written files and the list of aliases.
+    """
+    rng = random.Random(seed)
+    names = [f"lang{i}" for i in range(aliases)]
+    content = "".join(
+        make_prose(rng, 20) + make_block(rng, f"a{i}", rng.choice(names), 3)
+        for i in range(blocks)
+    )
+    path = os.path.join(root, "aliases.md")
+    _write(path, content)
+    return [path], names
@@ -0,0 +1,248 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Code Block Representation
+
+This module provides the `Block` class representing a code block extracted from a Markdown file.
+Blocks use `__slots__` instead of a per-instance dictionary, which keeps large indexes compact
+and cheap to pickle or serialize. Their code is only read from the Markdown file when needed.
+
+Functions:
+    - extract_code: Decode the code of a block and remove the indentation of its fence.
+    - load_blocks_code: Load the code of code blocks, reading each Markdown file once.
+
+Classes:
+    - Block: A code block and its metadata.
+"""
+
+from typing import Iterable, Optional
+
+BLOCK_FIELDS = (
+    "name",
+    "tag",
+    "file",
+    "lang",
+    "exec",
+    "start",
+    "end",
+    "line",
+    "indent",
+    "shebang",
+    "depends",
+    "cache",
+    "timeout",
+    "max_memory",
+    "max_cpu",
+)
+
+
+def extract_code(raw: bytes, indent: int = 0) -> str:
+    """
+    Decode the code of a block and remove the indentation of its fence.
+
+    Args:
+        raw (bytes): The raw code between the fences.
+        indent (int): Indentation of the opening fence.
+
+    Returns:
+        str: The code of the block.
+    """
+    # Files are read in binary mode, so Windows line endings are not translated
+    code = raw.decode("utf-8", "replace").replace("\r\n", "\n")
+    if indent:
+        code = "\n".join(
+            line[min(indent, len(line) - len(line.lstrip(" \t"))) :]
+            for line in code.split("\n")
+        )
+    return code.strip()
+
+
+class Block:
+    """
+    A code block and its metadata.
+
+    The code is loaded lazily from the Markdown file, using the byte offsets recorded by the
+    parser, the first time it is accessed.
+
+    Attributes:
+        name (str): Name of the code block.
+        tag (str): Tag of the code block, empty if not set.
+        file (Path): Markdown file containing the code block.
+        lang (str): Language of the code block.
+        code (str): The code of the block.
+        exec (bool): Whether the language of the block is configured.
+        start (int): Byte offset of the first byte of the code in the file.
+        end (int): Byte offset of the end of the code (closing fence line) in the file.
+        line (int): Line number of the block header in the file (1-based).
+        indent (int): Indentation of the opening fence.
+        shebang (str): Interpreter command line of the first line shebang, or None.
+        depends (tuple): Names of the code blocks that must run before this one.
+        cache (bool): Whether the result of the block can be replayed from the result cache.
+        timeout (float): Wall-clock time after which the block is killed, in seconds, or None.
+        max_memory (int): Maximum memory of the block process, in bytes, or None.
+        max_cpu (float): Maximum CPU time of the block process, in seconds, or None.
+    """
+
+    __slots__ = BLOCK_FIELDS + ("_code",)
+
+    def __init__(
+        self,
+        name: str,
+        lang: str,
+        code: Optional[str] = None,
+        tag: str = "",
+        file=None,
+        exec: bool = True,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        line: Optional[int] = None,
+        indent: int = 0,
+        shebang: Optional[str] = None,
+        depends: Iterable[str] = (),
+        cache: bool = False,
+        timeout: Optional[float] = None,
+        max_memory: Optional[int] = None,
+        max_cpu: Optional[float] = None,
+    ):
+        self.name = name
+        self.tag = tag
+        self.file = file
+        self.lang = lang
+        self.exec = exec
+        self.start = start
+        self.end = end
+        self.line = line
+        self.indent = indent
+        self.shebang = shebang
+        self.depends = tuple(depends)
+        self.cache = cache
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.max_cpu = max_cpu
+        self._code = code
+
+    @property
+    def code(self) -> str:
+        if self._code is None:
+            self._code = self.load_code()
+        return self._code
+
+    @code.setter
+    def code(self, code: str) -> None:
+        self._code = code
+
+    def load_code(self, data: Optional[bytes] = None) -> str:
+        """
+        Read the code of the block from its Markdown file.
+
+        Args:
+            data (bytes): The content of the Markdown file, if already read.
+
+        Returns:
+            str: The code of the block, or an empty string if it cannot be read.
+        """
+        if self.file is None or self.start is None or self.end is None:
+            return ""
+        if data is not None:
+            return extract_code(data[self.start : self.end], self.indent)
+        try:
+            with open(self.file, "rb") as file:
+                file.seek(self.start)
+                raw = file.read(max(0, self.end - self.start))
+        except OSError as e:
+            print(
+                f"Error: Failed to read code block '{self.name}' from '{self.file}': {e}"
+            )
+            return ""
+        return extract_code(raw, self.indent)
+
+    def __repr__(self) -> str:
+        return f"Block(name={self.name!r}, lang={self.lang!r}, tag={self.tag!r}, file={str(self.file)!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Block):
+            return NotImplemented
+        return self.code == other.code and all(
+            getattr(self, field) == getattr(other, field) for field in BLOCK_FIELDS
+        )
+
+    def __reduce__(self):
+        # Pickle positional arguments only, which keeps process pool transfers compact
+        return (
+            self.__class__,
+            (
+                self.name,
+                self.lang,
+                self._code,
+                self.tag,
+                self.file,
+                self.exec,
+                self.start,
+                self.end,
+                self.line,
+                self.indent,
+                self.shebang,
+                self.depends,
+                self.cache,
+                self.timeout,
+                self.max_memory,
+                self.max_cpu,
+            ),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return the block metadata as a dictionary, without its file and code.
+
+        Returns:
+            dict: The block fields.
+        """
+        return {
+            field: getattr(self, field) for field in BLOCK_FIELDS if field != "file"
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, file=None) -> "Block":
+        """
+        Build a block from a dictionary returned by `to_dict`.
+
+        Args:
+            data (dict): The block fields.
+            file (Path): Markdown file containing the code block.
+
+        Returns:
+            Block: The code block.
+        """
+        return cls(file=file, **data)
+
+
+def load_blocks_code(blocks: Iterable[Block]) -> None:
+    """
+    Load the code of code blocks, reading each Markdown file once.
+
+    The code of the blocks of a run is loaded before the first of them starts, since a block may
+    edit a Markdown file and move the code of the next blocks away from their recorded offsets.
+
+    Args:
+        blocks (Iterable[Block]): The code blocks.
+    """
+    by_file = {}
+    for block in blocks:
+        if block._code is None and block.file is not None:
+            by_file.setdefault(block.file, []).append(block)
+    for path, file_blocks in by_file.items():
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            # Reported by load_code, block by block
+            data = None
+        for block in file_blocks:
+            block.code = block.load_code(data)
@@ -0,0 +1,463 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Persistent Cache for the 'runmd' CLI Tool
+
+This module provides an on-disk index of the code blocks extracted from Markdown files, so that
+only new or modified files are parsed again on subsequent invocations, and a store of the results
+of the code blocks marked with `cache=true`, so that unchanged blocks are not run again.
+
+Functions:
+    - get_cache_path: Return the path to the runmd cache directory.
+    - file_digest: Compute the SHA-256 digest of a file.
+    - clear_cache: Remove all the block indexes, results and configuration snapshots.
+    - prune_cache: Remove the least recently used results exceeding the size of the store.
+    - print_cache_stats: Print statistics about the block indexes and results.
+
+Classes:
+    - BlockIndex: Index of the code blocks of the Markdown files of a directory.
+    - ResultCache: Content-addressed store of the results of code blocks.
+
+Each working directory has its own index file. Entries are keyed by absolute file path and
+validated against the file size, modification time and content hash. The whole index is discarded
+when the set of configured language aliases or the runmd version changes.
+
+Results are keyed by a digest of everything that determines the output of a block: its code, the
+command and options of its language, the environment variables given on the command line and the
+interpreter binary. The session variables are not part of the key, so only deterministic blocks
+should be cached.
+
+The cache also holds the compiled snapshots of the configuration files, see `ConfigLoader`.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from . import __version__
+from .block import Block
+
+INDEX_DIR_NAME = "index"
+INDEX_FORMAT_VERSION = 7
+RESULTS_DIR_NAME = "results"
+SNAPSHOT_DIR_NAME = "config"
+RESULTS_FORMAT_VERSION = 1
+RESULTS_STATS_NAME = "stats.json"
+DEFAULT_RESULTS_MAX_SIZE = 100 << 20
+
+
+def get_cache_path() -> Path:
+    """
+    Return the path to the runmd cache directory.
+
+    Returns:
+        Path: The path to the cache directory.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "runmd"
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: The hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlockIndex:
+    """
+    Index of the code blocks of the Markdown files of a directory.
+
+    Attributes:
+        path (Path): Path to the index file.
+        key (str): Digest of the settings the index depends on.
+        entries (dict): Index entries, keyed by absolute file path.
+        hits (int): Number of files served from the index.
+        misses (int): Number of files that had to be parsed.
+    """
+
+    def __init__(self, languages: list, root: Optional[str] = None):
+        root = os.path.abspath(root or os.getcwd())
+        name = hashlib.sha1(root.encode("utf-8")).hexdigest()
+        self.path = get_cache_path() / INDEX_DIR_NAME / f"{name}.json"
+        self.key = hashlib.sha256(
+            json.dumps(
+                [INDEX_FORMAT_VERSION, __version__, sorted(set(languages))]
+            ).encode("utf-8")
+        ).hexdigest()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._stats = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        """Load the index file, discarding it if it was built with other settings."""
+        try:
+            with open(self.path, "r") as findex:
+                data = json.load(findex)
+        except (OSError, ValueError):
+            return
+
+        if isinstance(data, dict) and data.get("key") == self.key:
+            self.entries = data.get("entries", {})
+        else:
+            self._dirty = True
+
+    def get(self, file_path) -> Optional[list]:
+        """
+        Return the code blocks of a file if its index entry is still valid.
+
+        Args:
+            file_path (str): Path to the Markdown file.
+
+        Returns:
+            list: The code blocks of the file, or None if the file must be parsed.
+        """
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        self._stats[key] = stat
+
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == stat.st_size:
+            if entry["mtime_ns"] != stat.st_mtime_ns:
+                # Touched file: only trust the entry if the content did not change
+                if file_digest(file_path) != entry["hash"]:
+                    entry = None
+                else:
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    self._dirty = True
+            if entry is not None:
+                self.hits += 1
+                return [
+                    Block.from_dict(block, file=file_path) for block in entry["blocks"]
+                ]
+
+        self.misses += 1
+        return None
+
+    def put(self, file_path, blocks: list) -> None:
+        """
+        Store the code blocks of a file in the index.
+
+        The entry is only stored if the file did not change since the previous call to `get`.
+
+        Args:
+            file_path (str): Path to the Markdown file.
+            blocks (list): The code blocks extracted from the file.
+        """
+        key = os.path.abspath(file_path)
+        stat = self._stats.pop(key, None)
+        try:
+            digest = file_digest(file_path)
+            current = os.stat(file_path)
+        except OSError:
+            return
+
+        if stat is None or (stat.st_size, stat.st_mtime_ns) != (
+            current.st_size,
+            current.st_mtime_ns,
+        ):
+            return
+
+        self.entries[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest,
+            "blocks": [block.to_dict() for block in blocks],
+        }
+        self._dirty = True
+
+    def prune(self, file_paths: list) -> None:
+        """
+        Remove the entries of the files that are not in the given list.
+
+        Args:
+            file_paths (list): Paths to the Markdown files to keep.
+        """
+        keep = {os.path.abspath(file_path) for file_path in file_paths}
+        stale = [key for key in self.entries if key not in keep]
+        for key in stale:
+            del self.entries[key]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        """Write the index file if it was modified."""
+        if not self._dirty:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first to ensure atomic write
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.path.parent, delete=False
+            ) as dumpfile:
+                json.dump({"key": self.key, "entries": self.entries}, dumpfile)
+            Path(dumpfile.name).replace(self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error writing cache file: {e}")
+
+
+class ResultCache:
+    """
+    Content-addressed store of the results of code blocks.
+
+    Each result is a file named after its key, holding the output and exit status of the block.
+    The modification time of a file is updated when the result is replayed, so that `prune`
+    evicts the least recently used results once the store exceeds its maximum size.
+
+    Attributes:
+        path (Path): Directory of the results.
+        max_size (int): Maximum total size of the results in bytes.
+        hits (int): Number of results replayed during this run.
+        misses (int): Number of cacheable blocks that had to run during this run.
+        stored (int): Number of results stored during this run.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_RESULTS_MAX_SIZE):
+        self.path = get_cache_path() / RESULTS_DIR_NAME
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._interpreters = {}
+        self._lock = threading.Lock()
+
+    def _interpreter(self, command: list) -> list:
+        """Identify the interpreter of a command by the path, size and mtime of its binary."""
+        programs = command[:1]
+        if programs and os.path.basename(programs[0]) == "env":
+            # Shebangs like '/usr/bin/env python3' name the interpreter in the first argument
+            programs += [arg for arg in command[1:] if not arg.startswith("-")][:1]
+
+        identity = []
+        for program in programs:
+            if program not in self._interpreters:
+                path = shutil.which(program) or program
+                try:
+                    stat = os.stat(path)
+                    self._interpreters[program] = [path, stat.st_size, stat.st_mtime_ns]
+                except OSError:
+                    self._interpreters[program] = [path]
+            identity.append(self._interpreters[program])
+        return identity
+
+    def key(self, code: str, command: list, options: list, env_vars: dict) -> str:
+        """
+        Compute the key of the result of a code block.
+
+        Args:
+            code (str): The code of the block.
+            command (list): The command of the language.
+            options (list): The options of the language.
+            env_vars (dict): Environment variables given on the command line.
+
+        Returns:
+            str: The hexadecimal digest identifying the result.
+        """
+        data = [
+            RESULTS_FORMAT_VERSION,
+            code,
+            command,
+            options,
+            sorted((env_vars or {}).items()),
+            self._interpreter(command),
+        ]
+        return hashlib.sha256(json.dumps(data).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Return a stored result, counting a hit or a miss.
+
+        Args:
+            key (str): The key returned by `key`.
+
+        Returns:
+            dict: The `output` and `returncode` of the block, or None if it is not stored.
+        """
+        path = self.path / f"{key}.json"
+        try:
+            with open(path, "r") as fresult:
+                result = json.load(fresult)
+            # Mark the result as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key: str, output: str, returncode: int) -> None:
+        """
+        Store the result of a code block.
+
+        Args:
+            key (str): The key returned by `key`.
+            output (str): The output of the block.
+            returncode (int): The exit status of the block.
+        """
+        data = json.dumps({"output": output, "returncode": returncode})
+        if len(data) > self.max_size:
+            return
+
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first to ensure atomic write
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.path, suffix=".tmp", delete=False
+            ) as fresult:
+                fresult.write(data)
+            Path(fresult.name).replace(self.path / f"{key}.json")
+        except OSError as e:
+            print(f"Error writing cache file: {e}")
+            return
+
+        with self._lock:
+            self.stored += 1
+
+    def entries(self) -> list:
+        """
+        List the stored results.
+
+        Returns:
+            list: The path and `os.stat` result of each result file, least recently used first.
+        """
+        entries = []
+        for path in self.path.glob("*.json"):
+            if path.name == RESULTS_STATS_NAME:
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                continue
+        entries.sort(key=lambda entry: entry[1].st_mtime_ns)
+        return entries
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used results until the store fits in its maximum size.
+
+        Returns:
+            int: The number of removed results.
+        """
+        entries = self.entries()
+        total_size = sum(stat.st_size for _, stat in entries)
+        removed = 0
+        for path, stat in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_size -= stat.st_size
+            removed += 1
+        return removed
+
+    def load_stats(self) -> dict:
+        """
+        Return the hit and miss counters of all the runs.
+
+        Returns:
+            dict: The `hits` and `misses` counters.
+        """
+        try:
+            with open(self.path / RESULTS_STATS_NAME, "r") as fstats:
+                stats = json.load(fstats)
+        except (OSError, ValueError):
+            stats = {}
+        return {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0)}
+
+    def save(self) -> None:
+        """Add the counters of this run to the stored ones and prune the new results."""
+        if self.stored:
+            self.prune()
+        if not self.hits and not self.misses:
+            return
+
+        stats = self.load_stats()
+        stats["hits"] += self.hits
+        stats["misses"] += self.misses
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.path, suffix=".tmp", delete=False
+            ) as fstats:
+                json.dump(stats, fstats)
+            Path(fstats.name).replace(self.path / RESULTS_STATS_NAME)
+        except OSError as e:
+            print(f"Error writing cache file: {e}")
+
+
+def clear_cache() -> None:
+    """Remove all the block indexes, results and configuration snapshots."""
+    shutil.rmtree(get_cache_path() / INDEX_DIR_NAME, ignore_errors=True)
+    shutil.rmtree(get_cache_path() / RESULTS_DIR_NAME, ignore_errors=True)
+    shutil.rmtree(get_cache_path() / SNAPSHOT_DIR_NAME, ignore_errors=True)
+    print("Cache cleared.")
+
+
+def prune_cache(results: ResultCache) -> None:
+    """
+    Remove the least recently used results exceeding the maximum size of the store.
+
+    Args:
+        results (ResultCache): The result store.
+    """
+    removed = results.prune()
+    print(f"Removed {removed} result(s).")
+
+
+def print_cache_stats(index: BlockIndex, results: ResultCache) -> None:
+    """
+    Print statistics about the block indexes and results.
+
+    Args:
+        index (BlockIndex): The index of the current directory.
+        results (ResultCache): The result store.
+    """
+    index_files = list((get_cache_path() / INDEX_DIR_NAME).glob("*.json"))
+    total_size = sum(path.stat().st_size for path in index_files)
+    blocks = sum(len(entry["blocks"]) for entry in index.entries.values())
+    entries = results.entries()
+    results_size = sum(stat.st_size for _, stat in entries)
+    stats = results.load_stats()
+
+    print(f"Location: {get_cache_path()}")
+    print(f"Indexes: {len(index_files)} ({total_size} bytes)")
+    print(f"Current directory: {len(index.entries)} files, {blocks} blocks")
+    print(
+        f"Results: {len(entries)} ({results_size} of {results.max_size} bytes), "
+        f"{stats['hits']} hits, {stats['misses']} misses"
+    )
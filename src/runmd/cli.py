@@ -14,6 +14,8 @@ This module defines the command-line interface (CLI) for the 'runmd' tool. It pr
 
 Functions:
     - cliargs: Create and return the argument parser for the CLI tool.
+    - open_history_database: Open the history database if the history is stored in SQLite.
+    - history_command: Print, clear or look up the command history.
     - execute_command: Execute the appropriate command based on parsed arguments and configuration.
     - main: Main entry point for the CLI tool that handles argument parsing, configuration loading, and command execution.
 
@@ -22,19 +24,110 @@ Constants:
     - SHOWCMD: Command to show code blocks.
     - LISTCMD: Command to list code blocks.
     - HISTCMD: Command to display or clear the command history.
+    - CACHECMD: Command to clear or inspect the block index.
+    - CONFIGCMD: Command to show the resolved configuration.
 
 This module integrates with the configuration and history modules to provide a complete CLI experience, allowing users to manage code blocks within Markdown files and track their command history.
 """
 
 import argparse
 import sys
+import time
 from typing import Optional
 
+from .cache import (
+    BlockIndex,
+    ResultCache,
+    clear_cache,
+    print_cache_stats,
+    prune_cache,
+)
 from .commands import CmdNames, create_parser
-from .config import ConfigLoader
-from .history import load_history, print_history, update_history, write_history
-from .process import list_command, process_markdown_files, run_command, show_command
+from .config import ConfigLoader, print_config
+from .history import (
+    filter_history,
+    find_history_entry,
+    load_history,
+    parse_since,
+    print_history,
+    record_history,
+    write_history,
+)
+from .process import (
+    find_block,
+    list_command,
+    process_markdown_files,
+    run_command,
+    show_command,
+)
+from .report import RunReport
+from .trace import disable_tracing, enable_tracing, span
 from .vault import TextFileVault
+from .workers import WorkerPool
+
+
+def open_history_database(config: ConfigLoader):
+    """
+    Open the history database if the history is stored in SQLite.
+
+    Args:
+        config (ConfigLoader): The configuration.
+
+    Returns:
+        HistoryDatabase: The history database, or None with the default history log.
+    """
+    if config.get_history_backend() != "sqlite":
+        return None
+    # sqlite3 is only imported when the database is used
+    from .database import HistoryDatabase
+
+    return HistoryDatabase()
+
+
+def history_command(args: argparse.Namespace, config: ConfigLoader) -> Optional[list]:
+    """
+    Print, clear or look up the command history.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the hist command.
+        config (ConfigLoader): The configuration.
+
+    Returns:
+        list: The arguments of the command to replay, or None.
+    """
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError:
+        print(f"Error: Invalid date or duration '{args.since}'.")
+        return None
+    database = open_history_database(config)
+    if database is None:
+        if args.block:
+            print("Error: --block requires 'history_backend = sqlite'.")
+            return None
+        # The history log is only read by the hist command
+        if args.clear:
+            write_history([])
+            return None
+        history = load_history()
+        if not args.id:
+            print_history(filter_history(history, args.root, args.failed, since))
+            return None
+        entry = find_history_entry(history, int(args.id))
+    else:
+        with database:
+            if args.clear:
+                database.clear()
+                return None
+            if not args.id:
+                print_history(database.query(args.root, args.failed, since, args.block))
+                return None
+            entry = database.find(int(args.id))
+
+    if entry is None:
+        print(f"Error: Command '{args.id}' not found in history.")
+        return None
+    return entry["command"].split(" ")
 
 
 def execute_command(args: argparse.Namespace, config: ConfigLoader) -> None:
@@ -48,21 +141,15 @@ def execute_command(args: argparse.Namespace, config: ConfigLoader) -> None:
         args (argparse.Namespace): The parsed command-line arguments.
         config (dict): The configuration object loaded from the config file.
     """
-    # Read history
-    histsize = config.get_histsize()
-    history = load_history()
     usercmd = " ".join(sys.argv)
 
-    if args.command == CmdNames.HISTCMD:
-        if args.id:
-            oldcmd = history[int(args.id)]["command"].split(" ")
-            # Reparse
-            parser = create_parser()
-            args = parser.parse_args(oldcmd[1:])
-        elif args.clear:
-            write_history([])
-        else:
-            print_history(history)
+    if args.command == CmdNames.HISTCMD.value:
+        oldcmd = history_command(args, config)
+        if oldcmd is None:
+            return
+        # Reparse
+        parser = create_parser()
+        args = parser.parse_args(oldcmd[1:])
 
     if args.command == CmdNames.VAULTCMD.value:
         mdvault = TextFileVault()
@@ -71,21 +158,111 @@ def execute_command(args: argparse.Namespace, config: ConfigLoader) -> None:
         elif args.encrypt:
             mdvault.encrypt_file(args.encrypt[0], args.outfile[0])
 
+    if args.command == CmdNames.CACHECMD.value:
+        results = ResultCache(config.get_result_cache_size())
+        if args.action == "clear":
+            clear_cache()
+        elif args.action == "prune":
+            prune_cache(results)
+        elif args.action == "stats":
+            print_cache_stats(BlockIndex(config.get_all_aliases()), results)
+
+    if args.command == CmdNames.CONFIGCMD.value:
+        if args.action == "show":
+            print_config(config)
+
     if args.command in [
         CmdNames.RUNCMD.value,
         CmdNames.SHOWCMD.value,
         CmdNames.LISTCMD.value,
     ]:
-        blocklist = process_markdown_files(args.file, config)
+        index = None if args.no_cache else BlockIndex(config.get_all_aliases())
+        jobs = args.jobs if args.jobs is not None else config.get_jobs()
+        ignore = config.get_ignore_patterns()
+
+        # A single named block can be found without parsing the whole tree
+        blockname = getattr(args, "blockname", None)
+        single_block = blockname not in (None, "all") and (
+            args.command == CmdNames.SHOWCMD.value
+            or (
+                args.command == CmdNames.RUNCMD.value
+                and not args.tag
+                and config.get_unique_names()
+            )
+        )
+        if single_block:
+            blocklist = find_block(
+                args.file,
+                config,
+                blockname,
+                index,
+                args.max_depth,
+                args.include,
+                ignore,
+            )
+            # The dependencies of the block can be anywhere in the tree
+            if any(block.depends for block in blocklist):
+                single_block = False
+        if not single_block:
+            blocklist = process_markdown_files(
+                args.file,
+                config,
+                index,
+                jobs,
+                args.max_depth,
+                args.include,
+                ignore,
+            )
 
         if args.command == CmdNames.RUNCMD.value and (args.blockname or args.tag):
             # Convert list of 'KEY=value' strings to a dictionary of environment variables
             env_vars = {
                 key: value for env in args.env for key, value in [env.split("=", 1)]
             }
-            success = run_command(blocklist, args.blockname, args.tag, config, env_vars)
-            history = update_history(history, histsize, usercmd, success)
-            write_history(history)
+            pool = None
+            if args.workers or config.get_workers():
+                pool = WorkerPool(config, config.get_worker_max_blocks())
+            results = None
+            if args.cache or config.get_cache():
+                results = ResultCache(config.get_result_cache_size())
+            database = open_history_database(config)
+            report = None
+            if args.summary or args.report or database is not None:
+                report = RunReport(usercmd)
+            parallel = args.parallel
+            if parallel is None:
+                parallel = config.get_run_jobs()
+            success = False
+            try:
+                with span("run blocks", "run"):
+                    success = run_command(
+                        blocklist,
+                        args.blockname,
+                        args.tag,
+                        config,
+                        env_vars,
+                        pool,
+                        parallel,
+                        args.keep_going,
+                        args.timeout,
+                        results,
+                        report,
+                    )
+            finally:
+                if pool is not None:
+                    pool.close()
+                if results is not None:
+                    results.save()
+                    print(f"Result cache: {results.hits} hits, {results.misses} misses")
+                if args.summary:
+                    report.print_summary()
+                if args.report:
+                    report.write(args.report, success)
+            if database is not None:
+                with database:
+                    database.record(config.get_histsize(), usercmd, success, report)
+            else:
+                record_history(config.get_histsize(), usercmd, success)
 
         elif args.command == CmdNames.SHOWCMD.value and args.blockname:
             show_command(blocklist, args.blockname)
@@ -108,6 +285,7 @@ def main(command_line: Optional[list[str]] = None) -> None:
     """
 
     # Load and validate configuration
+    started = time.perf_counter()
     config = ConfigLoader()
 
     # Parse the command-line arguments
@@ -117,8 +295,18 @@ def main(command_line: Optional[list[str]] = None) -> None:
     # Handle case where no command is provided
     if args.command is None:
         parser.print_help()
-    else:
+        return
+
+    trace_path = getattr(args, "trace", None)
+    if trace_path:
+        # The configuration is compiled on first use, inside its own span
+        enable_tracing(started)
+    try:
         execute_command(args, config)
+    finally:
+        tracer = disable_tracing()
+        if trace_path and tracer is not None:
+            tracer.write(trace_path)
 
 
 if __name__ == "__main__":
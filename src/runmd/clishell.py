@@ -8,14 +8,15 @@
 # -----------------------------------------------------------------------------
 
 import argparse
+import asyncio
 import cmd
 import re
 import shlex
 import sys
 
 from . import __version__
-from .config import get_configuration
-from .process import list_command, process_markdown_files, run_command, show_command
+from .config import ConfigLoader
+from .process import arun_command, list_command, process_markdown_files, show_command
 
 
 class RunMDShell(cmd.Cmd):
@@ -24,7 +25,7 @@ class RunMDShell(cmd.Cmd):
 
     def __init__(self, inputfilepath=None):
         super().__init__()
-        self.configuration = get_configuration()
+        self.configuration = ConfigLoader()
         self.blocklist = []
         if inputfilepath:
             self.inputfilepath = inputfilepath
@@ -60,9 +61,30 @@ class RunMDShell(cmd.Cmd):
             "-t",
             "--tag",
             nargs="?",
-            default="None",
+            default=None,
             help="Execute all code blocks with this tag",
         )
+        parser.add_argument(
+            "-p",
+            "--parallel",
+            type=int,
+            default=None,
+            metavar="N",
+            help="Run up to N independent code blocks at the same time (0 to use all cores). "
+            "If not provided, uses the value of run_jobs from config.",
+        )
+        parser.add_argument(
+            "-k",
+            "--keep-going",
+            action="store_true",
+            help="Keep running the blocks that do not depend on a failed block",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=None,
+            help="Kill a code block running for more than this number of seconds",
+        )
         parser.add_argument(
             "--env",
             nargs="*",
@@ -74,8 +96,20 @@ class RunMDShell(cmd.Cmd):
             env_vars = {
                 key: value for env in args.env for key, value in [env.split("=", 1)]
             }
-            _ = run_command(
-                self.blocklist, args.blockname, args.tag, self.configuration, env_vars
+            parallel = args.parallel
+            if parallel is None:
+                parallel = self.configuration.get_run_jobs()
+            _ = asyncio.run(
+                arun_command(
+                    self.blocklist,
+                    args.blockname,
+                    args.tag,
+                    self.configuration,
+                    env_vars,
+                    parallel,
+                    args.keep_going,
+                    args.timeout,
+                )
             )
 
     def do_show(self, arg):
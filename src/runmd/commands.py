@@ -22,12 +22,18 @@ Functions:
     - add_list_command: Add the list command to the argument parser.
     - add_show_command: Add the show command to the argument parser.
     - add_hist_command: Add the hist command to the argument parser.
+    - add_vault_command: Add the vault command to the argument parser.
+    - add_cache_command: Add the cache command to the argument parser.
+    - add_config_command: Add the config command to the argument parser.
 
 Constants:
     - RUNCMD: Command to run code blocks.
     - SHOWCMD: Command to show code blocks.
     - LISTCMD: Command to list code blocks.
     - HISTCMD: Command to display or clear the command history.
+    - VAULTCMD: Command to encrypt or decrypt markdown files.
+    - CACHECMD: Command to manage the block index.
+    - CONFIGCMD: Command to show the resolved configuration.
 
 """
 
@@ -47,6 +53,8 @@ class CmdNames(Enum):
     LISTCMD = "list"
     HISTCMD = "hist"
     VAULTCMD = "vault"
+    CACHECMD = "cache"
+    CONFIGCMD = "config"
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -72,6 +80,8 @@ def create_parser() -> argparse.ArgumentParser:
     add_list_command(subparsers, common_parser)
     add_hist_command(subparsers)
     add_vault_command(subparsers)
+    add_cache_command(subparsers)
+    add_config_command(subparsers)
     return parser
 
 
@@ -90,6 +100,30 @@ def create_commons() -> argparse.ArgumentParser:
         default=None,
         help="Path to the markdown file to process. If not provided, uses the default file from config.",
     )
+    common_parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="Maximum depth of the directory walk when searching for markdown files",
+    )
+    common_parser.add_argument(
+        "--include",
+        action="append",
+        default=None,
+        help="Glob pattern of the markdown files to process (default: *.md). Can be repeated.",
+    )
+    common_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse all markdown files without using the block index",
+    )
+    common_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes parsing the markdown files (0 to use all cores). If not provided, uses the value from config.",
+    )
     return common_parser
 
 
@@ -124,6 +158,55 @@ def add_run_command(
         default=[],
         help="Environment variables to set during execution (e.g., VAR=value)",
     )
+    run_parser.add_argument(
+        "--workers",
+        action="store_true",
+        default=None,
+        help="Run Python and Node.js blocks in warm interpreter workers",
+    )
+    run_parser.add_argument(
+        "-p",
+        "--parallel",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Run up to N independent code blocks at the same time (0 to use all cores). "
+        "If not provided, uses the value of run_jobs from config.",
+    )
+    run_parser.add_argument(
+        "-k",
+        "--keep-going",
+        action="store_true",
+        help="Keep running the blocks that do not depend on a failed block",
+    )
+    run_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Kill a code block running for more than this number of seconds, unless it sets its own timeout",
+    )
+    run_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Replay the stored result of unchanged code blocks marked with cache=true",
+    )
+    run_parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print the time, CPU time and memory used by each code block after the run",
+    )
+    run_parser.add_argument(
+        "--report",
+        metavar="FILE",
+        default=None,
+        help="Write the status and resource usage of each code block to a JSON file",
+    )
+    run_parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        default=None,
+        help="Write a trace of the run in the Trace Event Format (chrome://tracing, Perfetto)",
+    )
 
 
 def add_show_command(
@@ -184,6 +267,26 @@ def add_hist_command(subparsers: argparse._SubParsersAction) -> None:
         action="store_true",
         help="Clear the history list",
     )
+    hist_parser.add_argument(
+        "--root",
+        metavar="DIR",
+        help="Only list the commands run from this directory",
+    )
+    hist_parser.add_argument(
+        "--failed",
+        action="store_true",
+        help="Only list the failed commands",
+    )
+    hist_parser.add_argument(
+        "--since",
+        metavar="DATE",
+        help="Only list the commands run since this ISO date or duration (e.g. 2h, 7d)",
+    )
+    hist_parser.add_argument(
+        "--block",
+        metavar="NAME",
+        help="Only list the runs of this code block (sqlite history backend)",
+    )
 
 
 def add_vault_command(subparser: argparse._SubParsersAction) -> None:
@@ -216,3 +319,33 @@ def add_vault_command(subparser: argparse._SubParsersAction) -> None:
         default=None,
         help="Output file to write the encrypted/decrypted markdown file to",
     )
+
+
+def add_cache_command(subparser: argparse._SubParsersAction) -> None:
+    """
+    Add the cache command to the argument parser
+    """
+    cache_parser = subparser.add_parser(
+        CmdNames.CACHECMD.value,
+        help="Manage the runmd cache",
+    )
+    cache_parser.add_argument(
+        "action",
+        choices=["clear", "prune", "stats"],
+        help="Clear the cache, evict the least recently used results or display statistics",
+    )
+
+
+def add_config_command(subparser: argparse._SubParsersAction) -> None:
+    """
+    Add the config command to the argument parser
+    """
+    config_parser = subparser.add_parser(
+        CmdNames.CONFIGCMD.value,
+        help="Show the configuration",
+    )
+    config_parser.add_argument(
+        "action",
+        choices=["show"],
+        help="Show the configuration layers and the resolved settings with their source",
+    )
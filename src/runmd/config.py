@@ -24,25 +24,291 @@ Functions:
       and fields.
     - get_all_aliases: Retrieve a list of all language aliases defined in the configuration.
     - get_configuration:  Load and validate the configuration file.
-
-Attributes:
-    - None
+    - parse_boolean: Parse a boolean setting as `ConfigParser.getboolean` does.
+    - parse_history_backend: Parse the `history_backend` setting.
+    - find_project_config: Find the project configuration file of a directory.
+    - print_config: Print the configuration layers and the resolved settings with their source.
+
+Classes:
+    - ConfigLoader: Load, validate and query the configuration.
+    - Language: The settings of a language section, parsed once.
+    - LanguageTable: Lookup tables of the language sections, built once after validation.
+
+Constants:
+    - PROJECT_CONFIG_NAME: Name of the project configuration file.
+    - CONFIG_ENV_VAR: Environment variable naming a configuration file layered over the others.
+    - HISTORY_BACKENDS: The valid values of the `history_backend` setting.
+    - DEFAULT_KEYS: Settings of the DEFAULT section and the function converting their value.
 
 This module handles the configuration setup and validation for the 'runmd' CLI tool, ensuring that
 users have a correctly configured environment for running and processing code blocks.
+
+The configuration is made of up to three layers, each one overriding the settings of the previous
+ones key by key: the user configuration file, the `.runmd.ini` file of the project (found in the
+current directory or its parents) and the file named by the `RUNMD_CONFIG` environment variable.
+The layers are merged and validated once, and the file each setting comes from is recorded.
+
+Once validated, the settings and language tables are stored as a compiled snapshot in the runmd
+cache, keyed by the size, modification time and content hash of the configuration layers. Later
+runs load the snapshot instead of parsing and validating the files again, until one of them
+changes.
 """
 
 import configparser
 import functools
+import hashlib
 import importlib.resources
+import json
 import os
 import shutil
+import tempfile
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from . import __version__
+from .cache import SNAPSHOT_DIR_NAME, file_digest, get_cache_path
+from .delivery import DEFAULT_SCRIPT_OPTIONS, DELIVERY_MODES
+from .limits import LIMIT_KEYS, ResourceLimits
+from .trace import span
+from .workers import DEFAULT_WORKERS
 
 CONFIG_FILE_NAME = "config.ini"
 CONFIG_DIR_NAME = "runmd"
 REQUIRED_LANG_KEYS = ["aliases", "command", "options"]
+LANG_PREFIX = "lang."
+PROJECT_CONFIG_NAME = ".runmd.ini"
+CONFIG_ENV_VAR = "RUNMD_CONFIG"
+SNAPSHOT_FORMAT_VERSION = 2
+HISTORY_BACKENDS = ("jsonl", "sqlite")
+
+
+def parse_boolean(value: str) -> bool:
+    """
+    Parse a boolean setting as `ConfigParser.getboolean` does.
+
+    Args:
+        value (str): The value of the setting, such as `yes`, `off` or `1`.
+
+    Returns:
+        bool: The boolean value.
+
+    Raises:
+        ValueError: If the value is not a boolean.
+    """
+    try:
+        return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+    except KeyError:
+        raise ValueError(f"Not a boolean: {value}")
+
+
+def parse_history_backend(value: str) -> str:
+    """
+    Parse the `history_backend` setting.
+
+    Args:
+        value (str): The value of the setting.
+
+    Returns:
+        str: The backend storing the command history, jsonl or sqlite.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = value.strip().lower()
+    if backend not in HISTORY_BACKENDS:
+        raise ValueError(f"Unknown history backend: {value}")
+    return backend
+
+
+DEFAULT_KEYS = {
+    "histsize": int,
+    "jobs": int,
+    "run_jobs": int,
+    "unique_names": parse_boolean,
+    "workers": parse_boolean,
+    "worker_max_blocks": int,
+    "result_cache_size_mb": int,
+    "cache": parse_boolean,
+    "ignore": str.split,
+    "history_backend": parse_history_backend,
+}
+
+
+def find_project_config(start: Optional[Path] = None) -> Optional[Path]:
+    """
+    Find the project configuration file of a directory.
+
+    Args:
+        start (Path): The directory to search from, the current directory if None.
+
+    Returns:
+        Path: The `.runmd.ini` file of the directory or of its closest parent, or None.
+    """
+    directory = Path.cwd() if start is None else Path(start).absolute()
+    for parent in (directory, *directory.parents):
+        config_path = parent / PROJECT_CONFIG_NAME
+        if config_path.is_file():
+            return config_path
+    return None
+
+
+class Language:
+    """
+    The settings of a language section, parsed once.
+
+    Attributes:
+        name (str): Name of the language section, without the `lang.` prefix.
+        aliases (tuple): Names of the language in code block headers.
+        command (tuple): The command running the code blocks.
+        options (tuple): Options passed before the code of a block given as an argument.
+        delivery (str): How the code reaches the interpreter: auto, argv, stdin or fd.
+        script_options (tuple): Options passed before the code of a block given as a script.
+        worker (str): Kind of warm worker running the code blocks, empty if none.
+        limits (ResourceLimits): Default resource limits of the code blocks.
+    """
+
+    __slots__ = (
+        "name",
+        "aliases",
+        "command",
+        "options",
+        "delivery",
+        "script_options",
+        "worker",
+        "limits",
+    )
+
+    def __init__(self, name: str, section: configparser.SectionProxy):
+        self.name = name
+        self.aliases = tuple(
+            alias.strip()
+            for alias in section.get("aliases", "").split(",")
+            if alias.strip()
+        )
+        self.command = tuple(section.get("command", "").split())
+        self.options = tuple(section.get("options", "").split())
+        self.delivery = section.get("delivery", "auto").strip().lower()
+        self.script_options = tuple(
+            section.get(
+                "script_options", DEFAULT_SCRIPT_OPTIONS.get(section.name, "")
+            ).split()
+        )
+        self.worker = (
+            section.get("worker", DEFAULT_WORKERS.get(name, "")).strip().lower()
+        )
+        self.limits = ResourceLimits.from_section(section)
+
+    def __repr__(self) -> str:
+        return f"Language(name={self.name!r}, aliases={self.aliases!r}, command={self.command!r})"
+
+    def to_dict(self) -> dict:
+        """
+        Return the settings of the language as a dictionary.
+
+        Returns:
+            dict: The settings, the limits being given as a dictionary.
+        """
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data["limits"] = {key: getattr(self.limits, key) for key in LIMIT_KEYS}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Language":
+        """
+        Build a language from a dictionary returned by `to_dict`.
+
+        Args:
+            data (dict): The settings of the language.
+
+        Returns:
+            Language: The language.
+        """
+        language = cls.__new__(cls)
+        language.name = data["name"]
+        language.delivery = data["delivery"]
+        language.worker = data["worker"]
+        for field in ("aliases", "command", "options", "script_options"):
+            setattr(language, field, tuple(data[field]))
+        language.limits = ResourceLimits(**data["limits"])
+        return language
+
+
+class LanguageTable:
+    """
+    Lookup tables of the language sections, built once after validation.
+
+    Code block languages are matched exactly against the aliases of the sections. When several
+    sections declare the same alias, the first one wins.
+
+    Attributes:
+        aliases (tuple): All the aliases, in the order of the sections.
+    """
+
+    __slots__ = ("aliases", "_languages", "_by_alias")
+
+    def __init__(self, config: configparser.ConfigParser):
+        self._index(
+            Language(section[len(LANG_PREFIX) :], config[section])
+            for section in config.sections()
+            if section.startswith(LANG_PREFIX)
+        )
+
+    @classmethod
+    def from_dicts(cls, data: list) -> "LanguageTable":
+        """
+        Build the tables from the dictionaries returned by `to_dicts`.
+
+        Args:
+            data (list): The settings of the languages.
+
+        Returns:
+            LanguageTable: The lookup tables.
+        """
+        table = cls.__new__(cls)
+        table._index(Language.from_dict(language) for language in data)
+        return table
+
+    def to_dicts(self) -> list:
+        """
+        Return the settings of the languages, in the order of the sections.
+
+        Returns:
+            list: The settings of each language, as returned by `Language.to_dict`.
+        """
+        return [language.to_dict() for language in self]
+
+    def _index(self, languages: Iterable[Language]) -> None:
+        self._languages = {}
+        self._by_alias = {}
+        for language in languages:
+            self._languages[language.name] = language
+            for alias in language.aliases:
+                self._by_alias.setdefault(alias, language)
+        self.aliases = tuple(self._by_alias)
+
+    def find(self, alias: str) -> Optional[Language]:
+        """
+        Find the language of a code block.
+
+        Args:
+            alias (str): The language of the code block header.
+
+        Returns:
+            Language: The language, or None if no section declares the alias.
+        """
+        return self._by_alias.get(alias)
+
+    def __getitem__(self, name: str) -> Language:
+        return self._languages[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._languages
+
+    def __iter__(self) -> Iterator[Language]:
+        return iter(self._languages.values())
+
+    def __len__(self) -> int:
+        return len(self._languages)
 
 
 class ConfigLoader:
@@ -51,6 +317,9 @@ class ConfigLoader:
             Path.home() / ".config" / CONFIG_DIR_NAME / CONFIG_FILE_NAME
         )
         self._config = None
+        self._defaults = None
+        self._languages = None
+        self._sources = {}
 
     @property
     def config(self):
@@ -58,19 +327,182 @@ class ConfigLoader:
             self._config = self._get_config()
         return self._config
 
+    @property
+    def languages(self) -> LanguageTable:
+        """The lookup tables of the language sections, compiled on first use."""
+        if self._languages is None:
+            self._compile()
+        return self._languages
+
+    @property
+    def defaults(self) -> Dict[str, str]:
+        """The settings of the DEFAULT section, compiled on first use."""
+        if self._defaults is None:
+            self._compile()
+        return self._defaults
+
+    @property
+    def layer_paths(self) -> List[Path]:
+        """Paths to the configuration layers, from the lowest to the highest precedence."""
+        paths = [self.default_config_path]
+        project_path = find_project_config()
+        if project_path is not None and project_path != self.default_config_path:
+            paths.append(project_path)
+        env_path = os.environ.get(CONFIG_ENV_VAR)
+        if env_path:
+            paths.append(Path(env_path).absolute())
+        return paths
+
+    @property
+    def sources(self) -> Dict[str, Dict[str, Path]]:
+        """The layer setting each key of each section of the merged configuration."""
+        if self._config is None:
+            self._config = self._get_config()
+        return self._sources
+
+    @property
+    def snapshot_path(self) -> Path:
+        """Path to the compiled snapshot of the configuration layers."""
+        layers = "\0".join(str(path) for path in self.layer_paths)
+        name = hashlib.sha1(layers.encode("utf-8")).hexdigest()
+        return get_cache_path() / SNAPSHOT_DIR_NAME / f"{name}.json"
+
+    def _compile(self) -> None:
+        """
+        Compile the settings and language tables of the configuration.
+
+        They are loaded from the snapshot of the configuration layers when it is still valid.
+        Otherwise the layers are parsed, merged and validated, and a new snapshot is written.
+        """
+        with span("load config", "config"):
+            if self._load_snapshot():
+                return
+
+            layer_paths = self.layer_paths
+            try:
+                stats = [os.stat(path) for path in layer_paths]
+                digests = [file_digest(path) for path in layer_paths]
+            except OSError:
+                stats = digests = None
+
+            config = self.config
+            self._defaults = dict(config["DEFAULT"])
+            self._languages = LanguageTable(config)
+
+            # Only store the snapshot if no layer changed while they were parsed
+            if stats is None:
+                return
+            try:
+                current = [os.stat(path) for path in layer_paths]
+            except OSError:
+                return
+            if all(
+                (stat.st_size, stat.st_mtime_ns) == (now.st_size, now.st_mtime_ns)
+                for stat, now in zip(stats, current)
+            ):
+                self._write_snapshot(
+                    {
+                        "key": [SNAPSHOT_FORMAT_VERSION, __version__],
+                        "layers": [
+                            {
+                                "path": str(path),
+                                "size": stat.st_size,
+                                "mtime_ns": stat.st_mtime_ns,
+                                "hash": digest,
+                            }
+                            for path, stat, digest in zip(layer_paths, stats, digests)
+                        ],
+                        "defaults": self._defaults,
+                        "languages": self._languages.to_dicts(),
+                    }
+                )
+
+    def _load_snapshot(self) -> bool:
+        """
+        Load the compiled configuration from its snapshot.
+
+        The snapshot is valid if each configuration layer has the same size and modification
+        time, or the same content if it was only touched.
+
+        Returns:
+            bool: True if the snapshot was valid and loaded.
+        """
+        layer_paths = self.layer_paths
+        try:
+            stats = [os.stat(path) for path in layer_paths]
+            with open(self.snapshot_path, "r") as fsnapshot:
+                data = json.load(fsnapshot)
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("key") != [
+            SNAPSHOT_FORMAT_VERSION,
+            __version__,
+        ]:
+            return False
+        layers = data.get("layers")
+        if not isinstance(layers, list) or len(layers) != len(layer_paths):
+            return False
+
+        touched = False
+        for path, stat, layer in zip(layer_paths, stats, layers):
+            if (
+                not isinstance(layer, dict)
+                or layer.get("path") != str(path)
+                or layer.get("size") != stat.st_size
+            ):
+                return False
+            if layer.get("mtime_ns") != stat.st_mtime_ns:
+                try:
+                    if file_digest(path) != layer.get("hash"):
+                        return False
+                except OSError:
+                    return False
+                layer["mtime_ns"] = stat.st_mtime_ns
+                touched = True
+        if touched:
+            self._write_snapshot(data)
+
+        try:
+            self._defaults = dict(data["defaults"])
+            self._languages = LanguageTable.from_dicts(data["languages"])
+        except (KeyError, TypeError, ValueError):
+            self._defaults = self._languages = None
+            return False
+        return True
+
+    def _write_snapshot(self, data: dict) -> None:
+        """
+        Write the snapshot of the configuration atomically.
+
+        Args:
+            data (dict): The content of the snapshot.
+        """
+        path = self.snapshot_path
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=path.parent, prefix=".config-", delete=False
+            ) as fsnapshot:
+                json.dump(data, fsnapshot)
+            os.replace(fsnapshot.name, path)
+        except OSError:
+            # The snapshot only speeds up the next runs
+            pass
+
     @functools.cache
     def _get_config(self) -> configparser.ConfigParser:
         """
-        Load and validate the configuration file.
+        Load and validate the configuration layers.
 
-        If the config file doesn't exist, it creates a default one.
-        Then it loads the config and validates it.
+        If the user config file doesn't exist, it creates a default one.
+        Then it loads and merges the layers and validates the result.
 
         Returns:
             configparser.ConfigParser: Loaded and validated configuration object.
 
         Raises:
-            FileNotFoundError: If the config file cannot be created or accessed.
+            FileNotFoundError: If a config file cannot be created or accessed.
             ValueError: If the configuration is invalid.
         """
         if not os.path.exists(self.default_config_path):
@@ -90,24 +522,37 @@ class ConfigLoader:
 
     def _load_config(self) -> configparser.ConfigParser:
         """
-        Load the configuration file.
+        Load the configuration layers and merge them.
+
+        Each layer overrides the keys it defines in the previous layers. The layer setting each
+        key is recorded in `sources`.
 
         Returns:
             configparser.ConfigParser: Loaded configuration object.
 
         Raises:
-            FileNotFoundError: If the configuration file is not found.
-            ValueError: If the configuration file is invalid.
+            FileNotFoundError: If a configuration file is not found.
+            ValueError: If a configuration file is invalid.
         """
-        config_path = self.default_config_path
+        config = configparser.ConfigParser()
+        sources = {}
+        for config_path in self.layer_paths:
+            if not config_path.exists():
+                raise FileNotFoundError(
+                    f"Configuration file not found at {config_path}"
+                )
 
-        if not config_path.exists():
-            raise FileNotFoundError(f"Configuration file not found at {config_path}")
+            # Read the layer on its own so the DEFAULT section is not inherited by the others
+            layer = configparser.ConfigParser(default_section="", interpolation=None)
+            if not layer.read(config_path):
+                raise ValueError(f"Error reading configuration file at {config_path}")
 
-        config = configparser.ConfigParser()
-        if not config.read(config_path):
-            raise ValueError(f"Error reading configuration file at {config_path}")
+            settings = {section: dict(layer[section]) for section in layer.sections()}
+            config.read_dict(settings, source=str(config_path))
+            for section, keys in settings.items():
+                sources.setdefault(section, {}).update(dict.fromkeys(keys, config_path))
 
+        self._sources = sources
         return config
 
     def _copy_config(self) -> None:
@@ -132,6 +577,21 @@ class ConfigLoader:
         except Exception as e:
             raise FileNotFoundError(e)
 
+    def _get_default(self, key: str, fallback, convert=int):
+        """
+        Retrieve a setting of the DEFAULT section.
+
+        Args:
+            key (str): The name of the setting.
+            fallback: The value returned if the setting is not defined.
+            convert (Callable): The function converting the value of the setting.
+
+        Returns:
+            The converted value of the setting, or the fallback.
+        """
+        value = self.defaults.get(key)
+        return fallback if value is None else convert(value)
+
     def get_histsize(self) -> int:
         """
         Retrieve the history size from the configuration.
@@ -139,34 +599,99 @@ class ConfigLoader:
         Returns:
             int: The history size.
         """
-        return self.config["DEFAULT"].getint("histsize", 100)
+        return self._get_default("histsize", 100)
 
-    def get_all_aliases(self) -> List[str]:
+    def get_history_backend(self) -> str:
         """
-        Retrieve a list of all language aliases from the configuration.
+        Retrieve the backend storing the command history.
 
-        Args:
-            config (configparser.ConfigParser): Configuration object to read aliases from.
+        Returns:
+            str: jsonl for the history log, sqlite for the history database.
+        """
+        return self._get_default("history_backend", "jsonl", parse_history_backend)
+
+    def get_jobs(self) -> int:
+        """
+        Retrieve the default number of processes parsing the Markdown files from the configuration.
 
         Returns:
-            List[str]: List of all aliases across all language sections.
+            int: The number of jobs, 0 meaning all available cores.
         """
-        aliases = []
+        return self._get_default("jobs", 1)
 
-        # Iterate over all sections in the config
-        for section in self.config.sections():
-            if section.startswith("lang."):
-                # Get aliases for the section
-                section_aliases = self.config[section].get("aliases", "")
-                if section_aliases:
-                    # Split aliases by comma and strip whitespace
-                    aliases.extend(
-                        alias.strip() for alias in section_aliases.split(",")
-                    )
+    def get_run_jobs(self) -> int:
+        """
+        Retrieve the default number of code blocks run at the same time from the configuration.
+
+        Returns:
+            int: The number of code blocks, 0 meaning all available cores.
+        """
+        return self._get_default("run_jobs", 1)
 
-        return aliases
+    def get_unique_names(self) -> bool:
+        """
+        Retrieve whether code block names are declared unique in the configuration.
+
+        Returns:
+            bool: True if a block name identifies a single block.
+        """
+        return self._get_default("unique_names", False, parse_boolean)
+
+    def get_workers(self) -> bool:
+        """
+        Retrieve whether blocks run in warm interpreter workers by default.
+
+        Returns:
+            bool: True if the worker pool is enabled.
+        """
+        return self._get_default("workers", False, parse_boolean)
 
-    def find_language(self, alias: str) -> str:
+    def get_worker_max_blocks(self) -> int:
+        """
+        Retrieve the number of blocks executed by a worker before it is restarted.
+
+        Returns:
+            int: The number of blocks.
+        """
+        return self._get_default("worker_max_blocks", 100)
+
+    def get_result_cache_size(self) -> int:
+        """
+        Retrieve the maximum size of the result cache.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return self._get_default("result_cache_size_mb", 100) << 20
+
+    def get_cache(self) -> bool:
+        """
+        Retrieve whether the result cache is used by default.
+
+        Returns:
+            bool: True if `run` replays the results of cached blocks without `--cache`.
+        """
+        return self._get_default("cache", False, parse_boolean)
+
+    def get_ignore_patterns(self) -> List[str]:
+        """
+        Retrieve the ignore patterns applied when searching for Markdown files.
+
+        Returns:
+            List[str]: The patterns, with the syntax of `.gitignore`.
+        """
+        return self._get_default("ignore", [], str.split)
+
+    def get_all_aliases(self) -> List[str]:
+        """
+        Retrieve a list of all language aliases from the configuration.
+
+        Returns:
+            List[str]: List of all aliases across all language sections.
+        """
+        return list(self.languages.aliases)
+
+    def find_language(self, alias: str) -> Optional[str]:
         """
         Find the language associated with a given alias.
 
@@ -176,24 +701,8 @@ class ConfigLoader:
         Returns:
             str: The language associated with the alias, or None if not found.
         """
-        for section in self.config.sections():
-            if section.startswith("lang.") and alias in self.config[section].get(
-                "aliases", ""
-            ):
-                return section.split(".")[1]
-        return None
-
-        # Does not work for python for a reason or another...
-        # lang_section = next(
-        #    (
-        #        section
-        #        for section in self.config.sections()
-        #        if section.startswith("lang.")
-        #        and alias in self.config[section].get("aliases", "").split(",")
-        #    ),
-        #    None,
-        # )
-        # return lang_section.split(".")[1]
+        language = self.languages.find(alias)
+        return language.name if language is not None else None
 
     def get_language_options(self, language: str) -> List[str]:
         """
@@ -203,9 +712,9 @@ class ConfigLoader:
             language: The language to get options for.
 
         Returns:
-            Dict[str, str]: A dictionary of options for the specified language.
+            List[str]: The options of the language.
         """
-        return self.config[f"lang.{language}"].get("options", "").split()
+        return list(self.languages[language].options)
 
     def _validate_lang_section(self, section):
         # Define required keys for each language section
@@ -240,6 +749,14 @@ class ConfigLoader:
                 f"Section '{section}' has an invalid 'options' field. It should be a string."
             )
 
+        # Validate 'delivery' to be a known mode
+        delivery = section.get("delivery", "auto").strip().lower()
+        if delivery not in DELIVERY_MODES:
+            raise ValueError(
+                f"Section '{section}' has an invalid 'delivery' field. It should be one of: "
+                f"{', '.join(DELIVERY_MODES)}."
+            )
+
     def _validate_config(self, config: configparser.ConfigParser) -> None:
         """
         Validate the configuration to ensure it contains required sections and fields.
@@ -248,9 +765,50 @@ class ConfigLoader:
             config (configparser.ConfigParser): Configuration object to validate.
         """
 
+        # Validate the settings of the DEFAULT section
+        for key, convert in DEFAULT_KEYS.items():
+            value = config["DEFAULT"].get(key)
+            if value is None:
+                continue
+            try:
+                converted = convert(value)
+                if convert is int and converted < 0:
+                    raise ValueError(value)
+            except ValueError:
+                source = self._sources.get("DEFAULT", {}).get(key, "the configuration")
+                raise ValueError(
+                    f"Setting '{key}' has an invalid value in {source}: '{value}'."
+                )
+
         # Iterate over all sections in the config
         for section in config.sections():
             if section.startswith("lang."):
 
                 # Validate language sections
                 self._validate_lang_section(config[section])
+
+
+def print_config(config: ConfigLoader, out: Optional[TextIO] = None) -> None:
+    """
+    Print the configuration layers and the resolved settings with their source.
+
+    The settings are printed in the INI format, each one followed by the file it comes from.
+
+    Args:
+        config (ConfigLoader): The configuration.
+        out (TextIO): Stream receiving the configuration, sys.stdout if None.
+    """
+    sources = config.sources
+    print("# Configuration layers, by increasing precedence:", file=out)
+    for config_path in config.layer_paths:
+        print(f"#   {config_path}", file=out)
+
+    for section in ["DEFAULT"] + config.config.sections():
+        keys = sources.get(section)
+        if not keys:
+            continue
+        print(f"\n[{section}]", file=out)
+        for key, source in keys.items():
+            # Continuation lines of multi-line values are indented
+            value = config.config[section].get(key, raw=True).replace("\n", "\n    ")
+            print(f"{key} = {value}  ; {source}", file=out)
@@ -0,0 +1,237 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+SQLite History Database
+
+This module provides the SQLite backend of the command history, enabled with
+`history_backend = sqlite` in the `[DEFAULT]` section of the configuration. Along with each run,
+it stores the name, file, duration, exit code and resource usage of the code blocks it ran, and
+answers the filters of `runmd hist` with indexed queries.
+
+The database is opened in WAL mode, so commands reading the history do not block the runs
+recording theirs. Deleting a run deletes its blocks.
+
+Classes:
+    - HistoryDatabase: SQLite store of the runs and of the code blocks they ran.
+
+Constants:
+    - DATABASE_FILE_NAME: Name of the database file.
+    - SCHEMA_VERSION: Version of the database schema.
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import List, Optional
+
+from .history import get_history_path, history_entry, load_history
+
+DATABASE_FILE_NAME = "history.sqlite3"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    root TEXT NOT NULL,
+    command TEXT NOT NULL,
+    status TEXT NOT NULL,
+    wall REAL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    file TEXT,
+    line INTEGER,
+    lang TEXT,
+    status TEXT,
+    returncode INTEGER,
+    cached INTEGER NOT NULL DEFAULT 0,
+    wall REAL,
+    user REAL,
+    system REAL,
+    max_rss_kb INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_root ON runs (root);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (date);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status);
+CREATE INDEX IF NOT EXISTS blocks_name ON blocks (name);
+CREATE INDEX IF NOT EXISTS blocks_run_id ON blocks (run_id);
+"""
+BLOCK_FIELDS = (
+    "name",
+    "file",
+    "line",
+    "lang",
+    "status",
+    "returncode",
+    "cached",
+    "wall",
+    "user",
+    "system",
+    "max_rss_kb",
+)
+
+
+class HistoryDatabase:
+    """
+    SQLite store of the runs and of the code blocks they ran.
+
+    The database is created next to the history log. When it is created, the entries of the
+    history log are imported with their IDs.
+
+    Attributes:
+        path (Path): Path to the database file.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = (
+            get_history_path().with_name(DATABASE_FILE_NAME) if path is None else path
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Wait for the runs writing at the same time instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=10)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] == 0:
+            self._create()
+
+    def _create(self) -> None:
+        """Create the schema of the database and import the history log."""
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.executescript(SCHEMA)
+            # A run creating the database at the same time may have done it already
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] == 0:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO runs (id, date, root, command, status)"
+                    " VALUES (:id, :date, :root, :command, :status)",
+                    load_history(),
+                )
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __enter__(self) -> "HistoryDatabase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        self.connection.close()
+
+    def record(self, histsize: int, command: str, success: bool, report=None) -> int:
+        """
+        Record a run and the code blocks it ran, keeping the last `histsize` runs.
+
+        Args:
+            histsize (int): Maximum number of runs to remember.
+            command (str): The runmd command line.
+            success (bool): Whether the run succeeded.
+            report (RunReport): The resource usage of the code blocks, if collected.
+
+        Returns:
+            int: The ID of the run.
+        """
+        entry = history_entry(None, command, success)
+        entry["wall"] = report.to_dict(success)["wall"] if report is not None else None
+        with self.connection:
+            run_id = self.connection.execute(
+                "INSERT INTO runs (date, root, command, status, wall)"
+                " VALUES (:date, :root, :command, :status, :wall)",
+                entry,
+            ).lastrowid
+            if report is not None:
+                self.connection.executemany(
+                    f"INSERT INTO blocks (run_id, {', '.join(BLOCK_FIELDS)})"
+                    f" VALUES (?{', ?' * len(BLOCK_FIELDS)})",
+                    [
+                        (run_id, *(block[field] for field in BLOCK_FIELDS))
+                        for block in report.blocks
+                    ],
+                )
+            self.connection.execute(
+                "DELETE FROM runs WHERE id <= ?", (run_id - max(histsize, 1),)
+            )
+        return run_id
+
+    def find(self, run_id: int) -> Optional[dict]:
+        """
+        Find a run by ID.
+
+        Args:
+            run_id (int): The ID of the run.
+
+        Returns:
+            dict: The run, or None if it is not in the history.
+        """
+        row = self.connection.execute(
+            "SELECT id, date, root, command, status FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def query(
+        self,
+        root: Optional[str] = None,
+        failed: bool = False,
+        since: Optional[str] = None,
+        block: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Return the runs matching the filters, in order.
+
+        Args:
+            root (str): Only the runs started from this directory.
+            failed (bool): Only the failed runs.
+            since (str): Only the runs started at or after this ISO date.
+            block (str): Only the runs of a code block with this name. The matching blocks are
+                returned in the `blocks` list of each run.
+
+        Returns:
+            list[dict]: The runs, as history entries.
+        """
+        conditions, parameters = [], []
+        if root is not None:
+            conditions.append("root = ?")
+            parameters.append(os.path.abspath(root))
+        if failed:
+            conditions.append("status = 'FAIL'")
+        if since is not None:
+            conditions.append("date >= ?")
+            parameters.append(since)
+        if block is not None:
+            conditions.append("id IN (SELECT run_id FROM blocks WHERE name = ?)")
+            parameters.append(block)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        runs = [
+            dict(row)
+            for row in self.connection.execute(
+                f"SELECT id, date, root, command, status FROM runs{where} ORDER BY id",
+                parameters,
+            )
+        ]
+
+        if block is not None and runs:
+            by_id = {run["id"]: run for run in runs}
+            for run in runs:
+                run["blocks"] = []
+            for row in self.connection.execute(
+                f"SELECT run_id, {', '.join(BLOCK_FIELDS)} FROM blocks"
+                f" WHERE name = ? AND run_id >= ? ORDER BY rowid",
+                (block, runs[0]["id"]),
+            ):
+                if row["run_id"] in by_id:
+                    by_id[row["run_id"]]["blocks"].append(dict(row))
+        return runs
+
+    def clear(self) -> None:
+        """Remove all the runs and their code blocks."""
+        with self.connection:
+            self.connection.execute("DELETE FROM runs")
@@ -0,0 +1,139 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Code Delivery
+
+This module provides the ways the code of a block reaches its interpreter. The mode is set with
+the `delivery` key of a `lang.*` section:
+
+    - argv: The code is the last argument of the command, after the `options`.
+    - stdin: The code is written to the standard input of the interpreter, which is given `-` as
+      script, after the `script_options`.
+    - fd: The code is written to an anonymous in-memory file (`memfd`), which the interpreter
+      reads as `/dev/fd/N`, after the `script_options`. Falls back to stdin where `memfd` is not
+      available.
+    - auto (default): argv, unless the code is too large to be passed as an argument.
+
+Passing the code as an argument exposes it in the process list and fails with E2BIG once it
+exceeds the kernel limit on the size of an argument (128 KiB on Linux). The other modes have
+neither issue and never write the code to disk.
+
+Functions:
+    - write_input: Write data to the standard input of a process, then close it.
+
+Classes:
+    - CodeDelivery: The arguments and inputs delivering the code of a block to its interpreter.
+
+Constants:
+    - DELIVERY_MODES: The valid values of the `delivery` key.
+    - MAX_ARGUMENT_SIZE: Size from which `auto` stops passing the code as an argument.
+    - DEFAULT_SCRIPT_OPTIONS: Script options of the default language sections.
+"""
+
+import os
+from typing import IO, Optional
+
+DELIVERY_MODES = ("auto", "argv", "stdin", "fd")
+# MAX_ARG_STRLEN of Linux, the smallest limit on a single argument across platforms
+MAX_ARGUMENT_SIZE = 1 << 17
+HAS_MEMFD = hasattr(os, "memfd_create")
+# Node.js resolves the real path of its script, which does not exist for an in-memory file
+DEFAULT_SCRIPT_OPTIONS = {"lang.javascript": "--preserve-symlinks-main"}
+
+
+def write_input(stream: IO[bytes], data: bytes) -> None:
+    """
+    Write data to the standard input of a process, then close it.
+
+    Args:
+        stream (IO[bytes]): The standard input of the process.
+        data (bytes): The data to write.
+    """
+    try:
+        stream.write(data)
+        stream.close()
+    except OSError:
+        # The interpreter exited without reading all its input
+        pass
+
+
+class CodeDelivery:
+    """
+    The arguments and inputs delivering the code of a block to its interpreter.
+
+    The in-memory file of the `fd` mode must be passed to the interpreter with `pass_fds`, and is
+    closed when the context manager exits, once the interpreter is started.
+
+    Attributes:
+        mode (str): The effective mode: argv, stdin or fd.
+        arguments (list): Arguments following the command.
+        input (bytes): Data to write to the standard input of the interpreter, or None.
+        fd (int): File descriptor holding the code, or None.
+    """
+
+    def __init__(
+        self,
+        code: str,
+        mode: str = "auto",
+        options: Optional[list] = None,
+        script_options: Optional[list] = None,
+    ):
+        data = code.encode("utf-8")
+        if mode == "auto":
+            mode = "argv" if len(data) < MAX_ARGUMENT_SIZE else "fd"
+        if mode == "fd" and not HAS_MEMFD:
+            mode = "stdin"
+
+        self.mode = mode
+        self.input = None
+        self.fd = None
+        if mode == "argv":
+            self.arguments = list(options or []) + [code]
+        elif mode == "stdin":
+            self.arguments = list(script_options or []) + ["-"]
+            self.input = data
+        else:
+            self.fd = os.memfd_create("runmd", os.MFD_CLOEXEC)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.fd, view) :]
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            self.arguments = list(script_options or []) + [f"/dev/fd/{self.fd}"]
+
+    @classmethod
+    def for_language(cls, code: str, language) -> "CodeDelivery":
+        """
+        Build the delivery of a code block from the settings of its language.
+
+        Args:
+            code (str): The code of the block.
+            language (Language): The language of the block.
+
+        Returns:
+            CodeDelivery: The delivery of the code.
+        """
+        return cls(code, language.delivery, language.options, language.script_options)
+
+    @property
+    def pass_fds(self) -> tuple:
+        """File descriptors to keep open in the interpreter process."""
+        return () if self.fd is None else (self.fd,)
+
+    def __enter__(self) -> "CodeDelivery":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the in-memory file, which the interpreter keeps open on its side."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
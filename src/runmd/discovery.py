@@ -0,0 +1,234 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Markdown File Discovery
+
+This module provides functions to find the Markdown files to process. Directories are walked with
+`os.scandir` and pruned as early as possible: hidden and vendor directories are skipped by default,
+and the patterns of `.gitignore` and `.runmdignore` files are honoured.
+
+Functions:
+    - glob_to_regex: Translate a gitignore-style glob pattern to a regular expression.
+    - parse_ignore_patterns: Parse ignore patterns written with the syntax of `.gitignore`.
+    - load_ignore_file: Load the patterns of an ignore file.
+    - is_ignored: Check if a path is ignored by a list of ignore rules.
+    - find_markdown_files: Find the Markdown files in a directory tree.
+
+Constants:
+    - IGNORE_FILES: Names of the files containing ignore patterns.
+    - EXCLUDED_DIRS: Names of the directories skipped by default.
+    - DEFAULT_INCLUDE: Default glob patterns of the files to process.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+IGNORE_FILES = (".gitignore", ".runmdignore")
+EXCLUDED_DIRS = frozenset(
+    {"node_modules", "__pycache__", "venv", "site-packages", "bower_components"}
+)
+DEFAULT_INCLUDE = ("*.md",)
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """
+    Translate a gitignore-style glob pattern to a regular expression.
+
+    `**` matches any number of directories, `*` and `?` do not match `/`.
+
+    Args:
+        pattern (str): The glob pattern.
+
+    Returns:
+        re.Pattern: The compiled regular expression, matching a whole relative path.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            content = pattern[i + 1 : end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            regex += f"[{content}]"
+            i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(regex + r"\Z")
+
+
+def parse_ignore_patterns(lines: Iterable[str], base: str = "") -> List[tuple]:
+    """
+    Parse ignore patterns written with the syntax of `.gitignore`.
+
+    Args:
+        lines (Iterable[str]): The patterns, blank lines and `#` comments being skipped.
+        base (str): Path of the directory the patterns are relative to, relative to the walk root.
+
+    Returns:
+        List[tuple]: Ignore rules as (base, regex, negated, directory only, anchored) tuples.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.strip("/") if dir_only else line
+        anchored = "/" in line
+        rules.append(
+            (base, glob_to_regex(line.lstrip("/")), negated, dir_only, anchored)
+        )
+    return rules
+
+
+def load_ignore_file(path: str, base: str) -> List[tuple]:
+    """
+    Load the patterns of an ignore file.
+
+    Args:
+        path (str): Path to the ignore file.
+        base (str): Path of the directory containing the file, relative to the walk root.
+
+    Returns:
+        List[tuple]: Ignore rules as (base, regex, negated, directory only, anchored) tuples.
+    """
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as fignore:
+            lines = fignore.read().splitlines()
+    except OSError:
+        return []
+    return parse_ignore_patterns(lines, base)
+
+
+def is_ignored(relpath: str, is_dir: bool, rules: List[tuple]) -> bool:
+    """
+    Check if a path is ignored by a list of ignore rules.
+
+    As with git, the last matching rule wins.
+
+    Args:
+        relpath (str): Path relative to the walk root, with `/` separators.
+        is_dir (bool): Whether the path is a directory.
+        rules (List[tuple]): Ignore rules returned by `load_ignore_file`.
+
+    Returns:
+        bool: True if the path is ignored.
+    """
+    ignored = False
+    for base, regex, negated, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not relpath.startswith(base + "/"):
+                continue
+            path = relpath[len(base) + 1 :]
+        else:
+            path = relpath
+        target = path if anchored else path.rsplit("/", 1)[-1]
+        if regex.match(target):
+            ignored = not negated
+    return ignored
+
+
+def find_markdown_files(
+    root: str = ".",
+    max_depth: Optional[int] = None,
+    include: Optional[List[str]] = None,
+    skip_excluded: bool = True,
+    ignore: Optional[List[str]] = None,
+) -> Iterator[Path]:
+    """
+    Find the Markdown files in a directory tree.
+
+    Files of a directory are yielded in name order before its subdirectories are walked. Symbolic
+    links to directories are not followed.
+
+    Args:
+        root (str): Directory to walk.
+        max_depth (int): Maximum depth of the walk, 0 for the root directory only.
+        include (List[str]): Glob patterns of the files to process, matched against the path
+            relative to the root (or the file name for patterns without `/`).
+        skip_excluded (bool): Skip hidden and vendor directories.
+        ignore (List[str]): Ignore patterns applied from the root, before those of the ignore
+            files.
+
+    Yields:
+        Path: Paths to the Markdown files.
+    """
+    include_rules = [
+        (glob_to_regex(pattern.lstrip("/")), "/" in pattern)
+        for pattern in (include or DEFAULT_INCLUDE)
+    ]
+
+    def walk(directory: str, relbase: str, depth: int, rules: List[tuple]):
+        for name in IGNORE_FILES:
+            ignore_path = os.path.join(directory, name)
+            if os.path.isfile(ignore_path):
+                rules = rules + load_ignore_file(ignore_path, relbase)
+
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        subdirs = []
+        for entry in entries:
+            relpath = f"{relbase}/{entry.name}" if relbase else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+
+            if is_dir:
+                # Symbolic links to directories are not followed, which also avoids loops
+                if entry.is_symlink():
+                    continue
+                if skip_excluded and (
+                    entry.name.startswith(".") or entry.name in EXCLUDED_DIRS
+                ):
+                    continue
+                if not is_ignored(relpath, True, rules):
+                    subdirs.append((entry.path, relpath))
+                continue
+
+            if not any(
+                regex.match(relpath if anchored else entry.name)
+                for regex, anchored in include_rules
+            ):
+                continue
+            if not is_ignored(relpath, False, rules):
+                yield Path(os.path.join(root, relpath) if root != "." else relpath)
+
+        if max_depth is None or depth < max_depth:
+            for path, relpath in subdirs:
+                yield from walk(path, relpath, depth + 1, rules)
+
+    yield from walk(root, "", 0, parse_ignore_patterns(ignore or []))
@@ -18,13 +18,22 @@ Functions:
     - load_process_env: Load the process environment variables
     - update_runenv: Update the .session file with the user environment variables
     - write_runenv: Write the .session file with the user environment variables
+    - decode_value: Decode a base64 value of the .session file
+
+Classes:
+    - SessionStore: In-memory view of the .session file, written back at once
 """
 
 import base64
+import binascii
 import os
+import tempfile
+import threading
 
 import dotenv
 
+SESSION_FILE = ".session"
+
 
 def load_dotenv():
     """
@@ -70,3 +79,98 @@ def merge_envs(env, runenv):
         key: base64.b64decode(value).decode("utf-8") for key, value in runenv.items()
     }
     env.update(decoded_env)
+
+
+def decode_value(value):
+    """
+    Decode a base64 value of the .session file
+
+    Args:
+        value (str): The encoded value
+
+    Returns:
+        str: The decoded value, or the value itself if it is not valid base64
+    """
+    try:
+        return base64.b64decode(value, validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        return value
+
+
+class SessionStore:
+    """
+    In-memory view of the .session file, written back at once
+
+    The file is read once, then values are read and updated in memory by all the code blocks of
+    a run. `flush` writes the file in a single atomic replacement, only if a value changed.
+
+    Attributes:
+        path (str): Path to the session file
+        values (dict): The decoded session variables
+    """
+
+    def __init__(self, path=SESSION_FILE):
+        self.path = path
+        self.values = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def load(self):
+        """Read the session file, discarding the values in memory"""
+        runenv = dotenv.dotenv_values(self.path) if os.path.exists(self.path) else {}
+        with self._lock:
+            self.values = {
+                key: decode_value(value or "") for key, value in runenv.items()
+            }
+            self._dirty = False
+
+    def apply(self, env):
+        """
+        Add the session variables to an environment
+
+        Args:
+            env (dict): The environment variables
+        """
+        with self._lock:
+            env.update(self.values)
+
+    def set(self, key, value):
+        """
+        Set a session variable
+
+        Args:
+            key (str): The name of the variable
+            value (str): The value of the variable
+        """
+        with self._lock:
+            if self.values.get(key) != value:
+                self.values[key] = value
+                self._dirty = True
+
+    def flush(self):
+        """Write the session file if a value changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            lines = [
+                f"{key}='{base64.b64encode(value.encode('utf-8')).decode('utf-8')}'\n"
+                for key, value in self.values.items()
+            ]
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                # Write to a temporary file first to ensure atomic write
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=directory, prefix=".session-", delete=False
+                ) as fsession:
+                    fsession.writelines(lines)
+                os.replace(fsession.name, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"Error writing session file: {e}")
@@ -14,17 +14,32 @@ This module provides functionality for managing command history in the 'runmd' C
 for reading from, writing to, and updating the command history file, as well as printing and
 cleaning command entries.
 
+The history is an append-only JSON Lines log: recording a command appends one line to the file,
+opened with `O_APPEND`, without reading the previous entries. The log is compacted to the last
+`histsize` entries once every `histsize` commands. A `history.json` file written by older versions
+is migrated to the log the first time it is used.
+
 Functions:
     - get_history_path: Return the path to the command history file.
-    - read_history: Read and return the command history from the file.
+    - migrate_history: Convert the history file of older versions to the history log.
+    - load_history: Read and return the command history from the file.
+    - parse_history: Decode the lines of the history log.
     - write_history: Write the command history to the file.
+    - read_last_entry: Read the last entry of the history log.
+    - open_history_log: Open the history log for appending and lock it.
+    - record_history: Append a command to the history file.
+    - history_entry: Build a history entry for a command.
     - update_history: Update the history with a new command and manage history size.
+    - find_history_entry: Find a command of the history by ID.
+    - parse_since: Parse the start date of the `--since` filter.
+    - filter_history: Select the commands of the history matching the filters of `runmd hist`.
     - print_history: Print the stored command history.
     - clean_command: Clean up the command string by removing unnecessary parts before the 'runmd'
       command.
 
-Attributes:
-    - None
+Constants:
+    - HISTORY_FILE_NAME: Name of the history log.
+    - LEGACY_HISTORY_FILE_NAME: Name of the history file of older versions.
 
 This module handles the persistent storage of command history, ensuring that the history file is
 updated accurately and can be used to track previous commands.
@@ -36,6 +51,15 @@ import os
 import re
 import tempfile
 from pathlib import Path
+from typing import Optional
+
+from .limits import parse_duration
+from .report import format_size
+
+HISTORY_FILE_NAME = "history.jsonl"
+LEGACY_HISTORY_FILE_NAME = "history.json"
+# Size of the chunks read backwards from the end of the log to find its last entry
+TAIL_CHUNK_SIZE = 4096
 
 
 def get_history_path() -> Path:
@@ -45,16 +69,46 @@ def get_history_path() -> Path:
     Returns:
         Path: The path to the history file.
     """
-    return Path.home() / ".config" / "runmd" / "history.json"
+    return Path.home() / ".config" / "runmd" / HISTORY_FILE_NAME
+
+
+def migrate_history() -> None:
+    """
+    Convert the history file of older versions to the history log.
+
+    The old file is removed once its entries are written to the log. Nothing is done if the log
+    already exists.
+    """
+    hist_path = get_history_path()
+    legacy_path = hist_path.with_name(LEGACY_HISTORY_FILE_NAME)
+    if hist_path.exists() or not legacy_path.exists():
+        return
+
+    try:
+        with open(legacy_path, "r") as fhistory:
+            history = json.load(fhistory)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Error migrating history file: {e}")
+        return
+    if not isinstance(history, list):
+        print(f"Error migrating history file: {legacy_path} is not a list of commands")
+        return
+
+    write_history(history)
+    if hist_path.exists():
+        legacy_path.unlink()
 
 
 def load_history() -> list:
     """
     Load the command history from the file.
 
+    Lines that cannot be decoded, such as a line cut by a crash, are skipped.
+
     Returns:
         list[dict]: A list of dictionaries representing command history.
     """
+    migrate_history()
     hist_path = get_history_path()
 
     if not hist_path.exists():
@@ -62,16 +116,38 @@ def load_history() -> list:
 
     try:
         with open(hist_path, "r") as fhistory:
-            history = json.load(fhistory)
-        return history
-    except (json.JSONDecodeError, IOError) as e:
+            return parse_history(fhistory)
+    except IOError as e:
         raise ValueError(f"Error reading history file: {e}") from e
 
 
+def parse_history(lines) -> list:
+    """
+    Decode the lines of the history log.
+
+    Args:
+        lines (Iterable[str]): The lines of the log.
+
+    Returns:
+        list[dict]: The entries of the valid lines.
+    """
+    history = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and "id" in entry:
+            history.append(entry)
+    return history
+
+
 def write_history(history: list) -> None:
     """
     Write the command history to the history file.
 
+    The whole log is replaced atomically.
+
     Args:
         history(list[dict]): The command history to be written.
     """
@@ -83,13 +159,137 @@ def write_history(history: list) -> None:
         with tempfile.NamedTemporaryFile(
             "w", dir=hist_path.parent, delete=False
         ) as dumpfile:
-            json.dump(history, dumpfile, indent=2)
+            for entry in history:
+                dumpfile.write(json.dumps(entry) + "\n")
         # Rename the temporary file to the final file
         Path(dumpfile.name).replace(hist_path)
     except IOError as e:
         print(f"Error writing history file: {e}")
 
 
+def read_last_entry(fd: int) -> Optional[dict]:
+    """
+    Read the last entry of the history log, reading the file backwards from its end.
+
+    Args:
+        fd (int): File descriptor of the log, opened for reading.
+
+    Returns:
+        dict: The last valid entry, or None if the log has none.
+    """
+    end = os.fstat(fd).st_size
+    tail = b""
+    while end > 0:
+        start = max(0, end - TAIL_CHUNK_SIZE)
+        os.lseek(fd, start, os.SEEK_SET)
+        tail = os.read(fd, end - start) + tail
+        end = start
+        # The first line of the tail may be incomplete until the start of the file is reached
+        lines = tail.splitlines()
+        for line in reversed(lines if end == 0 else lines[1:]):
+            entries = parse_history([line])
+            if entries:
+                return entries[0]
+    return None
+
+
+def open_history_log(hist_path: Path) -> int:
+    """
+    Open the history log for appending and lock it.
+
+    On POSIX systems, the log is locked exclusively so concurrent runmd commands number their
+    entries in sequence. The log is opened again if it was replaced by a compaction while waiting
+    for the lock.
+
+    Args:
+        hist_path (Path): Path to the history log.
+
+    Returns:
+        int: The file descriptor of the log.
+    """
+    while True:
+        fd = os.open(hist_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.name != "posix":
+            return fd
+        import fcntl
+
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.path.samestat(os.fstat(fd), os.stat(hist_path)):
+                return fd
+        except OSError:
+            pass
+        os.close(fd)
+
+
+def record_history(histsize: int, command: str, success: bool) -> None:
+    """
+    Append a command to the history file.
+
+    Only the last entry of the log is read to number the new one. The log is compacted to the
+    last `histsize` entries when the number of the new entry is a multiple of `histsize`, so it
+    never holds more than twice that number of entries.
+
+    Args:
+        histsize(int): Maximum number of commands to remember.
+        command(str): The command to add to the history.
+        success(bool): Whether the command was successful or not.
+    """
+    migrate_history()
+    hist_path = get_history_path()
+    try:
+        hist_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = open_history_log(hist_path)
+    except OSError as e:
+        print(f"Error writing history file: {e}")
+        return
+
+    try:
+        last = read_last_entry(fd)
+        entry = history_entry(last["id"] + 1 if last else 0, command, success)
+        line = json.dumps(entry) + "\n"
+        # Terminate a line cut by a crash so the new entry starts on its own line
+        size = os.fstat(fd).st_size
+        if size:
+            os.lseek(fd, size - 1, os.SEEK_SET)
+            if os.read(fd, 1) != b"\n":
+                line = "\n" + line
+        # A single write of a whole line with O_APPEND is never interleaved with another one
+        os.write(fd, line.encode("utf-8"))
+
+        if histsize > 0 and entry["id"] > 0 and entry["id"] % histsize == 0:
+            with open(fd, "r", closefd=False) as fhistory:
+                fhistory.seek(0)
+                history = parse_history(fhistory)
+            write_history(history[-histsize:])
+    except OSError as e:
+        print(f"Error writing history file: {e}")
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
+
+
+def history_entry(entry_id: int, command: str, success: bool) -> dict:
+    """
+    Build a history entry for a command run from the current directory.
+
+    Args:
+        entry_id(int): The ID of the entry.
+        command(str): The command to add to the history.
+        success(bool): Whether the command was successful or not.
+
+    Returns:
+        dict: The history entry.
+    """
+    return {
+        "id": entry_id,
+        "date": datetime.datetime.now().isoformat(),  # Store date as ISO formatted string
+        "root": os.getcwd(),
+        "command": clean_command(command),
+        "status": "SUCCESS" if success else "FAIL",
+    }
+
+
 def update_history(history: list, histsize: int, command: str, success: bool) -> list:
     """
     Update the history list with a new command.
@@ -106,22 +306,76 @@ def update_history(history: list, histsize: int, command: str, success: bool) ->
     # Get the next command ID
     next_id = history[-1]["id"] + 1 if history else 0
 
-    status = "SUCCESS" if success else "FAIL"
-
-    history.append(
-        {
-            "id": next_id,
-            "date": datetime.datetime.now().isoformat(),  # Store date as ISO formatted string
-            "root": os.getcwd(),
-            "command": clean_command(command),
-            "status": status,
-        }
-    )
+    history.append(history_entry(next_id, command, success))
 
     # Limit the history size
     return history[-histsize:]
 
 
+def find_history_entry(history: list, entry_id: int) -> Optional[dict]:
+    """
+    Find a command of the history by ID.
+
+    Args:
+        history(list[dict]): The command history.
+        entry_id(int): The ID of the command.
+
+    Returns:
+        dict: The history entry, or None if the command is not in the history.
+    """
+    return next((entry for entry in history if entry["id"] == entry_id), None)
+
+
+def parse_since(text: str) -> str:
+    """
+    Parse the start date of the `--since` filter.
+
+    Args:
+        text (str): An ISO date such as `2024-12-01` or `2024-12-01T08:00`, or a duration before
+            now such as `2h` or `7d`.
+
+    Returns:
+        str: The start date as an ISO date, comparable with the dates of the history.
+
+    Raises:
+        ValueError: If the text is neither a date nor a duration.
+    """
+    seconds = parse_duration(text)
+    if seconds is not None:
+        since = datetime.datetime.now() - datetime.timedelta(seconds=seconds)
+    else:
+        since = datetime.datetime.fromisoformat(text)
+    return since.isoformat()
+
+
+def filter_history(
+    history: list,
+    root: Optional[str] = None,
+    failed: bool = False,
+    since: Optional[str] = None,
+) -> list:
+    """
+    Select the commands of the history matching the filters of `runmd hist`.
+
+    Args:
+        history(list[dict]): The command history.
+        root(str): Only the commands run from this directory.
+        failed(bool): Only the failed commands.
+        since(str): Only the commands run at or after this ISO date.
+
+    Returns:
+        list[dict]: The matching commands.
+    """
+    root = os.path.abspath(root) if root is not None else None
+    return [
+        entry
+        for entry in history
+        if (root is None or entry["root"] == root)
+        and (not failed or entry["status"] == "FAIL")
+        and (since is None or entry["date"] >= since)
+    ]
+
+
 def print_history(history: list) -> None:
     """
     Print the last N commands stored in the history.
@@ -133,6 +387,13 @@ def print_history(history: list) -> None:
         print(
             f"{element['id']} {element['date']} {element['root']} {element['command']} {element['status']}"
         )
+        # Code blocks returned by the history database
+        for block in element.get("blocks", []):
+            wall = "-" if block["wall"] is None else f"{block['wall']:.2f}s"
+            print(
+                f"    {block['name']} {block['file']}:{block['line']} {block['status']} "
+                f"exit={block['returncode']} wall={wall} max_rss={format_size(block['max_rss_kb'])}"
+            )
 
 
 def clean_command(command: str) -> str:
@@ -0,0 +1,303 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Resource Limits of Code Blocks
+
+This module provides the limits enforced on the process running a code block: a wall-clock
+timeout, a memory limit and a CPU time limit. Limits are set with the `timeout=`, `max_memory=` and
+`max_cpu=` attributes of a code block, or with the keys of the same name in its `lang.*` section.
+
+Functions:
+    - parse_duration: Parse a duration such as `90`, `1.5s`, `2m`, `1h` or `7d`.
+    - parse_size: Parse a size such as `512M` or `2G`.
+    - kill_process_group: Kill a process and all its descendants.
+    - exit_status: Classify the exit of a code block.
+
+Classes:
+    - ResourceLimits: Limits enforced on the process of a code block.
+
+Constants:
+    - STATUS_OK, STATUS_FAILED, STATUS_TIMEOUT, STATUS_OOM: Exit statuses of a code block.
+    - SHELLS: Interpreters reporting a child killed by a signal as 128 + signal number.
+
+The memory and CPU time limits are applied with `prlimit` once the interpreter is started, or with
+`setrlimit` in the child process where `prlimit` is not available. A block with limits runs in a
+session of its own, so a block that is killed takes its descendants with it; other blocks keep the
+controlling terminal. Limits are only enforced on POSIX systems.
+"""
+
+import os
+import re
+import signal
+from typing import Callable, Optional
+
+STATUS_OK = "OK"
+STATUS_FAILED = "FAILED"
+STATUS_TIMEOUT = "TIMEOUT"
+STATUS_OOM = "OOM"
+
+DURATION_PATTERN = re.compile(
+    r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*(ms|s|m|h|d)?\s*$", re.IGNORECASE
+)
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+# Messages of interpreters failing to allocate memory
+MEMORY_ERROR_PATTERN = re.compile(
+    r"MemoryError|out of memory|cannot allocate memory|failed to allocate|bad_alloc",
+    re.IGNORECASE,
+)
+LIMIT_KEYS = ("timeout", "max_memory", "max_cpu")
+# Interpreters reporting a child killed by a signal as 128 + signal number
+SHELLS = frozenset(("sh", "bash", "dash", "ash", "ksh", "mksh", "zsh"))
+
+
+def parse_duration(text: Optional[str]) -> Optional[float]:
+    """
+    Parse a duration such as `90`, `1.5s`, `2m`, `1h` or `7d`.
+
+    Args:
+        text (str): The duration, in seconds if it has no unit.
+
+    Returns:
+        float: The duration in seconds, or None if the text is empty or invalid.
+    """
+    match = DURATION_PATTERN.match(text or "")
+    if match is None:
+        return None
+    seconds = float(match.group(1)) * DURATION_UNITS[(match.group(2) or "s").lower()]
+    return seconds or None
+
+
+def parse_size(text: Optional[str]) -> Optional[int]:
+    """
+    Parse a size such as `512M` or `2G`.
+
+    Args:
+        text (str): The size, in bytes if it has no unit. Units are powers of 1024.
+
+    Returns:
+        int: The size in bytes, or None if the text is empty or invalid.
+    """
+    match = SIZE_PATTERN.match(text or "")
+    if match is None:
+        return None
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()]) or None
+
+
+def kill_process_group(pid: int, group: bool = True) -> None:
+    """
+    Kill a process and all its descendants.
+
+    Args:
+        pid (int): The process ID, which is also its process group ID.
+        group (bool): Whether the process leads its own process group. Otherwise, only the
+            process is killed.
+    """
+    try:
+        if os.name == "posix" and group:
+            os.killpg(pid, signal.SIGKILL)
+        elif os.name == "posix":
+            os.kill(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except OSError:
+        # Already gone
+        pass
+
+
+class ResourceLimits:
+    """
+    Limits enforced on the process of a code block.
+
+    Attributes:
+        timeout (float): Wall-clock time after which the block is killed, in seconds.
+        max_memory (int): Maximum address space of the process, in bytes.
+        max_cpu (float): Maximum CPU time of the process, in seconds.
+    """
+
+    __slots__ = LIMIT_KEYS
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_memory: Optional[int] = None,
+        max_cpu: Optional[float] = None,
+    ):
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.max_cpu = max_cpu
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, key) for key in LIMIT_KEYS)
+
+    def __repr__(self) -> str:
+        return f"ResourceLimits(timeout={self.timeout!r}, max_memory={self.max_memory!r}, max_cpu={self.max_cpu!r})"
+
+    @classmethod
+    def from_section(cls, section) -> "ResourceLimits":
+        """
+        Read the default limits of a language section.
+
+        Args:
+            section (SectionProxy): The `lang.*` section, invalid values being ignored.
+
+        Returns:
+            ResourceLimits: The limits of the section.
+        """
+        return cls(
+            timeout=parse_duration(section.get("timeout")),
+            max_memory=parse_size(section.get("max_memory")),
+            max_cpu=parse_duration(section.get("max_cpu")),
+        )
+
+    @classmethod
+    def resolve(
+        cls, block, defaults: "ResourceLimits", timeout: Optional[float] = None
+    ) -> "ResourceLimits":
+        """
+        Combine the limits of a code block with the defaults of its language.
+
+        The attributes of the block take precedence over the timeout given on the command line,
+        which takes precedence over the defaults of the language section.
+
+        Args:
+            block (Block): The code block.
+            defaults (ResourceLimits): The limits of the language section.
+            timeout (float): Timeout given on the command line.
+
+        Returns:
+            ResourceLimits: The limits of the block.
+        """
+        return cls(
+            timeout=block.timeout or timeout or defaults.timeout,
+            max_memory=block.max_memory or defaults.max_memory,
+            max_cpu=block.max_cpu or defaults.max_cpu,
+        )
+
+    @property
+    def isolated(self) -> bool:
+        """
+        Whether the block runs in a session of its own, to be killed with its descendants.
+
+        Blocks without limits keep the controlling terminal of runmd, which password prompts such
+        as those of sudo or ssh need.
+        """
+        return os.name == "posix" and bool(self)
+
+    def rlimits(self) -> list:
+        """
+        Return the memory and CPU time limits as resource limits.
+
+        Returns:
+            list: The `(resource, (soft, hard))` pairs, empty if there is nothing to apply.
+        """
+        if os.name != "posix" or not (self.max_memory or self.max_cpu):
+            return []
+        import resource
+
+        rlimits = []
+        if self.max_memory:
+            rlimits.append((resource.RLIMIT_AS, (self.max_memory, self.max_memory)))
+        if self.max_cpu:
+            # SIGXCPU at the soft limit, SIGKILL one second later
+            seconds = max(1, int(self.max_cpu + 0.999))
+            rlimits.append((resource.RLIMIT_CPU, (seconds, seconds + 1)))
+        return rlimits
+
+    def preexec(self) -> Optional[Callable[[], None]]:
+        """
+        Return the function applying the limits in the child process, where `prlimit` is missing.
+
+        Running Python code between fork and exec is not safe while runmd has threads, so the
+        limits are applied with `apply` once the process is started wherever `prlimit` exists.
+
+        Returns:
+            Callable: The function to pass as `preexec_fn`, or None if there is nothing to apply.
+        """
+        rlimits = self.rlimits()
+        if not rlimits:
+            return None
+        import resource
+
+        if hasattr(resource, "prlimit"):
+            return None
+
+        def apply_limits() -> None:
+            for limit, values in rlimits:
+                resource.setrlimit(limit, values)
+
+        return apply_limits
+
+    def apply(self, pid: int) -> None:
+        """
+        Apply the limits to a started process with `prlimit`, where it is available.
+
+        Args:
+            pid (int): The process ID.
+        """
+        rlimits = self.rlimits()
+        if not rlimits:
+            return
+        import resource
+
+        if not hasattr(resource, "prlimit"):
+            return
+        for limit, values in rlimits:
+            try:
+                resource.prlimit(pid, limit, values)
+            except ProcessLookupError:
+                # Already exited
+                return
+
+
+def exit_status(
+    returncode: Optional[int],
+    limits: ResourceLimits,
+    timed_out: bool = False,
+    last_line: str = "",
+    shell: bool = False,
+) -> str:
+    """
+    Classify the exit of a code block.
+
+    A failed block with a memory limit is reported as OOM when it was killed by a signal or its
+    last line of output is an allocation error, since interpreters react differently to a failed
+    allocation. An exit code above 128 only means a signal when the interpreter is a shell, which
+    reports a child killed by a signal that way; other programs may exit with any code.
+
+    Args:
+        returncode (int): Exit code of the process, negative if it was killed by a signal.
+        limits (ResourceLimits): The limits of the block.
+        timed_out (bool): Whether the block was killed after its timeout.
+        last_line (str): Last line of output of the block.
+        shell (bool): Whether the interpreter is a shell.
+
+    Returns:
+        str: STATUS_OK, STATUS_FAILED, STATUS_TIMEOUT or STATUS_OOM.
+    """
+    if timed_out:
+        return STATUS_TIMEOUT
+    if returncode == 0:
+        return STATUS_OK
+
+    killed_by = 0
+    if returncode is not None and returncode < 0:
+        killed_by = -returncode
+    elif returncode is not None and shell and 0 < returncode - 128 < signal.NSIG:
+        killed_by = returncode - 128
+    if limits.max_cpu and killed_by in (
+        getattr(signal, "SIGXCPU", None),
+        getattr(signal, "SIGKILL", None),
+    ):
+        return STATUS_TIMEOUT
+    if limits.max_memory and (killed_by or MEMORY_ERROR_PATTERN.search(last_line)):
+        return STATUS_OOM
+    return STATUS_FAILED
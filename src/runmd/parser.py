@@ -16,25 +16,55 @@ and tag.
 
 Functions:
     - compile_pattern: Compile a regular expression pattern to match code blocks in Markdown files.
+    - detect_shebang: Detect the shebang used in a piece of code.
+    - parse_attributes: Parse the `{name=..., tag=...}` attributes of a code block header.
+    - parse_depends: Parse the `depends` attribute of a code block header.
+    - parse_limits: Parse the resource limit attributes of a code block header.
+    - iter_fences: Iterate over the fence lines of a Markdown document.
     - parse_markdown: Parse a Markdown file to extract code blocks and their metadata.
+    - iter_blocks: Lazily iterate over the code blocks of several Markdown files.
 
-The parsing functionality relies on regular expressions to identify and extract code blocks that
-include specified languages and metadata. The extracted code blocks are returned as a list of
-dictionaries containing relevant information.
+Classes:
+    - MarkdownScanner: Single-pass scanner yielding code blocks as it goes.
+
+The parsing functionality relies on a state machine that walks a memory-mapped file once, jumping
+from one fence line to the next. Only fence lines are matched against the header pattern, so parse
+time is linear in the file size and memory only holds the block being read. The extracted code
+blocks are returned as a list of `Block` objects.
 
 Usage:
-    - Use `compile_pattern` to create a regular expression pattern for matching code blocks.
-    - Use `parse_markdown` to read a Markdown file and extract code blocks based on the compiled
-      pattern and provided languages.
+    - Use `MarkdownScanner.scan` to lazily iterate over the code blocks of a Markdown file.
+    - Use `parse_markdown` to read a Markdown file and extract code blocks based on the provided
+      languages.
+    - Use `iter_blocks` to look for blocks across files and stop as soon as the wanted one is
+      found.
 """
 
+import heapq
+import mmap
+import os
 import re
+from typing import Iterable, Iterator
+
+from .block import Block
+from .limits import parse_duration, parse_size
+
+HEADER_PATTERN = re.compile(r"[ \t]*(?P<lang>[^\s{`~]+)[ \t]*\{(?P<attrs>.*)\}")
+ATTRIBUTE_PATTERN = re.compile(r"\s*([\w-]+)\s*=\s*(.*?)\s*(?:,(?=\s*[\w-]+\s*=)|$)")
+# One pattern per fence character: a literal prefix lets the regex engine skip prose quickly
+FENCE_PATTERNS = (re.compile(rb"(```+)([^\n]*)"), re.compile(rb"(~~~+)([^\n]*)"))
+# First line of a block, after leading blank lines and indentation
+SHEBANG_LINE_PATTERN = re.compile(rb"\s*(#![^\n]*)")
+SHEBANG_PATTERN = re.compile(r"^#![ \t]*(\S.*?)\s*$", re.MULTILINE)
 
 
 def compile_pattern(languages: list) -> re.Pattern:
     """
     Compile the regular expression pattern for matching code blocks.
 
+    This whole-document pattern is no longer used by `parse_markdown` and is kept for backward
+    compatibility and as a reference point for the scanner.
+
     Args:
         languages (List[str]): List of valid languages.
 
@@ -55,15 +85,199 @@ def detect_shebang(content: str) -> str:
         content (str): The content of the code block.
 
     Returns:
-        str: The shebang used in the code block.
+        str: The interpreter command line of the shebang (e.g. `/usr/bin/env bash`), or None.
+    """
+    match = SHEBANG_PATTERN.search(content)
+    return match.group(1) if match else None
+
+
+def parse_attributes(text: str) -> dict:
+    """
+    Parse the attributes of a code block header.
+
+    Attributes are `key=value` pairs separated by commas. A comma is only considered as a
+    separator when it is followed by another `key=`, so values may contain commas.
+
+    Args:
+        text (str): The text between the curly braces of the header.
+
+    Returns:
+        dict: The parsed attributes.
+    """
+    return {key: value for key, value in ATTRIBUTE_PATTERN.findall(text.strip())}
+
+
+def parse_depends(text: str) -> tuple:
+    """
+    Parse the `depends` attribute of a code block header.
+
+    Args:
+        text (str): Comma-separated names of code blocks.
+
+    Returns:
+        tuple: The names of the code blocks.
+    """
+    return tuple(name.strip() for name in text.split(",") if name.strip())
+
+
+def parse_limits(attributes: dict) -> dict:
+    """
+    Parse the `timeout`, `max_memory` and `max_cpu` attributes of a code block header.
+
+    Invalid values are reported and ignored.
+
+    Args:
+        attributes (dict): The attributes returned by `parse_attributes`.
+
+    Returns:
+        dict: The limits that are set, as keyword arguments of `Block`.
+    """
+    limits = {}
+    for key, parse in (
+        ("timeout", parse_duration),
+        ("max_memory", parse_size),
+        ("max_cpu", parse_duration),
+    ):
+        if key not in attributes:
+            continue
+        value = parse(attributes[key])
+        if value is None:
+            print(
+                f"Warning: Ignoring invalid {key} '{attributes[key]}' of code block "
+                f"'{attributes.get('name')}'."
+            )
+        else:
+            limits[key] = value
+    return limits
+
+
+def iter_fences(content: bytes) -> Iterator[tuple]:
+    """
+    Iterate over the fence lines of a Markdown document, in document order.
+
+    Args:
+        content (bytes): The document content (bytes or mmap).
+
+    Yields:
+        tuple: The fence match and the indentation (bytes) of the fence line.
+    """
+    matches = heapq.merge(
+        *(pattern.finditer(content) for pattern in FENCE_PATTERNS), key=re.Match.start
+    )
+    for match in matches:
+        start = match.start()
+        indent = content[content.rfind(b"\n", 0, start) + 1 : start]
+        # Fences must start the line, possibly after some indentation
+        if not indent.strip(b" \t"):
+            yield match, indent
+
+
+class MarkdownScanner:
+    """
+    Single-pass scanner extracting code blocks from Markdown files.
+
+    The file is memory-mapped and walked once, jumping from one fence line to the next. A block
+    starts on a ``` or ~~~ fence followed by a configured language and a `{name=..., tag=...}`
+    header, and ends on the next fence made of the same character and at least as long.
+    Unterminated blocks are dropped. Only the byte offsets of the code are recorded, the code
+    itself is loaded lazily by `Block`, but the first line of each block is read to detect its
+    shebang.
+
+    Attributes:
+        languages (set): Set of valid languages.
     """
-    shebang_pattern = r"^#!\s*(\/usr\/bin\/env\s+)?(\S+)"
-    match = re.search(shebang_pattern, content, re.MULTILINE)
 
-    if match:
-        return f"{match.group(1)}{match.group(2)}" if match.group(1) else match.group(2)
+    def __init__(self, languages: list):
+        self.languages = set(languages)
+
+    def scan(self, file_path: str) -> Iterator[Block]:
+        """
+        Lazily iterate over the code blocks of a Markdown file.
+
+        Args:
+            file_path (str): Path to the Markdown file.
+
+        Yields:
+            Block: Code block information.
+        """
+        with open(file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                opened = None
+                line, position = 1, 0
+                for match, indent in iter_fences(content):
+                    fence, info = match.groups()
+                    if opened is None:
+                        opened = self._open_block(indent, fence, info, match.end() + 1)
+                        if opened is not None:
+                            line += content[position : match.start()].count(b"\n")
+                            position = match.start()
+                            opened[0].line = line
+                    elif self._is_closing_fence(fence, info, opened[1]):
+                        block = opened[0]
+                        block.file = file_path
+                        block.end = match.start()
+                        shebang = SHEBANG_LINE_PATTERN.match(
+                            content, block.start, block.end
+                        )
+                        if shebang is not None:
+                            block.shebang = detect_shebang(
+                                shebang.group(1).decode("utf-8", "replace")
+                            )
+                        yield block
+                        opened = None
 
-    return None
+    def _open_block(self, indent: bytes, fence: bytes, info: bytes, start: int):
+        """
+        Try to open a code block from a fence line.
+
+        Args:
+            indent (bytes): Indentation of the fence.
+            fence (bytes): The fence characters.
+            info (bytes): The rest of the fence line.
+            start (int): Offset of the first byte of the code.
+
+        Returns:
+            tuple: The code block and its fence, or None if the line is not a valid header.
+        """
+        match = HEADER_PATTERN.match(info.decode("utf-8", "replace"))
+        if match is None or match.group("lang") not in self.languages:
+            return None
+
+        attributes = parse_attributes(match.group("attrs"))
+        if "name" not in attributes:
+            return None
+
+        block = Block(
+            name=attributes["name"],
+            lang=match.group("lang"),
+            tag=attributes.get("tag", ""),
+            depends=parse_depends(attributes.get("depends", "")),
+            cache=attributes.get("cache", "").lower() in ("true", "yes", "1"),
+            **parse_limits(attributes),
+            start=start,
+            indent=len(indent),
+        )
+        return block, fence
+
+    @staticmethod
+    def _is_closing_fence(fence: bytes, info: bytes, opening: bytes) -> bool:
+        """
+        Check if a fence line closes the current code block.
+
+        Args:
+            fence (bytes): The fence characters.
+            info (bytes): The rest of the fence line.
+            opening (bytes): The opening fence of the current code block.
+
+        Returns:
+            bool: True if the line is a closing fence.
+        """
+        return (
+            fence[0] == opening[0] and len(fence) >= len(opening) and not info.strip()
+        )
 
 
 def parse_markdown(file_path: str, languages: list) -> list:
@@ -75,32 +289,35 @@ def parse_markdown(file_path: str, languages: list) -> list:
         languages (list): List of valid languages.
 
     Returns:
-        list: List of dictionaries containing code block information
-            or an empty List if file not found.
+        list: List of code blocks (`Block`) or an empty List if file not found.
     """
-    pattern = compile_pattern(languages)
+    scanner = MarkdownScanner(languages)
     try:
-        with open(file_path, "r") as file:
-            content = file.read()
-
-        matches = pattern.findall(content)
-        shebang = detect_shebang(content)
-
-        blocklist = [
-            {
-                "name": shebang if (shebang is not None) else name.strip(),
-                "tag": tag,
-                "file": file_path,
-                "lang": lang,
-                "code": code.strip(),
-                "exec": lang in languages,
-            }
-            for lang, name, tag, code in matches
-        ]
-
-        return blocklist
+        return list(scanner.scan(file_path))
 
     except Exception as e:
         print(f"Error reading file {file_path}: {e}")
 
     return []
+
+
+def iter_blocks(file_paths: Iterable, languages: list) -> Iterator[Block]:
+    """
+    Lazily iterate over the code blocks of several Markdown files.
+
+    Files are only opened when the previous one has been consumed, so a caller looking for a
+    specific block can stop as soon as it is found.
+
+    Args:
+        file_paths (Iterable): Paths to the Markdown files, possibly a lazy iterator.
+        languages (list): List of valid languages.
+
+    Yields:
+        Block: The code blocks, in document order.
+    """
+    scanner = MarkdownScanner(languages)
+    for file_path in file_paths:
+        try:
+            yield from scanner.scan(file_path)
+        except Exception as e:
+            print(f"Error reading file {file_path}: {e}")
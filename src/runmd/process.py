@@ -15,13 +15,23 @@ functionality for extracting code blocks, listing them, displaying their content
 them based on specified commands.
 
 Functions:
+    - as_registry: Return the given code blocks as a registry, building it if needed.
+    - parse_file: Parse a Markdown file, catching errors so they can be reported by the caller.
+    - parse_files: Parse Markdown files, optionally in parallel across several processes.
+    - iter_file_paths: Lazily iterate over the Markdown files to process.
     - process_markdown_files: Process Markdown files in a directory, extracting code blocks based
       on configuration.
+    - find_block: Find the first code block with a given name, stopping as soon as it is found.
     - list_command: List all code blocks along with their names, languages, and other metadata.
     - show_command: Display the content of a specific code block identified by its name.
     - show_code_block: Print the contents of a code block with formatting.
+    - resolve_jobs: Return the number of code blocks to run at the same time.
     - run_command: Execute code blocks based on their name or tag, using configuration and
       environment variables.
+    - select_blocks: Select the code blocks to run, reporting when none matches.
+    - arun_command: Run code blocks with the asyncio engine.
+    - arun_graph: Run code blocks and their dependencies, independent blocks running
+      concurrently.
 
 The `process_markdown_files` function reads Markdown files from a directory and extracts code
 blocks using the provided configuration. The `list_command` function lists code blocks with
@@ -36,57 +46,259 @@ Usage:
     - Use `run_command` to execute code blocks, optionally filtered by name or tag.
 """
 
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterator, Optional
 
 from pygments import highlight
 from pygments.formatters import TerminalFormatter
 from pygments.lexers import get_lexer_by_name
 
+from .block import load_blocks_code
+from .cache import BlockIndex, ResultCache
 from .config import ConfigLoader
-from .parser import parse_markdown
-from .runner import run_code_block
+from .discovery import find_markdown_files
+from .envmanager import SessionStore
+from .parser import iter_blocks, parse_markdown
+from .registry import BlockRegistry
+from .report import RunReport
+from .runner import arun_code_block, run_code_block
+from .scheduler import BlockGraph
+from .trace import get_tracer, span, timed_call
+from .workers import WorkerPool
+
+
+def parse_file(file_path: Path, languages: list) -> tuple:
+    """
+    Parse a Markdown file, catching errors so they can be reported by the caller.
+
+    Args:
+        file_path (Path): Path to the Markdown file.
+        languages (list): List of valid languages.
 
+    Returns:
+        tuple: The list of code blocks and the exception raised, if any.
+    """
+    try:
+        return parse_markdown(file_path, languages), None
+    except Exception as e:
+        return [], e
 
-def process_markdown_files(inputfilepath: str, config: ConfigLoader) -> list:
+
+def parse_files(file_paths: list, languages: list, jobs: int = 1) -> list:
+    """
+    Parse Markdown files, optionally in parallel across several processes.
+
+    Args:
+        file_paths (list): Paths to the Markdown files.
+        languages (list): List of valid languages.
+        jobs (int): Number of worker processes, 0 to use all cores.
+
+    Returns:
+        list: The results of `parse_file`, in the order of `file_paths`.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    worker = partial(parse_file, languages=languages)
+    tracer = get_tracer()
+    if tracer is not None:
+        # Files parsed in worker processes are timed there
+        worker = partial(timed_call, worker)
+
+    if jobs == 1 or len(file_paths) < 2:
+        results = [worker(file_path) for file_path in file_paths]
+    else:
+        jobs = min(jobs, len(file_paths))
+        chunksize = max(1, len(file_paths) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(worker, file_paths, chunksize=chunksize))
+
+    if tracer is not None:
+        results = [
+            tracer.add_call(f"parse {file_path}", "parse", timed)
+            for file_path, timed in zip(file_paths, results)
+        ]
+    return results
+
+
+def iter_file_paths(
+    inputfilepath: Optional[str],
+    max_depth: Optional[int] = None,
+    include: Optional[list] = None,
+    ignore: Optional[list] = None,
+) -> Iterator[Path]:
+    """
+    Lazily iterate over the Markdown files to process.
+
+    Args:
+        inputfilepath (str): filepath to the markdown file (or directory) to process, or None to
+            walk the current directory.
+        max_depth (int): Maximum depth of the directory walk.
+        include (list): Glob patterns of the files to process.
+        ignore (list): Ignore patterns applied to the directory walk.
+
+    Yields:
+        Path: Paths to the Markdown files.
+    """
+    if inputfilepath is not None and not isinstance(inputfilepath, Path):
+        inputfilepath = Path(inputfilepath)
+
+    # Open the given file directly, or walk the directory and its subdirectories
+    if inputfilepath is not None and inputfilepath.is_file():
+        yield inputfilepath
+    elif inputfilepath is None or inputfilepath.is_dir():
+        directory = str(inputfilepath) if inputfilepath is not None else "."
+        yield from find_markdown_files(directory, max_depth, include, ignore=ignore)
+    else:
+        print(f"Error: File '{inputfilepath}' not found.")
+
+
+def process_markdown_files(
+    inputfilepath: str,
+    config: ConfigLoader,
+    index: Optional[BlockIndex] = None,
+    jobs: int = 1,
+    max_depth: Optional[int] = None,
+    include: Optional[list] = None,
+    ignore: Optional[list] = None,
+) -> BlockRegistry:
     """
     Process all Markdown files in the given directory.
 
     Args:
-        inputfilepath (str): filepath to the markwon file to process
+        inputfilepath (str): filepath to the markwon file (or directory) to process
         config (dict): Configuration dictionary containing commands and options.
+        index (BlockIndex): Optional block index used to skip unchanged files.
+        jobs (int): Number of processes used to parse the files, 0 to use all cores.
+        max_depth (int): Maximum depth of the directory walk.
+        include (list): Glob patterns of the files to process.
+        ignore (list): Ignore patterns applied to the directory walk.
 
     Returns:
-        list
+        BlockRegistry: The code blocks, in document order.
     """
 
     # Extract configured languages
     languages = config.get_all_aliases()
 
-    # Initialize blocklist
-    blocklist = []
+    with span("discover files", "discovery"):
+        file_paths = list(iter_file_paths(inputfilepath, max_depth, include, ignore))
+
+    # Use the index for unchanged files and parse the others
+    results = {}
+    if index is not None:
+        for file_path in file_paths:
+            blocks = index.get(file_path)
+            if blocks is not None:
+                results[file_path] = blocks
+
+    to_parse = [file_path for file_path in file_paths if file_path not in results]
+    with span("parse files", "parse", files=len(to_parse), indexed=len(results)):
+        parsed = parse_files(to_parse, languages, jobs)
+    for file_path, (blocks, error) in zip(to_parse, parsed):
+        if error is not None:
+            print(f"Error: Failed to parse file '{file_path}' with exception: {error}")
+            continue
+        results[file_path] = blocks
+        if index is not None:
+            index.put(file_path, blocks)
+
+    if index is not None:
+        if inputfilepath is None:
+            index.prune(file_paths)
+        index.save()
+
+    # Merge blocks in file order
+    return BlockRegistry(
+        block
+        for file_path in file_paths
+        if file_path in results
+        for block in results[file_path]
+    )
 
-    if inputfilepath is not None and not isinstance(inputfilepath, Path):
-        inputfilepath = Path(inputfilepath)
 
-    # Iterate over .md files in the directory and subdirectories
-    directory = Path(".")
-    for file_path in directory.rglob("*.md"):
-        if inputfilepath is None or inputfilepath == file_path:
-            try:
-                blocklist += parse_markdown(file_path, languages)
-            except Exception as e:
-                print(f"Error: Failed to parse file '{file_path}' with exception: {e}")
-                continue
+def find_block(
+    inputfilepath: str,
+    config: ConfigLoader,
+    block_name: str,
+    index: Optional[BlockIndex] = None,
+    max_depth: Optional[int] = None,
+    include: Optional[list] = None,
+    ignore: Optional[list] = None,
+) -> BlockRegistry:
+    """
+    Find the first code block with the given name, stopping as soon as it is found.
 
-    return blocklist
+    Files are discovered and scanned lazily, so the cost of the lookup depends on the position
+    of the block rather than on the size of the tree.
 
+    Args:
+        inputfilepath (str): filepath to the markdown file (or directory) to search
+        config (dict): Configuration dictionary containing commands and options.
+        block_name (str): Name of the code block to find.
+        index (BlockIndex): Optional block index used to skip unchanged files.
+        max_depth (int): Maximum depth of the directory walk.
+        include (list): Glob patterns of the files to search.
+        ignore (list): Ignore patterns applied to the directory walk.
+
+    Returns:
+        BlockRegistry: A registry containing the block, or an empty registry if not found.
+    """
+    languages = config.get_all_aliases()
+    found = None
+
+    # Files are discovered and scanned together
+    with span("find block", "discovery", block=block_name):
+        for file_path in iter_file_paths(inputfilepath, max_depth, include, ignore):
+            blocks = index.get(file_path) if index is not None else None
+            if blocks is not None:
+                found = next(
+                    (block for block in blocks if block.name == block_name), None
+                )
+            else:
+                scanned = []
+                for block in iter_blocks([file_path], languages):
+                    if block.name == block_name:
+                        found = block
+                        break
+                    scanned.append(block)
+                else:
+                    # The whole file was scanned: keep it in the index
+                    if index is not None:
+                        index.put(file_path, scanned)
+            if found is not None:
+                break
+
+    if index is not None:
+        index.save()
+
+    return BlockRegistry([found] if found is not None else [])
+
+
+def as_registry(blocklist) -> BlockRegistry:
+    """
+    Return the given code blocks as a registry, building it if needed.
+
+    Args:
+        blocklist (BlockRegistry | list): The code blocks.
+
+    Returns:
+        BlockRegistry: The registry of the code blocks.
+    """
+    return (
+        blocklist if isinstance(blocklist, BlockRegistry) else BlockRegistry(blocklist)
+    )
 
-def list_command(blocklist: list, tag: str = None) -> None:
+
+def list_command(blocklist: BlockRegistry, tag: str = None) -> None:
     """
     List all code block names along with their language.
 
     Args:
-        blocklist (list): List of dictionaries containing code block information.
+        blocklist (BlockRegistry): Registry of the code blocks.
         tag (str): Optional tag to filter the blocks.
     """
     name_width = 30
@@ -99,14 +311,12 @@ def list_command(blocklist: list, tag: str = None) -> None:
     separator = "-" * len(header)
 
     # Filter blocklist by tag if specified
-    filtered_blocks = (
-        block for block in blocklist if tag is None or block["tag"] == tag
-    )
+    filtered_blocks = blocklist if tag is None else as_registry(blocklist).with_tag(tag)
 
     # Prepare output lines
     output_lines = [header, separator]
     output_lines.extend(
-        f"{block['name'].ljust(name_width)} {block['lang'].ljust(lang_width)} {str(block['file']).ljust(file_width)} {block['tag'].ljust(tag_width)}"
+        f"{block.name.ljust(name_width)} {block.lang.ljust(lang_width)} {str(block.file).ljust(file_width)} {block.tag.ljust(tag_width)}"
         for block in filtered_blocks
     )
 
@@ -114,21 +324,21 @@ def list_command(blocklist: list, tag: str = None) -> None:
     print("\n".join(output_lines))
 
 
-def show_command(blocklist: list, block_name: str) -> None:
+def show_command(blocklist: BlockRegistry, block_name: str) -> None:
     """
     Handle the 'show' command to display a specific code block.
 
     Args:
-        code_blocks (list): List of code blocks extracted from Markdown.
+        blocklist (BlockRegistry): Registry of the code blocks.
         block_name (str): Name of the code block to display.
 
     Returns:
         None
     """
-    for block in blocklist:
-        if block["name"] == block_name:
-            show_code_block(block["name"], block["lang"], block["code"], block["tag"])
-            return
+    block = as_registry(blocklist).get(block_name)
+    if block is not None:
+        show_code_block(block.name, block.lang, block.code, block.tag)
+        return
 
     print(f"Error: Code block with name '{block_name}' not found.")
 
@@ -160,49 +370,251 @@ def show_code_block(name, lang, code, tag):
         print(code)
 
 
+def select_blocks(blocklist: BlockRegistry, block_name: str, tag: str) -> tuple:
+    """
+    Select the code blocks to run, reporting when none matches.
+
+    Args:
+        blocklist (BlockRegistry): Registry of the code blocks.
+        block_name (str): Name of the code block to run or 'all' to run all.
+        tag(str): Name of the tag of the code blocks to execute
+
+    Returns:
+        tuple: The registry of the code blocks and the selected code blocks.
+    """
+    registry = as_registry(blocklist)
+    selected = registry.select(block_name, tag)
+
+    if block_name != "all" and not selected:
+        if tag is not None:
+            print(f"Error: Code block with tag '{tag}' not found.")
+        else:
+            print(f"Error: Code block with name '{block_name}' not found.")
+
+    return registry, selected
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """
+    Return the number of code blocks to run at the same time.
+
+    Args:
+        jobs (int): The requested number, 0 to use all cores. None runs one block at a time.
+
+    Returns:
+        int: The number of code blocks.
+    """
+    if jobs == 0:
+        return os.cpu_count() or 1
+    return jobs or 1
+
+
 def run_command(
-    blocklist: list, block_name: str, tag: str, config: ConfigLoader, env_vars: dict
+    blocklist: BlockRegistry,
+    block_name: str,
+    tag: str,
+    config: ConfigLoader,
+    env_vars: dict,
+    pool: Optional[WorkerPool] = None,
+    jobs: int = 1,
+    keep_going: bool = False,
+    timeout: Optional[float] = None,
+    results: Optional[ResultCache] = None,
+    report: Optional[RunReport] = None,
 ) -> None:
     """
     Handle the 'run' command to execute code blocks.
 
+    Blocks run one after another in document order, unless they declare dependencies or `jobs` is
+    greater than 1: they are then run by the asyncio engine according to their dependencies,
+    independent blocks running concurrently with their output grouped per block.
+
     Args:
-        code_blocks (list): List of code blocks extracted from Markdown.
+        blocklist (BlockRegistry): Registry of the code blocks.
         block_name (str): Name of the code block to run or 'all' to run all.
         tag(str): Name of the tag of the code blocks to execute
         config (dict): Configuration dictionary.
+        pool (WorkerPool): Optional pool of warm workers used to run the blocks.
+        jobs (int): Maximum number of code blocks running at the same time, 0 to use all cores.
+        keep_going (bool): Keep running the blocks that do not depend on a failed block.
+        timeout (float): Deadline of each code block in seconds.
+        results (ResultCache): Optional cache replaying the results of blocks marked with
+            `cache=true`.
+        report (RunReport): Optional report receiving the resource usage of each block.
 
     Returns:
         None
     """
-
-    block_count = 0
-    success = True
-    blocklist_copy = blocklist.copy()
-    # for block in blocklist:
-    while blocklist_copy and success:
-        block = blocklist_copy.pop(0)
-        if block_name == "all" or block_name == block["name"] or tag == block["tag"]:
-            if block["exec"]:
+    registry, selected = select_blocks(blocklist, block_name, tag)
+    if not selected:
+        return True
+
+    # The session file is read once and written back once, when the run ends
+    with SessionStore() as session:
+        jobs = resolve_jobs(jobs)
+        if jobs > 1 or any(block.depends for block in selected):
+            return asyncio.run(
+                arun_graph(
+                    registry,
+                    selected,
+                    config,
+                    env_vars,
+                    pool,
+                    jobs,
+                    keep_going,
+                    timeout,
+                    session,
+                    results,
+                    report,
+                )
+            )
+
+        load_blocks_code(selected)
+        success = True
+        for block in selected:
+            if not success:
+                break
+            if block.exec:
                 success = run_code_block(
-                    block["name"],
-                    block["lang"],
-                    block["code"],
-                    block["tag"],
+                    block,
                     config,
                     env_vars,
+                    pool,
+                    session=session,
+                    results=results,
+                    timeout=timeout,
+                    report=report,
                 )
-                block_count += 1
             else:
                 print(
-                    f"Error: Language '{block['lang']}' is not configured. Skipping code block '{block['name']}'."
+                    f"Error: Language '{block.lang}' is not configured. Skipping code block '{block.name}'."
                 )
-                block_count += 1
 
-    if block_name != "all" and block_count == 0:
-        if tag is not None:
-            print(f"Error: Code block with tag '{tag}' not found.")
+        return success
+
+
+async def arun_command(
+    blocklist: BlockRegistry,
+    block_name: str,
+    tag: str,
+    config: ConfigLoader,
+    env_vars: dict,
+    jobs: int = 1,
+    keep_going: bool = False,
+    timeout: Optional[float] = None,
+) -> bool:
+    """
+    Run code blocks with the asyncio engine.
+
+    Args:
+        blocklist (BlockRegistry): Registry of the code blocks.
+        block_name (str): Name of the code block to run or 'all' to run all.
+        tag(str): Name of the tag of the code blocks to execute
+        config (dict): Configuration dictionary.
+        env_vars (dict): Environment variables to set during the execution.
+        jobs (int): Maximum number of code blocks running at the same time, 0 to use all cores.
+        keep_going (bool): Keep running the blocks that do not depend on a failed block.
+        timeout (float): Deadline of each code block in seconds.
+
+    Returns:
+        bool: True if all the code blocks ran and succeeded.
+    """
+    registry, selected = select_blocks(blocklist, block_name, tag)
+    if not selected:
+        return True
+
+    with SessionStore() as session:
+        return await arun_graph(
+            registry,
+            selected,
+            config,
+            env_vars,
+            jobs=resolve_jobs(jobs),
+            keep_going=keep_going,
+            timeout=timeout,
+            session=session,
+        )
+
+
+async def arun_graph(
+    registry: BlockRegistry,
+    selected: list,
+    config: ConfigLoader,
+    env_vars: dict,
+    pool: Optional[WorkerPool] = None,
+    jobs: int = 1,
+    keep_going: bool = False,
+    timeout: Optional[float] = None,
+    session: Optional[SessionStore] = None,
+    results: Optional[ResultCache] = None,
+    report: Optional[RunReport] = None,
+) -> bool:
+    """
+    Run code blocks and their dependencies, independent blocks running concurrently.
+
+    Blocks run as asyncio subprocesses supervised from the current thread. Blocks sent to a
+    worker pool run in a thread each, since workers are driven with blocking pipes.
+
+    Args:
+        registry (BlockRegistry): Registry of all the code blocks.
+        selected (list): The code blocks to run.
+        config (dict): Configuration dictionary.
+        env_vars (dict): Environment variables to set during the execution.
+        pool (WorkerPool): Optional pool of warm workers used to run the blocks.
+        jobs (int): Maximum number of code blocks running at the same time.
+        keep_going (bool): Keep running the blocks that do not depend on a failed block.
+        timeout (float): Deadline of each code block in seconds.
+        session (SessionStore): The session variables shared by the code blocks. If None, the
+            .session file is read and written for each block.
+        results (ResultCache): Optional cache replaying the results of blocks marked with
+            `cache=true`.
+        report (RunReport): Optional report receiving the resource usage of each block.
+
+    Returns:
+        bool: True if all the code blocks ran and succeeded.
+    """
+    try:
+        graph = BlockGraph(registry, selected)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    load_blocks_code(registry[node] for node in graph.nodes)
+
+    async def arun_block(block) -> bool:
+        # With several jobs, print the output of a block at once when it is done
+        out = io.StringIO() if jobs > 1 else None
+        if not block.exec:
+            print(
+                f"Error: Language '{block.lang}' is not configured. Skipping code block '{block.name}'.",
+                file=out,
+            )
+            success = True
+        elif pool is not None:
+            success = await asyncio.to_thread(
+                run_code_block,
+                block,
+                config,
+                env_vars,
+                pool,
+                out,
+                session,
+                results,
+                timeout,
+                report,
+            )
         else:
-            print(f"Error: Code block with name '{block_name}' not found.")
+            success = await arun_code_block(
+                block, config, env_vars, out, timeout, session, results, report
+            )
+        if out is not None:
+            print(out.getvalue(), end="", flush=True)
+        return success
+
+    success = await graph.arun(arun_block, jobs, keep_going)
+
+    skipped = graph.skipped
+    if skipped:
+        names = ", ".join(block.name for block in skipped)
+        print(f"Error: {len(skipped)} code block(s) not run: {names}")
 
     return success
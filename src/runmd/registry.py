@@ -0,0 +1,119 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Code Block Registry
+
+This module provides the `BlockRegistry` class, a container for the code blocks extracted from
+Markdown files. The registry is built once after parsing and indexes the blocks by name, tag, file
+and language, so lookups do not need to scan the whole list of blocks.
+
+Classes:
+    - BlockRegistry: Indexed collection of code blocks preserving document order.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class BlockRegistry:
+    """
+    Indexed collection of code blocks preserving document order.
+
+    The registry behaves like a read-only sequence of blocks. Each index maps a key to the
+    positions of the matching blocks, in document order.
+
+    Attributes:
+        blocks (list): The code blocks, in document order.
+        by_name (dict): Positions of the blocks by name.
+        by_tag (dict): Positions of the blocks by tag.
+        by_file (dict): Positions of the blocks by file.
+        by_lang (dict): Positions of the blocks by language.
+    """
+
+    def __init__(self, blocks: Iterable = ()):
+        self.blocks = []
+        self.by_name: Dict[str, List[int]] = {}
+        self.by_tag: Dict[str, List[int]] = {}
+        self.by_file: Dict[str, List[int]] = {}
+        self.by_lang: Dict[str, List[int]] = {}
+        for block in blocks:
+            self.add(block)
+
+    def add(self, block) -> None:
+        """
+        Append a code block to the registry.
+
+        Args:
+            block (Block): The code block to add.
+        """
+        position = len(self.blocks)
+        self.blocks.append(block)
+        self.by_name.setdefault(block.name, []).append(position)
+        self.by_tag.setdefault(block.tag, []).append(position)
+        self.by_file.setdefault(str(block.file), []).append(position)
+        self.by_lang.setdefault(block.lang, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.blocks)
+
+    def __getitem__(self, position: int):
+        return self.blocks[position]
+
+    def _lookup(self, index: dict, key) -> list:
+        return [self.blocks[position] for position in index.get(key, ())]
+
+    def get(self, name: str):
+        """
+        Return the first code block with the given name.
+
+        Args:
+            name (str): Name of the code block.
+
+        Returns:
+            Block: The code block, or None if not found.
+        """
+        positions = self.by_name.get(name)
+        return self.blocks[positions[0]] if positions else None
+
+    def with_name(self, name: str) -> list:
+        """Return the code blocks with the given name, in document order."""
+        return self._lookup(self.by_name, name)
+
+    def with_tag(self, tag: str) -> list:
+        """Return the code blocks with the given tag, in document order."""
+        return self._lookup(self.by_tag, tag)
+
+    def in_file(self, file_path) -> list:
+        """Return the code blocks of the given file, in document order."""
+        return self._lookup(self.by_file, str(file_path))
+
+    def with_lang(self, lang: str) -> list:
+        """Return the code blocks of the given language, in document order."""
+        return self._lookup(self.by_lang, lang)
+
+    def select(self, name: Optional[str] = None, tag: Optional[str] = None) -> list:
+        """
+        Return the code blocks matching a name or a tag, in document order.
+
+        Args:
+            name (str): Name of the code blocks, or 'all' to select all blocks.
+            tag (str): Tag of the code blocks.
+
+        Returns:
+            list: The selected code blocks.
+        """
+        if name == "all":
+            return list(self.blocks)
+
+        positions = set(self.by_name.get(name, ()))
+        positions.update(self.by_tag.get(tag, ()))
+        return [self.blocks[position] for position in sorted(positions)]
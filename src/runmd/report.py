@@ -0,0 +1,207 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Run Reports
+
+This module collects the resource usage of the code blocks of a run: wall time, user and system
+CPU time, maximum resident set size and exit code. The usage of a block process is read from the
+`struct rusage` returned by `os.wait4` when the process is reaped, so it covers the interpreter and
+the children it waited for.
+
+On Linux, the maximum resident set size of a process starts from the size of its parent at the
+time it was forked, which is kept across `exec`. The figure is only meaningful for blocks using more
+memory than runmd itself.
+
+Functions:
+    - usage_fields: Convert a `struct rusage` into report fields.
+    - format_size: Format a size in KiB for display.
+
+Classes:
+    - RunReport: Resource usage of the code blocks of a run.
+
+Constants:
+    - REPORT_FORMAT_VERSION: Version of the JSON report format.
+"""
+
+import datetime
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, TextIO
+
+REPORT_FORMAT_VERSION = 1
+
+
+def usage_fields(usage) -> dict:
+    """
+    Convert a `struct rusage` into report fields.
+
+    Args:
+        usage (resource.struct_rusage): Resource usage of a process, or None if not available.
+
+    Returns:
+        dict: The `user` and `system` CPU times in seconds and `max_rss_kb`, None if unknown.
+    """
+    if usage is None:
+        return {"user": None, "system": None, "max_rss_kb": None}
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    max_rss = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {
+        "user": round(usage.ru_utime, 6),
+        "system": round(usage.ru_stime, 6),
+        "max_rss_kb": max_rss,
+    }
+
+
+def format_size(size_kb: Optional[int]) -> str:
+    """
+    Format a size in KiB for display.
+
+    Args:
+        size_kb (int): The size in KiB, or None if unknown.
+
+    Returns:
+        str: The formatted size.
+    """
+    if size_kb is None:
+        return "-"
+    if size_kb < 1024:
+        return f"{size_kb} KiB"
+    if size_kb < 1024 * 1024:
+        return f"{size_kb / 1024:.1f} MiB"
+    return f"{size_kb / 1024 / 1024:.2f} GiB"
+
+
+class RunReport:
+    """
+    Resource usage of the code blocks of a run.
+
+    Blocks are recorded in the order they finish. Blocks replayed from the result cache and blocks
+    run by a warm worker have no CPU time and memory usage of their own.
+
+    Attributes:
+        command (str): The runmd command line.
+        started (str): ISO date of the start of the run.
+        blocks (list): One dictionary per block that ran.
+    """
+
+    def __init__(self, command: str = ""):
+        self.command = command
+        self.started = datetime.datetime.now().isoformat()
+        self.blocks = []
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        block,
+        status: str,
+        returncode: Optional[int],
+        wall: float,
+        usage=None,
+        cached: bool = False,
+    ) -> None:
+        """
+        Record the result and resource usage of a code block.
+
+        Args:
+            block (Block): The code block.
+            status (str): Exit status of the block (OK, FAILED, TIMEOUT or OOM).
+            returncode (int): Exit code of the block.
+            wall (float): Wall time of the block in seconds.
+            usage (resource.struct_rusage): Resource usage of the block process, if known.
+            cached (bool): Whether the result was replayed from the result cache.
+        """
+        entry = {
+            "name": block.name,
+            "file": None if block.file is None else str(block.file),
+            "line": block.line,
+            "lang": block.lang,
+            "tag": block.tag,
+            "status": status,
+            "returncode": returncode,
+            "cached": cached,
+            "wall": round(wall, 6),
+        }
+        entry.update(usage_fields(usage))
+        with self._lock:
+            self.blocks.append(entry)
+
+    def to_dict(self, success: Optional[bool] = None) -> dict:
+        """
+        Return the report as a dictionary.
+
+        Args:
+            success (bool): Whether the run succeeded.
+
+        Returns:
+            dict: The report.
+        """
+        return {
+            "version": REPORT_FORMAT_VERSION,
+            "command": self.command,
+            "started": self.started,
+            "wall": round(time.monotonic() - self._start, 6),
+            "success": success,
+            "blocks": list(self.blocks),
+        }
+
+    def write(self, path, success: Optional[bool] = None) -> None:
+        """
+        Write the report to a JSON file.
+
+        Args:
+            path (str): Path to the report file.
+            success (bool): Whether the run succeeded.
+        """
+        try:
+            with open(Path(path), "w") as freport:
+                json.dump(self.to_dict(success), freport, indent=2)
+                freport.write("\n")
+        except OSError as e:
+            print(f"Error writing report file: {e}")
+
+    def print_summary(self, out: Optional[TextIO] = None) -> None:
+        """
+        Print a table of the resource usage of the code blocks.
+
+        Args:
+            out (TextIO): Stream receiving the table, sys.stdout if None.
+        """
+        if not self.blocks:
+            return
+
+        def seconds(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:.2f}s"
+
+        rows = [("BLOCK", "STATUS", "EXIT", "WALL", "USER", "SYS", "MAX RSS")]
+        for entry in self.blocks:
+            status = entry["status"] + (" (cached)" if entry["cached"] else "")
+            rows.append(
+                (
+                    entry["name"],
+                    status,
+                    "-" if entry["returncode"] is None else str(entry["returncode"]),
+                    seconds(entry["wall"]),
+                    seconds(entry["user"]),
+                    seconds(entry["system"]),
+                    format_size(entry["max_rss_kb"]),
+                )
+            )
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        print(file=out)
+        for row in rows:
+            # Names and statuses are left aligned, figures right aligned
+            cells = [cell.ljust(width) for cell, width in zip(row[:2], widths)]
+            cells += [cell.rjust(width) for cell, width in zip(row[2:], widths[2:])]
+            print("  ".join(cells).rstrip(), file=out)
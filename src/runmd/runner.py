@@ -13,19 +13,35 @@ Code Block Execution
 This module provides functionality for executing code blocks extracted from Markdown files.
 It handles the execution of code using configurations defined for different programming languages.
 
+Classes:
+    - OutputRelay: Relay the output of a code block, decoding it incrementally.
+
 Functions:
+    - find_interpreter: Resolve the path of an interpreter, caching the result.
+    - get_command: Return the command used to run a code block, from its shebang or from
+      config.ini.
+    - prepare_block: Resolve the command, options and environment used to run a code block.
+    - replay_result: Print the stored output of a code block.
+    - report_status: Print why a code block was stopped by one of its limits.
+    - wait_process: Wait for a process to exit and return its resource usage.
+    - relay_output: Relay the standard output and error of a process until both are closed.
     - run_code_block: Execute a specific code block using the command and options defined in the
       configuration file.
-    - detect_shebang: Check if the first line of the code block contains a shebang #! and return it
-      has `command` else return command from config.ini
-The `run_code_block` function takes the code block's name, language, code, and associated metadata,
-along with a configuration dictionary and environment variables. It then runs the code block using
+    - arun_code_block: Execute a code block as an asyncio subprocess, with an optional deadline.
+    - open_reader: Connect a pipe of a process to an asyncio stream reader.
+    - write_pipe: Write data to a pipe of a process from the event loop, then close it.
+    - watch_process: Reap a process from the event loop once it exits.
+
+The `run_code_block` function takes a code block (`Block`) along with a configuration dictionary
+and environment variables. It then runs the code block using
 the appropriate command for the specified language, capturing and printing the output.
 
 Usage:
     - Use `run_code_block` to execute code blocks with the provided configuration and environment
       settings. The function handles command preparation, execution, and output streaming, and it
       prints the output directly to the console.
+    - Use `arun_code_block` from a coroutine to run several code blocks concurrently from one
+      thread.
 
 Error Handling:
     - If the specified language is not supported or no command is defined, an error message is
@@ -33,79 +49,412 @@ Error Handling:
     - Any exceptions during the execution of the code block are caught and reported.
 """
 
+import asyncio
+import codecs
+import functools
 import os
+import selectors
+import shutil
 import subprocess
 import sys
-from configparser import ConfigParser
+import threading
+import time
+from typing import Optional, TextIO
+
+from .block import Block
+from .cache import ResultCache
+from .config import ConfigLoader, Language
+from .delivery import CodeDelivery, write_input
+from .envmanager import SessionStore
+from .limits import (
+    STATUS_FAILED,
+    STATUS_OK,
+    STATUS_OOM,
+    STATUS_TIMEOUT,
+    SHELLS,
+    ResourceLimits,
+    exit_status,
+    kill_process_group,
+)
+from .report import RunReport
+from .trace import BlockTrace
+from .workers import WorkerPool
 
-from .config import ConfigLoader
-from .envmanager import load_dotenv, merge_envs, update_runenv_file
+CHUNK_SIZE = 1 << 16
+MAX_LINE_LENGTH = 4096
 
 
-def detect_shebang(code: str, section: str, config: ConfigParser):
+@functools.lru_cache(maxsize=None)
+def find_interpreter(name: str) -> Optional[str]:
     """
-    Check if the first line of the code block contains a shebang #!
+    Resolve the path of an interpreter.
+
+    Results are cached, so running several blocks with the same interpreter only searches the
+    PATH once.
 
     Args:
-        code(str): The code to execute
+        name (str): Name or path of the interpreter.
 
     Returns:
-        list: The command to execute the code block or None
+        str: The path to the interpreter, or None if it is not found.
     """
-    split_code = code.split("\n")
-    return (
-        [split_code[0].replace("#!", "")]
-        if split_code[0].startswith("#!")
-        else config[section].get("command", "").split()
-    )
+    return shutil.which(name)
 
 
-def run_code_block(
-    name: str,
-    lang: str,
-    code: str,
-    tag: str,
+def get_command(block: Block, language: Language) -> list:
+    """
+    Return the command used to run a code block.
+
+    The shebang detected by the parser takes precedence over the command of the language
+    section. The interpreter is resolved to its full path when it can be found.
+
+    Args:
+        block (Block): The code block to execute.
+        language (Language): The language of the code block.
+
+    Returns:
+        list: The command to execute the code block, empty if none is configured.
+    """
+    command = block.shebang.split() if block.shebang else list(language.command)
+    if command:
+        command[0] = find_interpreter(command[0]) or command[0]
+    return command
+
+
+class OutputRelay:
+    """
+    Relay the output of a code block, decoding it incrementally.
+
+    Output is written as it arrives, without splitting it into lines, and invalid UTF-8 sequences
+    are replaced. Only the last non-empty line is kept, to be stored in the session.
+
+    Attributes:
+        out (TextIO): Stream receiving the output.
+        record (list): List receiving the decoded output, to be stored in the result cache.
+        last_line (str): Last non-empty line of output seen so far.
+        first_output (float): `time.perf_counter` value at the first output, None until then.
+    """
+
+    def __init__(self, out: Optional[TextIO] = None, record: Optional[list] = None):
+        self.out = out if out is not None else sys.stdout
+        self.record = record
+        self.last_line = ""
+        self.first_output = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self._tail = ""
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        """
+        Decode and write a chunk of raw output.
+
+        Args:
+            data (bytes): The chunk of output.
+            final (bool): Whether this is the last chunk.
+        """
+        self.write(self._decoder.decode(data, final))
+
+    def write(self, text: str) -> None:
+        """
+        Write a chunk of decoded output.
+
+        Args:
+            text (str): The chunk of output.
+        """
+        if not text:
+            return
+        if self.first_output is None:
+            self.first_output = time.perf_counter()
+        self.out.write(text)
+        self.out.flush()
+        if self.record is not None:
+            self.record.append(text)
+
+        head, newline, tail = text.rpartition("\n")
+        if newline:
+            line = (self._tail + head).rstrip()
+            if line:
+                self.last_line = line[line.rfind("\n") + 1 :]
+            self._tail = tail
+        else:
+            # Only the end of a very long line is kept
+            self._tail = (self._tail + tail)[-MAX_LINE_LENGTH:]
+
+    def close(self) -> str:
+        """
+        Flush the decoder and terminate the output with a newline.
+
+        Returns:
+            str: The last non-empty line of output.
+        """
+        self.feed(b"", final=True)
+        if self._tail:
+            self.out.write("\n")
+            self.out.flush()
+            if self._tail.strip():
+                self.last_line = self._tail.rstrip()
+            self._tail = ""
+        return self.last_line
+
+
+def prepare_block(
+    block: Block,
     config: ConfigLoader,
     env_vars: dict,
+    out=None,
+    session: Optional[SessionStore] = None,
 ):
     """
-    Execute the specified code block using configuration.
+    Resolve the command, options and environment used to run a code block.
 
     Args:
-        name (str): Name of the code block.
-        lang (str): Programming language or script type.
-        code (str): The code to execute.
+        block (Block): The code block to execute.
         config (dict): Configuration dictionary containing commands and options.
+        env_vars (dict): Environment variables to set during the execution.
+        out (TextIO): Stream receiving the error messages, sys.stdout if None.
+        session (SessionStore): The session variables, read from the .session file if None.
 
     Returns:
-        None
+        tuple: The language, command, options and environment, or None if the block cannot be
+            run.
     """
-    print(f"\n\033[1;33m> Running: {name} ({lang}) {tag}\033[0;0m")
+    lang = block.lang
 
     # Find the appropriate language configuration
-    lang_section = config.find_language(lang)
+    language = config.languages.find(lang)
 
     # If no matching language configuration is found, return None
-    if not lang_section:
-        print(f"\033[1;31mNo configuration found for language: {lang}\033[0;0m")
+    if language is None:
+        print(
+            f"\033[1;31mNo configuration found for language: {lang}\033[0;0m", file=out
+        )
         return None
 
     # Detect command and parse options
-    command = detect_shebang(code, f"lang.{lang_section}", config.config)
-    options = config.get_language_options(lang)
+    command = get_command(block, language)
+    options = list(language.options)
 
     # Merge the provided environment variables with the current environment
     env = os.environ.copy()
     if env_vars:
         env.update(env_vars)
-    runenv = load_dotenv()
-    merge_envs(env, runenv)
+    (session or SessionStore()).apply(env)
 
     if not command:
-        print(f"Error: No command specified for language '{lang}'")
+        print(f"Error: No command specified for language '{lang}'", file=out)
+        return None
+
+    return language, command, options, env
+
+
+def replay_result(result: dict, out: Optional[TextIO] = None) -> str:
+    """
+    Print the stored output of a code block.
+
+    Args:
+        result (dict): The result returned by `ResultCache.get`.
+        out (TextIO): Stream receiving the output, sys.stdout if None.
+
+    Returns:
+        str: The last non-empty line of output.
+    """
+    relay = OutputRelay(out)
+    relay.write(result["output"])
+    return relay.close()
+
+
+def report_status(
+    name: str,
+    status: str,
+    limits: ResourceLimits,
+    timed_out: bool,
+    out: Optional[TextIO] = None,
+) -> None:
+    """
+    Print why a code block was stopped by one of its limits.
+
+    Args:
+        name (str): Name of the code block.
+        status (str): Exit status returned by `exit_status`.
+        limits (ResourceLimits): The limits of the block.
+        timed_out (bool): Whether the block was killed after its timeout.
+        out (TextIO): Stream receiving the message, sys.stdout if None.
+    """
+    if status == STATUS_TIMEOUT and timed_out:
+        message = f"timed out after {limits.timeout:g}s"
+    elif status == STATUS_TIMEOUT:
+        message = f"exceeded its CPU time limit of {limits.max_cpu:g}s"
+    elif status == STATUS_OOM:
+        message = f"exceeded its memory limit of {limits.max_memory} bytes"
+    else:
+        return
+    print(f"Error: Code block '{name}' {message} ({status})", file=out)
+
+
+def wait_process(process: subprocess.Popen):
+    """
+    Wait for a process to exit and return its resource usage.
+
+    The process is reaped with `os.wait4`, which returns the CPU time and maximum resident set
+    size of the process and of the descendants it waited for. The exit code is stored in the
+    `returncode` of the process, as `Popen.wait` does.
+
+    Args:
+        process (subprocess.Popen): The process to wait for.
+
+    Returns:
+        resource.struct_rusage: The resource usage of the process, or None if not available.
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        # Already reaped
+        process.wait()
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return usage
+
+
+def relay_output(
+    process: subprocess.Popen, stdout: OutputRelay, stderr: OutputRelay
+) -> None:
+    """
+    Relay the standard output and error of a process until both are closed.
+
+    Args:
+        process (subprocess.Popen): The process, started with both streams piped.
+        stdout (OutputRelay): The relay of the standard output.
+        stderr (OutputRelay): The relay of the standard error.
+    """
+    relays = {process.stdout.fileno(): stdout, process.stderr.fileno(): stderr}
+    if os.name != "posix":
+        # Pipes cannot be polled on Windows, the standard error is read from a thread
+        def drain(fd: int, relay: OutputRelay) -> None:
+            while True:
+                data = os.read(fd, CHUNK_SIZE)
+                if not data:
+                    break
+                relay.feed(data)
+
+        fd = process.stderr.fileno()
+        thread = threading.Thread(target=drain, args=(fd, stderr), daemon=True)
+        thread.start()
+        drain(process.stdout.fileno(), stdout)
+        thread.join()
+        return
+
+    with selectors.DefaultSelector() as selector:
+        for fd in relays:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, CHUNK_SIZE)
+                if data:
+                    relays[key.fd].feed(data)
+                else:
+                    selector.unregister(key.fd)
+
+
+def run_code_block(
+    block: Block,
+    config: ConfigLoader,
+    env_vars: dict,
+    pool: Optional[WorkerPool] = None,
+    out: Optional[TextIO] = None,
+    session: Optional[SessionStore] = None,
+    results: Optional[ResultCache] = None,
+    timeout: Optional[float] = None,
+    report: Optional[RunReport] = None,
+):
+    """
+    Execute the specified code block using configuration.
+
+    The block runs in its own process group with its resource limits applied, and is killed with
+    its descendants when it times out or is interrupted.
+
+    Args:
+        block (Block): The code block to execute.
+        config (dict): Configuration dictionary containing commands and options.
+        env_vars (dict): Environment variables to set during the execution.
+        pool (WorkerPool): Optional pool of warm workers. Blocks with a shebang or resource
+            limits, and languages without worker always run in a fresh process.
+        out (TextIO): Stream receiving the output, sys.stdout if None.
+        session (SessionStore): The session variables of the run. If None, the .session file is
+            read and written for this block only.
+        results (ResultCache): Optional result cache. The result of blocks marked with
+            `cache=true` is replayed from it, or stored in it once the block ran.
+        timeout (float): Deadline of the block in seconds, unless the block sets its own.
+        report (RunReport): Optional report receiving the resource usage of the block.
+
+    Returns:
+        bool: True if the code block succeeded, None if it could not be started.
+    """
+    name = block.name
+    print(
+        f"\n\033[1;33m> Running: {name} ({block.lang}) {block.tag}\033[0;0m", file=out
+    )
+
+    trace = BlockTrace(block)
+    store = session if session is not None else SessionStore()
+    prepared = prepare_block(block, config, env_vars, out, store)
+    if prepared is None:
+        trace.finish()
         return None
+    language, command, options, env = prepared
+    limits = ResourceLimits.resolve(block, language.limits, timeout)
+    start = trace.start
+
+    key = record = None
+    if results is not None and block.cache:
+        key = results.key(block.code, command, options, env_vars)
+        result = results.get(key)
+        if result is not None:
+            store.set("__", replay_result(result, out))
+            if session is None:
+                store.flush()
+            returncode = result["returncode"]
+            status = STATUS_OK if returncode == 0 else STATUS_FAILED
+            if report is not None:
+                wall = time.perf_counter() - start
+                report.record(block, status, returncode, wall, cached=True)
+            trace.finish(status, returncode, cached=True)
+            return returncode == 0
+        record = []
+
+    worker = None
+    if pool is not None and not block.shebang and not limits:
+        worker = pool.acquire(language.name, command)
 
     try:
+        if worker is not None:
+            # The session keeps the last line of the standard output
+            relays = {1: OutputRelay(out, record), 2: OutputRelay(out, record)}
+            try:
+                for stream, chunk in worker.execute(block.code, env):
+                    relays[stream].feed(chunk)
+            finally:
+                pool.release(language.name, worker)
+            relays[2].close()
+            store.set("__", relays[1].close())
+            if session is None:
+                store.flush()
+            if key is not None:
+                results.put(key, "".join(record), worker.returncode)
+            status = STATUS_OK if worker.returncode == 0 else STATUS_FAILED
+            if report is not None:
+                # The worker outlives the block, its resource usage is not the block's
+                wall = time.perf_counter() - start
+                report.record(block, status, worker.returncode, wall)
+            first_output = min(
+                (relay.first_output for relay in relays.values() if relay.first_output),
+                default=None,
+            )
+            trace.finish(status, worker.returncode, first_output)
+
+            return worker.returncode == 0
+
         # Prepare command and arguments based on platform
         active_shell = sys.platform == "win32"
 
@@ -116,27 +465,341 @@ def run_code_block(
         #    temp_script_path = temp_script.name
         # command = [command[0], temp_script_path]  # + command[1:]
 
-        process = subprocess.Popen(
-            command + options + [code],
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            shell=active_shell,
+        with CodeDelivery.for_language(block.code, language) as delivery:
+            spawn = time.perf_counter()
+            process = subprocess.Popen(
+                command + delivery.arguments,
+                env=env,
+                stdin=subprocess.PIPE if delivery.input is not None else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=active_shell,
+                pass_fds=delivery.pass_fds,
+                start_new_session=limits.isolated,
+                preexec_fn=limits.preexec(),
+            )
+            limits.apply(process.pid)
+            trace.complete("spawn", spawn, time.perf_counter())
+        if delivery.input is not None:
+            # Write from a thread, the output pipe must be drained at the same time
+            threading.Thread(
+                target=write_input, args=(process.stdin, delivery.input), daemon=True
+            ).start()
+
+        timed_out = threading.Event()
+        timer = None
+        if limits.timeout:
+
+            def expire() -> None:
+                timed_out.set()
+                kill_process_group(process.pid, limits.isolated)
+
+            timer = threading.Timer(limits.timeout, expire)
+            timer.daemon = True
+            timer.start()
+
+        # The session keeps the last line of the standard output
+        stdout, stderr = OutputRelay(out, record), OutputRelay(out, record)
+        try:
+            relay_output(process, stdout, stderr)
+            usage = wait_process(process)
+            end = time.perf_counter()
+        except BaseException:
+            # Do not leave the block or its descendants running
+            kill_process_group(process.pid, limits.isolated)
+            process.wait()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            process.stdout.close()
+            process.stderr.close()
+
+        error_line = stderr.close()
+        last_line = stdout.close()
+        store.set("__", last_line)
+        if session is None:
+            store.flush()
+
+        status = exit_status(
+            process.returncode,
+            limits,
+            timed_out.is_set(),
+            error_line or last_line,
+            os.path.basename(command[0]) in SHELLS,
+        )
+        report_status(name, status, limits, timed_out.is_set(), out)
+        if key is not None and status not in (STATUS_TIMEOUT, STATUS_OOM):
+            results.put(key, "".join(record), process.returncode)
+        if report is not None:
+            report.record(block, status, process.returncode, end - start, usage)
+        first_output = min(
+            (relay.first_output for relay in (stdout, stderr) if relay.first_output),
+            default=None,
+        )
+        trace.instant("exit", end)
+        trace.finish(status, process.returncode, first_output)
+
+        return status == STATUS_OK
+
+    except Exception as e:
+
+        print(f"Error: Code block '{name}' failed with exception: {e}", file=out)
+        trace.finish()
+        return False
+
+
+async def open_reader(pipe) -> tuple:
+    """
+    Connect a pipe of a process to an asyncio stream reader.
+
+    Args:
+        pipe (IO[bytes]): The pipe to read from.
+
+    Returns:
+        tuple: The transport of the pipe, to be closed once done, and the stream reader.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), pipe
+    )
+    return transport, reader
+
+
+async def write_pipe(pipe, data: bytes) -> None:
+    """
+    Write data to a pipe of a process from the event loop, then close it.
+
+    Args:
+        pipe (IO[bytes]): The pipe to write to.
+        data (bytes): The data to write.
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.connect_write_pipe(
+        lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), pipe
+    )
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+    try:
+        writer.write(data)
+        await writer.drain()
+    except OSError:
+        # The interpreter exited without reading all its input
+        pass
+    finally:
+        writer.close()
+
+
+def watch_process(process: subprocess.Popen) -> asyncio.Future:
+    """
+    Reap a process from the event loop once it exits.
+
+    The process is reaped with `wait_process`, so its resource usage is kept, which the child
+    watchers of asyncio discard. On Linux, the pidfd of the process becomes readable when it
+    exits, and the process is reaped by a callback of the event loop. Elsewhere, it is reaped by a
+    thread of its own, and there are at most as many of them as blocks running at the same time.
+
+    Args:
+        process (subprocess.Popen): The process to reap.
+
+    Returns:
+        asyncio.Future: The resource usage of the process and the time it was reaped at.
+    """
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def reaped(usage) -> None:
+        if not exited.done():
+            exited.set_result((usage, time.perf_counter()))
+
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+
+    if pidfd is not None:
+
+        def ready() -> None:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+            reaped(wait_process(process))
+
+        loop.add_reader(pidfd, ready)
+        return exited
+
+    def reap() -> None:
+        usage = wait_process(process)
+        try:
+            loop.call_soon_threadsafe(reaped, usage)
+        except RuntimeError:
+            # The event loop is closed
+            pass
+
+    threading.Thread(target=reap, daemon=True).start()
+    return exited
+
+
+async def arun_code_block(
+    block: Block,
+    config: ConfigLoader,
+    env_vars: dict,
+    out: Optional[TextIO] = None,
+    timeout: Optional[float] = None,
+    session: Optional[SessionStore] = None,
+    results: Optional[ResultCache] = None,
+    report: Optional[RunReport] = None,
+):
+    """
+    Execute the specified code block as an asyncio subprocess.
+
+    The stdout and stderr of the block are read concurrently and printed as they arrive, so many
+    blocks can be supervised from a single thread. As with `run_code_block`, the block runs in its
+    own process group with its resource limits applied.
+
+    The process is reaped with `watch_process` rather than by the child watcher of asyncio, which
+    discards the resource usage of the process. On platforms without Unix pipes support in the
+    event loop, the block runs with `run_code_block` in a thread.
+
+    Args:
+        block (Block): The code block to execute.
+        config (dict): Configuration dictionary containing commands and options.
+        env_vars (dict): Environment variables to set during the execution.
+        out (TextIO): Stream receiving the output, sys.stdout if None.
+        timeout (float): Deadline of the block in seconds, unless the block sets its own. The
+            process and its descendants are killed when it is exceeded.
+        session (SessionStore): The session variables of the run. If None, the .session file is
+            read and written for this block only.
+        results (ResultCache): Optional result cache. The result of blocks marked with
+            `cache=true` is replayed from it, or stored in it once the block ran.
+        report (RunReport): Optional report receiving the resource usage of the block.
+
+    Returns:
+        bool: True if the code block succeeded, None if it could not be started.
+    """
+    if os.name != "posix":
+        return await asyncio.to_thread(
+            run_code_block,
+            block,
+            config,
+            env_vars,
+            None,
+            out,
+            session,
+            results,
+            timeout,
+            report,
         )
 
+    name = block.name
+    print(
+        f"\n\033[1;33m> Running: {name} ({block.lang}) {block.tag}\033[0;0m", file=out
+    )
+
+    trace = BlockTrace(block)
+    store = session if session is not None else SessionStore()
+    prepared = prepare_block(block, config, env_vars, out, store)
+    if prepared is None:
+        trace.finish()
+        return None
+    language, command, options, env = prepared
+    limits = ResourceLimits.resolve(block, language.limits, timeout)
+    start = trace.start
+
+    key = record = None
+    if results is not None and block.cache:
+        key = results.key(block.code, command, options, env_vars)
+        result = results.get(key)
+        if result is not None:
+            store.set("__", replay_result(result, out))
+            if session is None:
+                store.flush()
+            returncode = result["returncode"]
+            status = STATUS_OK if returncode == 0 else STATUS_FAILED
+            if report is not None:
+                wall = time.perf_counter() - start
+                report.record(block, status, returncode, wall, cached=True)
+            trace.finish(status, returncode, cached=True)
+            return returncode == 0
+        record = []
+
+    async def forward(stream: asyncio.StreamReader, relay: OutputRelay) -> None:
         while True:
-            output = process.stdout.readline().rstrip().decode("utf-8")
-            if output == "" and process.poll() is not None:
+            data = await stream.read(CHUNK_SIZE)
+            if not data:
                 break
-            if output:
-                print(output.strip())
-            runenv["__"] = output
+            relay.feed(data)
 
-        update_runenv_file(runenv)
+    # The session keeps the last line of the standard output
+    stdout, stderr = OutputRelay(out, record), OutputRelay(out, record)
+    try:
+        with CodeDelivery.for_language(block.code, language) as delivery:
+            spawn = time.perf_counter()
+            process = subprocess.Popen(
+                command + delivery.arguments,
+                env=env,
+                stdin=subprocess.PIPE if delivery.input is not None else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                pass_fds=delivery.pass_fds,
+                start_new_session=limits.isolated,
+                preexec_fn=limits.preexec(),
+            )
+            limits.apply(process.pid)
+            trace.complete("spawn", spawn, time.perf_counter())
+    except Exception as e:
+        print(f"Error: Code block '{name}' failed with exception: {e}", file=out)
+        trace.finish()
+        return False
 
-        return process.returncode == 0
+    exited = watch_process(process)
 
-    except Exception as e:
+    transports = []
+    timed_out = False
+    try:
+        tasks = [asyncio.shield(exited)]
+        if delivery.input is not None:
+            tasks.append(write_pipe(process.stdin, delivery.input))
+        for pipe, relay in ((process.stdout, stdout), (process.stderr, stderr)):
+            transport, reader = await open_reader(pipe)
+            transports.append(transport)
+            tasks.append(forward(reader, relay))
+        await asyncio.wait_for(asyncio.gather(*tasks), limits.timeout)
+    except asyncio.TimeoutError:
+        kill_process_group(process.pid, limits.isolated)
+        timed_out = True
+    except BaseException:
+        # Do not leave the block or its descendants running
+        kill_process_group(process.pid, limits.isolated)
+        await exited
+        raise
+    finally:
+        for transport in transports:
+            transport.close()
+    usage, end = await exited
 
-        print(f"Error: Code block '{name}' failed with exception: {e}")
-        return False
+    error_line = stderr.close()
+    last_line = stdout.close()
+    store.set("__", last_line)
+    if session is None:
+        store.flush()
+
+    status = exit_status(
+        process.returncode,
+        limits,
+        timed_out,
+        error_line or last_line,
+        os.path.basename(command[0]) in SHELLS,
+    )
+    report_status(name, status, limits, timed_out, out)
+    if key is not None and status not in (STATUS_TIMEOUT, STATUS_OOM):
+        results.put(key, "".join(record), process.returncode)
+    if report is not None:
+        report.record(block, status, process.returncode, end - start, usage)
+    first_output = min(
+        (relay.first_output for relay in (stdout, stderr) if relay.first_output),
+        default=None,
+    )
+    trace.instant("exit", end)
+    trace.finish(status, process.returncode, first_output)
+
+    return status == STATUS_OK
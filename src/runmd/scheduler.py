@@ -0,0 +1,184 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Code Block Scheduler
+
+This module provides the `BlockGraph` class, which orders code blocks according to their
+`depends=` attribute and runs the blocks whose dependencies are done concurrently, as asyncio
+tasks bounded by a number of jobs.
+
+Classes:
+    - BlockGraph: Dependency graph of the code blocks to run.
+
+A dependency names code blocks: every block with that name must succeed before the dependent block
+starts. Dependencies that are not part of the selected blocks are added to the graph, so running a
+block also runs what it depends on.
+"""
+
+import asyncio
+import heapq
+from asyncio import FIRST_COMPLETED
+from typing import Callable, Dict, List, Set
+
+
+class BlockGraph:
+    """
+    Dependency graph of the code blocks to run.
+
+    Nodes are positions in the registry, so blocks that are ready at the same time start in
+    document order.
+
+    Attributes:
+        registry (BlockRegistry): The registry of the code blocks.
+        nodes (list): Positions of the blocks to run, in document order.
+        dependencies (dict): Positions of the dependencies of each node.
+        dependents (dict): Positions of the nodes depending on each node.
+        status (dict): Result of each node that ran.
+    """
+
+    def __init__(self, registry, blocks: list):
+        self.registry = registry
+        positions = {id(block): position for position, block in enumerate(registry)}
+        self.dependencies: Dict[int, Set[int]] = {}
+        self.dependents: Dict[int, Set[int]] = {}
+        self.status: Dict[int, bool] = {}
+
+        pending = [positions[id(block)] for block in blocks]
+        while pending:
+            node = pending.pop()
+            if node in self.dependencies:
+                continue
+            block = registry[node]
+            self.dependencies[node] = set()
+            self.dependents.setdefault(node, set())
+            for name in block.depends:
+                targets = registry.by_name.get(name)
+                if not targets:
+                    raise ValueError(
+                        f"Code block '{block.name}' depends on unknown block '{name}'."
+                    )
+                for target in targets:
+                    self.dependencies[node].add(target)
+                    self.dependents.setdefault(target, set()).add(node)
+                    pending.append(target)
+
+        self.nodes = sorted(self.dependencies)
+        self._check_cycles()
+
+    def _check_cycles(self) -> None:
+        """Raise a ValueError if the dependencies contain a cycle."""
+        state = {}
+        for root in self.nodes:
+            if root in state:
+                continue
+            # Iterative depth-first search: 1 while on the stack, 2 once done
+            stack = [(root, iter(sorted(self.dependencies[root])))]
+            state[root] = 1
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    state[node] = 2
+                    stack.pop()
+                elif state.get(child) == 1:
+                    path = [n for n, _ in stack]
+                    cycle = path[path.index(child) :] + [child]
+                    names = " -> ".join(self.registry[n].name for n in cycle)
+                    raise ValueError(f"Dependency cycle between code blocks: {names}")
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(sorted(self.dependencies[child]))))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def skipped(self) -> List:
+        """Code blocks that did not run, in document order."""
+        return [self.registry[node] for node in self.nodes if node not in self.status]
+
+    def run(self, run_block: Callable, jobs: int = 1, keep_going: bool = False) -> bool:
+        """
+        Run the code blocks with a blocking function, each block in a thread.
+
+        Args:
+            run_block (Callable): Function running a code block and returning True on success.
+            jobs (int): Maximum number of code blocks running at the same time.
+            keep_going (bool): Keep starting the blocks that do not depend on a failed block,
+                instead of stopping at the first failure.
+
+        Returns:
+            bool: True if all the code blocks ran and succeeded.
+        """
+
+        async def arun_block(block) -> bool:
+            return await asyncio.to_thread(run_block, block)
+
+        return asyncio.run(self.arun(arun_block, jobs, keep_going))
+
+    async def arun(
+        self, arun_block: Callable, jobs: int = 1, keep_going: bool = False
+    ) -> bool:
+        """
+        Run the code blocks, each one once all its dependencies succeeded.
+
+        Args:
+            arun_block (Callable): Coroutine function running a code block and returning True
+                on success.
+            jobs (int): Maximum number of code blocks running at the same time.
+            keep_going (bool): Keep starting the blocks that do not depend on a failed block,
+                instead of stopping at the first failure.
+
+        Returns:
+            bool: True if all the code blocks ran and succeeded.
+        """
+        jobs = max(1, jobs)
+        remaining = {node: len(self.dependencies[node]) for node in self.nodes}
+        ready = [node for node in self.nodes if remaining[node] == 0]
+        heapq.heapify(ready)
+        failed = False
+        running = {}
+
+        try:
+            while ready or running:
+                while ready and len(running) < jobs and not failed:
+                    node = heapq.heappop(ready)
+                    task = asyncio.ensure_future(arun_block(self.registry[node]))
+                    running[task] = node
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=FIRST_COMPLETED)
+                for task in sorted(done, key=running.get):
+                    node = running.pop(task)
+                    try:
+                        success = bool(task.result())
+                    except Exception as e:
+                        print(
+                            f"Error: Code block '{self.registry[node].name}' failed with "
+                            f"exception: {e}"
+                        )
+                        success = False
+                    self.status[node] = success
+
+                    if not success:
+                        failed = failed or not keep_going
+                        continue
+                    for dependent in self.dependents[node]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            heapq.heappush(ready, dependent)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.wait(running)
+
+        return len(self.status) == len(self.nodes) and all(self.status.values())
@@ -0,0 +1,388 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Execution Traces
+
+This module records where the time of a runmd command goes, as a trace in the Trace Event Format
+that can be loaded in `chrome://tracing` or the Perfetto UI. Tracing is enabled for the whole
+process with `enable_tracing`; the helpers of this module do nothing while it is disabled.
+
+The trace holds the loading of the configuration, the discovery of the Markdown files, the parsing
+of each file and, for each code block, the spawning of its process, its first output and its exit.
+Code blocks running at the same time are drawn on separate lanes. Files parsed by worker processes
+are drawn under the process that parsed them.
+
+Functions:
+    - enable_tracing: Start recording a trace.
+    - disable_tracing: Stop recording the trace.
+    - get_tracer: Return the tracer recording the trace, if any.
+    - span: Record the duration of a step of the command.
+    - timed_call: Call a function and return its result with its timing.
+
+Classes:
+    - Tracer: Events of a trace.
+    - BlockTrace: Events of a code block.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+_tracer = None
+
+
+class Tracer:
+    """
+    Events of a trace.
+
+    Timestamps are `time.perf_counter` values, which share a clock across processes on the
+    supported platforms, and are written in microseconds from the start of the trace.
+
+    Attributes:
+        origin (float): Start of the trace.
+        events (list): The recorded events.
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.events = []
+        self._pid = os.getpid()
+        self._lanes = set()
+        self._lane_count = 0
+        self._workers = set()
+        self._lock = threading.Lock()
+
+    def _timestamp(self, at: float) -> float:
+        return round((at - self.origin) * 1e6, 3)
+
+    def complete(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        lane: int = 0,
+        args: Optional[dict] = None,
+        pid: Optional[int] = None,
+    ) -> None:
+        """
+        Record a step with its duration.
+
+        Args:
+            name (str): Name of the step.
+            category (str): Category of the step.
+            start (float): Start of the step.
+            end (float): End of the step.
+            lane (int): Lane of the step, 0 for the main lane.
+            args (dict): Details shown with the step.
+            pid (int): Process running the step, runmd itself if None.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._timestamp(start),
+            "dur": round(max(0.0, end - start) * 1e6, 3),
+            "pid": self._pid if pid is None else pid,
+            "tid": lane if pid is None else pid,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def instant(
+        self,
+        name: str,
+        category: str,
+        at: Optional[float] = None,
+        lane: int = 0,
+        args: Optional[dict] = None,
+    ) -> None:
+        """
+        Record an event without duration.
+
+        Args:
+            name (str): Name of the event.
+            category (str): Category of the event.
+            at (float): Time of the event, now if None.
+            lane (int): Lane of the event, 0 for the main lane.
+            args (dict): Details shown with the event.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": self._timestamp(time.perf_counter() if at is None else at),
+            "pid": self._pid,
+            "tid": lane,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def add_call(self, name: str, category: str, timed: tuple, args=None):
+        """
+        Record a call timed by `timed_call`, possibly in another process.
+
+        Args:
+            name (str): Name of the step.
+            category (str): Category of the step.
+            timed (tuple): The value returned by `timed_call`.
+            args (dict): Details shown with the step.
+
+        Returns:
+            The result of the call.
+        """
+        result, pid, start, end = timed
+        if pid == self._pid:
+            self.complete(name, category, start, end, args=args)
+        else:
+            with self._lock:
+                self._workers.add(pid)
+            self.complete(name, category, start, end, args=args, pid=pid)
+        return result
+
+    def acquire_lane(self) -> int:
+        """
+        Take the first lane not used by a running code block.
+
+        Returns:
+            int: The lane, starting from 1.
+        """
+        with self._lock:
+            lane = 1
+            while lane in self._lanes:
+                lane += 1
+            self._lanes.add(lane)
+            self._lane_count = max(self._lane_count, lane)
+            return lane
+
+    def release_lane(self, lane: int) -> None:
+        """
+        Give back a lane once its code block is done.
+
+        Args:
+            lane (int): The lane returned by `acquire_lane`.
+        """
+        with self._lock:
+            self._lanes.discard(lane)
+
+    def to_dict(self) -> dict:
+        """
+        Return the trace in the Trace Event Format.
+
+        Returns:
+            dict: The trace, with the names of its processes and lanes.
+        """
+
+        def metadata(name: str, pid: int, tid: int, value: str) -> dict:
+            return {
+                "name": name,
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": value},
+            }
+
+        with self._lock:
+            events = [
+                metadata("process_name", self._pid, 0, "runmd"),
+                metadata("thread_name", self._pid, 0, "main"),
+            ]
+            for lane in range(1, self._lane_count + 1):
+                events.append(
+                    metadata("thread_name", self._pid, lane, f"block lane {lane}")
+                )
+            for pid in sorted(self._workers):
+                events.append(metadata("process_name", pid, pid, "runmd parser"))
+            events.extend(self.events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path) -> None:
+        """
+        Write the trace to a JSON file.
+
+        Args:
+            path (str): Path to the trace file.
+        """
+        try:
+            with open(path, "w") as ftrace:
+                json.dump(self.to_dict(), ftrace)
+                ftrace.write("\n")
+        except OSError as e:
+            print(f"Error writing trace file: {e}")
+
+
+class BlockTrace:
+    """
+    Events of a code block.
+
+    The block takes a lane when it starts and gives it back when `finish` is called. All the
+    methods do nothing when tracing is disabled.
+
+    Attributes:
+        block (Block): The code block.
+        tracer (Tracer): The tracer, or None if tracing is disabled.
+        lane (int): The lane of the block.
+        start (float): Start of the block.
+    """
+
+    def __init__(self, block):
+        self.block = block
+        self.tracer = _tracer
+        self.lane = 0
+        self.start = time.perf_counter()
+        if self.tracer is not None:
+            self.lane = self.tracer.acquire_lane()
+
+    def complete(self, name: str, start: float, end: float) -> None:
+        """
+        Record a step of the block.
+
+        Args:
+            name (str): Name of the step.
+            start (float): Start of the step.
+            end (float): End of the step.
+        """
+        if self.tracer is not None:
+            self.tracer.complete(name, "block", start, end, self.lane)
+
+    def instant(self, name: str, at: Optional[float] = None) -> None:
+        """
+        Record an event of the block.
+
+        Args:
+            name (str): Name of the event.
+            at (float): Time of the event, now if None.
+        """
+        if self.tracer is not None:
+            self.tracer.instant(name, "block", at, self.lane)
+
+    def finish(
+        self,
+        status: Optional[str] = None,
+        returncode: Optional[int] = None,
+        first_output: Optional[float] = None,
+        cached: bool = False,
+    ) -> None:
+        """
+        Record the whole block and give its lane back.
+
+        Args:
+            status (str): Exit status of the block, None if it could not be started.
+            returncode (int): Exit code of the block.
+            first_output (float): Time of the first output of the block, if any.
+            cached (bool): Whether the result was replayed from the result cache.
+        """
+        if self.tracer is None:
+            return
+        block = self.block
+        args = {
+            "file": None if block.file is None else str(block.file),
+            "line": block.line,
+            "lang": block.lang,
+            "status": status,
+            "returncode": returncode,
+        }
+        if first_output is not None:
+            self.instant("first output", first_output)
+            args["time_to_first_output_ms"] = round(
+                (first_output - self.start) * 1e3, 3
+            )
+        if cached:
+            args["cached"] = True
+        self.tracer.complete(
+            block.name, "block", self.start, time.perf_counter(), self.lane, args
+        )
+        self.tracer.release_lane(self.lane)
+        self.tracer = None
+
+
+def enable_tracing(origin: Optional[float] = None) -> Tracer:
+    """
+    Start recording a trace.
+
+    Args:
+        origin (float): Start of the trace as a `time.perf_counter` value, now if None.
+
+    Returns:
+        Tracer: The tracer recording the trace.
+    """
+    global _tracer
+    _tracer = Tracer(origin)
+    return _tracer
+
+
+def disable_tracing() -> Optional[Tracer]:
+    """
+    Stop recording the trace.
+
+    Returns:
+        Tracer: The tracer that was recording the trace, if any.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Return the tracer recording the trace, if any.
+
+    Returns:
+        Tracer: The tracer, or None if tracing is disabled.
+    """
+    return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "runmd", **args) -> Iterator[None]:
+    """
+    Record the duration of a step of the command on the main lane.
+
+    Args:
+        name (str): Name of the step.
+        category (str): Category of the step.
+        **args: Details shown with the step.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.complete(name, category, start, time.perf_counter(), args=args)
+
+
+def timed_call(func: Callable, *args) -> tuple:
+    """
+    Call a function and return its result with its timing.
+
+    The function can run in a worker process: the timing is recorded with `Tracer.add_call` once
+    the result is back.
+
+    Args:
+        func (Callable): The function to call.
+        *args: Arguments of the function.
+
+    Returns:
+        tuple: The result of the call, the process ID, and the start and end of the call.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, os.getpid(), start, time.perf_counter()
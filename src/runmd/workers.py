@@ -0,0 +1,425 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2024 Damien Pageot.
+#
+# This file is part of Your Project Name.
+#
+# Licensed under the MIT License. You may obtain a copy of the License at:
+# https://opensource.org/licenses/MIT
+# -----------------------------------------------------------------------------
+
+"""
+Warm Interpreter Workers
+
+This module provides a pool of pre-started interpreter processes, so that running many small code
+blocks does not pay the interpreter startup time for each of them. Python and Node.js are
+supported. Workers are started with the command and options of their language section, the worker
+program taking the place of the code of a block.
+
+Functions:
+    - encode_frame: Encode a message of the worker protocol.
+    - read_frame: Read a message of the worker protocol.
+
+Classes:
+    - Worker: A running interpreter process executing code blocks.
+    - WorkerPool: Pool of warm workers, by language section.
+
+Constants:
+    - PYTHON_WORKER: Source of the Python worker program.
+    - NODE_WORKER: Source of the Node.js worker program.
+    - WORKER_SOURCES: Worker programs by worker kind.
+    - DEFAULT_WORKERS: Worker kinds of the default language sections.
+
+Protocol:
+    Messages are framed as a one-letter type, the decimal length of the payload, a newline and
+    the payload. runmd sends `R` messages holding a JSON object with the `code` and `env` of a
+    block. The worker answers with an empty `R` message once started, `O` and `X` messages holding
+    the standard output and error of the block, and an `E` message holding its exit code. Blocks read an empty standard
+    input, and the working directory is restored after each of them.
+"""
+
+import json
+import subprocess
+import threading
+from typing import IO, Iterator, Optional
+
+PYTHON_WORKER = r"""
+import json, os, sys, traceback
+
+protocol = os.fdopen(os.dup(1), "wb", buffering=0)
+os.dup2(2, 1)
+# Blocks reading their standard input must not consume the requests
+requests = os.fdopen(os.dup(0), "rb")
+null = os.open(os.devnull, os.O_RDONLY)
+os.dup2(null, 0)
+os.close(null)
+stdin = sys.stdin
+cwd = os.getcwd()
+
+
+def send(kind, payload):
+    protocol.write(b"%s%d\n" % (kind, len(payload)) + payload)
+
+
+class Output:
+    encoding, errors = "utf-8", "replace"
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.pending = []
+        self.buffer = Buffer(self)
+
+    def write(self, text):
+        # Keep the order of the output of both streams
+        other = error_output if self is output else output
+        other.flush()
+        self.pending.append(text)
+        if "\n" in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.pending:
+            send(self.kind, "".join(self.pending).encode("utf-8", "replace"))
+            self.pending = []
+
+    def isatty(self):
+        return False
+
+    def writable(self):
+        return True
+
+
+class Buffer:
+    def __init__(self, text):
+        self.text = text
+
+    def write(self, data):
+        output.flush()
+        error_output.flush()
+        send(self.text.kind, bytes(data))
+        return len(data)
+
+    def flush(self):
+        self.text.flush()
+
+
+output, error_output = Output(b"O"), Output(b"X")
+sys.stdout, sys.stderr = output, error_output
+send(b"R", b"")
+while True:
+    header = requests.readline()
+    if not header:
+        break
+    request = json.loads(requests.read(int(header[1:])))
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = ["-c"]
+    sys.stdin = stdin
+    status = 0
+    try:
+        exec(compile(request["code"], "<string>", "exec"), {"__name__": "__main__"})
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        kind, value, tb = sys.exc_info()
+        traceback.print_exception(kind, value, tb.tb_next)
+        status = 1
+    os.chdir(cwd)
+    output.flush()
+    error_output.flush()
+    send(b"E", str(status).encode())
+"""
+
+NODE_WORKER = r"""
+const fs = require("fs");
+const vm = require("vm");
+
+function send(kind, payload) {
+  const data = Buffer.from(payload);
+  let frame = Buffer.concat([Buffer.from(kind + data.length + "\n"), data]);
+  while (frame.length) {
+    try {
+      frame = frame.subarray(fs.writeSync(1, frame));
+    } catch (e) {
+      if (e.code !== "EAGAIN") throw e;
+    }
+  }
+}
+
+function writer(kind) {
+  return (chunk, encoding, callback) => {
+    send(kind, typeof chunk === "string" ? chunk : Buffer.from(chunk));
+    const done = typeof encoding === "function" ? encoding : callback;
+    if (done) done();
+    return true;
+  };
+}
+process.stdout.write = writer("O");
+process.stderr.write = writer("X");
+
+// Blocks reading their standard input must not consume the requests
+const requests = process.stdin;
+const cwd = process.cwd();
+let stdin = null;
+Object.defineProperty(process, "stdin", {
+  configurable: true,
+  enumerable: true,
+  get: () => stdin || (stdin = fs.createReadStream("/dev/null")),
+});
+
+async function run(request) {
+  for (const key of Object.keys(process.env)) delete process.env[key];
+  Object.assign(process.env, request.env);
+  process.exitCode = undefined;
+  stdin = null;
+  let status = 0;
+  try {
+    await vm.runInThisContext("(async () => {\n" + request.code + "\n})")();
+    status = process.exitCode || 0;
+  } catch (e) {
+    process.stderr.write((e && e.stack ? e.stack : String(e)) + "\n");
+    status = 1;
+  }
+  process.chdir(cwd);
+  process.exitCode = undefined;
+  send("E", String(status));
+}
+
+let buffer = Buffer.alloc(0);
+let queue = Promise.resolve();
+requests.on("data", (chunk) => {
+  buffer = Buffer.concat([buffer, chunk]);
+  for (;;) {
+    const newline = buffer.indexOf(10);
+    if (newline < 0) break;
+    const length = parseInt(buffer.toString("latin1", 1, newline), 10);
+    if (buffer.length < newline + 1 + length) break;
+    const request = JSON.parse(buffer.toString("utf8", newline + 1, newline + 1 + length));
+    buffer = buffer.subarray(newline + 1 + length);
+    queue = queue.then(() => run(request));
+  }
+});
+requests.on("end", () => queue.then(() => process.exit(0)));
+send("R", "");
+"""
+
+WORKER_SOURCES = {"python": PYTHON_WORKER, "node": NODE_WORKER}
+DEFAULT_WORKERS = {"python": "python", "javascript": "node"}
+
+
+def encode_frame(kind: bytes, payload: bytes) -> bytes:
+    """
+    Encode a message of the worker protocol.
+
+    Args:
+        kind (bytes): The one-letter type of the message.
+        payload (bytes): The payload of the message.
+
+    Returns:
+        bytes: The framed message.
+    """
+    return b"%s%d\n" % (kind, len(payload)) + payload
+
+
+def read_frame(stream: IO[bytes]) -> Optional[tuple]:
+    """
+    Read a message of the worker protocol.
+
+    Args:
+        stream (IO[bytes]): The stream to read from.
+
+    Returns:
+        tuple: The type and payload of the message, or None if the stream is closed or corrupted.
+    """
+    header = stream.readline()
+    if not header.endswith(b"\n") or not header[1:-1].isdigit():
+        return None
+    length = int(header[1:-1])
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return header[:1], payload
+
+
+class Worker:
+    """
+    A running interpreter process executing code blocks.
+
+    Attributes:
+        process (subprocess.Popen): The interpreter process.
+        blocks (int): Number of blocks executed by the worker.
+        returncode (int): Exit code of the last executed block.
+    """
+
+    def __init__(self, command: list):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.blocks = 0
+        self.returncode = None
+
+        # Wait for the worker to be ready
+        if read_frame(self.process.stdout) != (b"R", b""):
+            self.close()
+            raise RuntimeError(f"worker '{command[0]}' failed to start")
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def execute(self, code: str, env: dict) -> Iterator[bytes]:
+        """
+        Execute a code block and stream its output.
+
+        Once the generator is exhausted, `returncode` holds the exit code of the block. If the
+        worker dies while running the block, its exit code is used.
+
+        Args:
+            code (str): The code to execute.
+            env (dict): Environment variables of the block.
+
+        Yields:
+            tuple: The stream of each chunk of raw output, 1 for the standard output and 2 for the
+                standard error, and the chunk.
+        """
+        self.blocks += 1
+        self.returncode = None
+        request = json.dumps({"code": code, "env": env}).encode("utf-8")
+        try:
+            self.process.stdin.write(encode_frame(b"R", request))
+            self.process.stdin.flush()
+        except OSError:
+            self.returncode = self.close()
+            return
+
+        while True:
+            frame = read_frame(self.process.stdout)
+            if frame is None:
+                self.returncode = self.close() or 1
+                return
+            kind, payload = frame
+            if kind == b"O":
+                yield 1, payload
+            elif kind == b"X":
+                yield 2, payload
+            elif kind == b"E":
+                self.returncode = int(payload)
+                return
+
+    def close(self) -> Optional[int]:
+        """
+        Stop the worker.
+
+        Returns:
+            int: The exit code of the interpreter process.
+        """
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            return self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            return self.process.wait()
+
+
+class WorkerPool:
+    """
+    Pool of warm workers, by language section.
+
+    Workers are started on first use and recycled after a number of blocks, which bounds the
+    state a long-lived interpreter can accumulate (imported modules, leaked memory). A worker runs
+    one block at a time: blocks executed concurrently get their own worker.
+
+    Attributes:
+        config (ConfigLoader): The configuration.
+        max_blocks (int): Number of blocks executed by a worker before it is restarted.
+        workers (dict): The idle workers, by language section.
+    """
+
+    def __init__(self, config, max_blocks: int = 100):
+        self.config = config
+        self.max_blocks = max_blocks
+        self.workers = {}
+        self._busy = set()
+        self._unavailable = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def acquire(self, lang_section: str, command: list) -> Optional[Worker]:
+        """
+        Take a warm worker for a language section, starting one if none is idle.
+
+        Args:
+            lang_section (str): The language section, without the `lang.` prefix.
+            command (list): The command of the language.
+
+        Returns:
+            Worker: The worker, or None if the language has no worker or it failed to start.
+        """
+        with self._lock:
+            if lang_section in self._unavailable:
+                return None
+            idle = self.workers.setdefault(lang_section, [])
+            while idle:
+                worker = idle.pop()
+                if worker.alive and worker.blocks < self.max_blocks:
+                    self._busy.add(worker)
+                    return worker
+                worker.close()
+
+        language = self.config.languages[lang_section]
+        source = WORKER_SOURCES.get(language.worker)
+        if source is None:
+            with self._lock:
+                self._unavailable.add(lang_section)
+            return None
+
+        try:
+            worker = Worker(command + list(language.options) + [source])
+        except (OSError, RuntimeError) as e:
+            print(f"Warning: Using fresh processes for '{lang_section}': {e}")
+            with self._lock:
+                self._unavailable.add(lang_section)
+            return None
+
+        with self._lock:
+            self._busy.add(worker)
+        return worker
+
+    def release(self, lang_section: str, worker: Worker) -> None:
+        """
+        Give a worker back to the pool once its block is done.
+
+        Args:
+            lang_section (str): The language section of the worker.
+            worker (Worker): The worker returned by `acquire`.
+        """
+        with self._lock:
+            self._busy.discard(worker)
+            if worker.alive and worker.blocks < self.max_blocks:
+                self.workers.setdefault(lang_section, []).append(worker)
+                return
+        worker.close()
+
+    def close(self) -> None:
+        """Stop all the workers."""
+        with self._lock:
+            workers = [worker for idle in self.workers.values() for worker in idle]
+            workers.extend(self._busy)
+            self.workers.clear()
+            self._busy.clear()
+        for worker in workers:
+            worker.close()
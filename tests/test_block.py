@@ -0,0 +1,36 @@
+import unittest
+import pickle
+import os
+import tempfile
+from pathlib import Path
+from runmd.block import Block
+
+class TestBlock(unittest.TestCase):
+
+    def setUp(self):
+        self.block = Block(name='hello', lang='python', code='print(1)', tag='t', file=Path('a.md'), start=10, end=20)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.block.unknown = 1
+
+    def test_dict_round_trip(self):
+        data = self.block.to_dict()
+        self.assertNotIn('file', data)
+        self.assertNotIn('code', data)
+        self.assertEqual(Block.from_dict(data, file=Path('a.md')).to_dict(), data)
+
+    def test_lazy_code(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".md", delete=False) as tmp:
+            tmp.write(b"```sh {name=lazy}\n    echo 1\n      echo 2\n    ```\n")
+        try:
+            block = Block(name='lazy', lang='sh', file=tmp.name, start=18, end=42, indent=4)
+            self.assertEqual(block.code, "echo 1\n  echo 2")
+        finally:
+            os.remove(tmp.name)
+
+    def test_pickle(self):
+        self.assertEqual(pickle.loads(pickle.dumps(self.block)), self.block)
+
+if __name__ == '__main__':
+    unittest.main()
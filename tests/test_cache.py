@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from runmd.cache import BlockIndex, ResultCache, file_digest
+from runmd.parser import parse_markdown
+
+class TestBlockIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"XDG_CACHE_HOME": self.tmpdir.name})
+        self.env.start()
+        self.md_path = Path(self.tmpdir.name) / "doc.md"
+        self.md_path.write_text("```python {name=hello, tag=t}\nprint(1)\n```\n")
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    def index_file(self, languages=["python"]):
+        index = BlockIndex(languages, root=self.tmpdir.name)
+        blocks = index.get(self.md_path)
+        if blocks is None:
+            blocks = parse_markdown(self.md_path, languages)
+            index.put(self.md_path, blocks)
+        index.save()
+        return index, blocks
+
+    # --------------------------------------------------
+    # >> GET / PUT
+    # --------------------------------------------------
+
+    def test_index_hit(self):
+        index, blocks = self.index_file()
+        self.assertEqual(index.misses, 1)
+        index, cached = self.index_file()
+        self.assertEqual(index.hits, 1)
+        self.assertListEqual(cached, blocks)
+
+    def test_index_modified_file(self):
+        self.index_file()
+        self.md_path.write_text("```python {name=other}\nprint(2)\n```\n")
+        index, blocks = self.index_file()
+        self.assertEqual(index.misses, 1)
+        self.assertEqual(blocks[0].name, "other")
+
+    def test_index_touched_file(self):
+        self.index_file()
+        stat = self.md_path.stat()
+        os.utime(self.md_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        index, _ = self.index_file()
+        self.assertEqual(index.hits, 1)
+
+    def test_index_languages_changed(self):
+        self.index_file()
+        index, _ = self.index_file(["python", "ruby"])
+        self.assertEqual(index.misses, 1)
+
+    # --------------------------------------------------
+    # >> PRUNE
+    # --------------------------------------------------
+
+    def test_prune(self):
+        index, _ = self.index_file()
+        index.prune([])
+        self.assertEqual(index.entries, {})
+
+    # --------------------------------------------------
+    # >> FILE_DIGEST
+    # --------------------------------------------------
+
+    def test_file_digest(self):
+        self.md_path.write_text("hello")
+        self.assertEqual(
+            file_digest(self.md_path),
+            "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+        )
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"XDG_CACHE_HOME": self.tmpdir.name})
+        self.env.start()
+        self.command = [sys.executable]
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    # --------------------------------------------------
+    # >> KEY
+    # --------------------------------------------------
+
+    def test_key(self):
+        results = ResultCache()
+        key = results.key("print(1)", self.command, ["-c"], {"A": "1", "B": "2"})
+        self.assertEqual(key, results.key("print(1)", self.command, ["-c"], {"B": "2", "A": "1"}))
+        self.assertNotEqual(key, results.key("print(2)", self.command, ["-c"], {"A": "1", "B": "2"}))
+        self.assertNotEqual(key, results.key("print(1)", self.command, ["-c", "-u"], {"A": "1", "B": "2"}))
+        self.assertNotEqual(key, results.key("print(1)", self.command, ["-c"], {"A": "1"}))
+
+    def test_key_interpreter_changed(self):
+        interpreter = Path(self.tmpdir.name) / "python"
+        interpreter.write_text("v1")
+        key = ResultCache().key("print(1)", [str(interpreter)], ["-c"], {})
+        interpreter.write_text("v2.0")
+        self.assertNotEqual(key, ResultCache().key("print(1)", [str(interpreter)], ["-c"], {}))
+
+    # --------------------------------------------------
+    # >> GET / PUT
+    # --------------------------------------------------
+
+    def test_get_put(self):
+        results = ResultCache()
+        key = results.key("print(1)", self.command, ["-c"], {})
+        self.assertIsNone(results.get(key))
+        results.put(key, "1\n", 0)
+        self.assertEqual(results.get(key), {"output": "1\n", "returncode": 0})
+        self.assertEqual((results.hits, results.misses, results.stored), (1, 1, 1))
+
+        results.save()
+        self.assertEqual(ResultCache().load_stats(), {"hits": 1, "misses": 1})
+
+    def test_put_too_large(self):
+        results = ResultCache(max_size=100)
+        results.put("key", "x" * 100, 0)
+        self.assertIsNone(results.get("key"))
+
+    # --------------------------------------------------
+    # >> PRUNE
+    # --------------------------------------------------
+
+    def test_prune_least_recently_used(self):
+        results = ResultCache(max_size=100)
+        for i, key in enumerate(["a", "b", "c"]):
+            results.put(key, "x" * 10, 0)
+            os.utime(results.path / f"{key}.json", ns=(i * 10**9, i * 10**9))
+        results.get("a")
+
+        self.assertEqual(results.prune(), 1)
+        self.assertEqual(sorted(path.stem for path, _ in results.entries()), ["a", "c"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -73,3 +73,42 @@
 
 # if __name__ == '__main__':
 #     unittest.main()
+
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from runmd.cli import main
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = Path(self.tmpdir.name)
+        patcher = patch.dict(os.environ, {"HOME": str(self.root / "home"), "XDG_CACHE_HOME": str(self.root / "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop("RUNMD_CONFIG", None)
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+
+    # --------------------------------------------------
+    # >> RUN
+    # --------------------------------------------------
+
+    def test_run_unique_names_with_depends(self):
+        (self.root / ".runmd.ini").write_text("[DEFAULT]\nunique_names = true\n")
+        (self.root / "a.md").write_text(
+            "```sh {name=build, depends=fetch}\ntest -f fetched && touch built\n```\n"
+        )
+        (self.root / "b.md").write_text("```sh {name=fetch}\ntouch fetched\n```\n")
+
+        with patch("builtins.print"):
+            main(["run", "build"])
+        self.assertTrue((self.root / "fetched").exists())
+        self.assertTrue((self.root / "built").exists())
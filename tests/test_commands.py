@@ -1,6 +1,6 @@
 import unittest
 import argparse
-from runmd.commands import create_commons, add_run_command, add_show_command, add_list_command, add_hist_command, add_vault_command
+from runmd.commands import create_commons, add_run_command, add_show_command, add_list_command, add_hist_command, add_vault_command, add_cache_command, add_config_command
 from runmd.commands import CmdNames
 
 class TestAddCommands(unittest.TestCase):
@@ -23,6 +23,10 @@ class TestAddCommands(unittest.TestCase):
         self.assertEqual(args.blockname, 'my_block')
         self.assertEqual(args.tag, None)
         self.assertEqual(args.env, [])
+        self.assertEqual(args.parallel, None)
+
+        args = self.parser.parse_args(['run', 'all', '-j', '4', '-p', '2'])
+        self.assertEqual((args.jobs, args.parallel), (4, 2))
 
     # --------------------------------------------------
     # >> ADD_SHOW_COMMAND
@@ -101,7 +105,29 @@ class TestAddCommands(unittest.TestCase):
         add_vault_command(self.subparsers)
         with self.assertRaises(SystemExit):
             self.parser.parse_args(['vault', '--encrypt', 'test.md', '--decrypt', 'test.md'])
-        
+
+    # --------------------------------------------------
+    # >> ADD_CACHE_COMMAND
+    # --------------------------------------------------
+
+    def test_add_cache_command(self):
+        """Test if 'cache' command is correctly added."""
+        add_cache_command(self.subparsers)
+        args = self.parser.parse_args(['cache', 'stats'])
+        self.assertEqual(args.command, CmdNames.CACHECMD.value)
+        self.assertEqual(args.action, 'stats')
+
+    # --------------------------------------------------
+    # >> ADD_CONFIG_COMMAND
+    # --------------------------------------------------
+
+    def test_add_config_command(self):
+        """Test if 'config' command is correctly added."""
+        add_config_command(self.subparsers)
+        args = self.parser.parse_args(['config', 'show'])
+        self.assertEqual(args.command, CmdNames.CONFIGCMD.value)
+        self.assertEqual(args.action, 'show')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,18 +1,21 @@
 import unittest
 from unittest.mock import patch, mock_open
 import json
-from runmd.config import ConfigLoader, CONFIG_DIR_NAME, CONFIG_FILE_NAME
+from runmd.config import ConfigLoader, LanguageTable, CONFIG_DIR_NAME, CONFIG_FILE_NAME, PROJECT_CONFIG_NAME, find_project_config, print_config
 import configparser
 from pathlib import Path
 import pytest
+from runmd.trace import disable_tracing, enable_tracing
 import tempfile
 from configparser import ConfigParser
 import os
 
 @pytest.fixture
-def temp_config_dir():
+def temp_config_dir(monkeypatch):
     """Creates a temporary directory for testing"""
     with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setenv("XDG_CACHE_HOME", temp_dir)
+        monkeypatch.delenv("RUNMD_CONFIG", raising=False)
         config_dir = Path(temp_dir) / CONFIG_DIR_NAME
         config_dir.mkdir()
         config_file = config_dir / CONFIG_FILE_NAME
@@ -76,6 +79,167 @@ def test_get_language_options(config_loader):
     options = config_loader.get_language_options('python')
     assert options == ['-v']
 
+def test_find_language_exact_alias(config_loader):
+    with open(config_loader.default_config_path, 'w') as f:
+        f.write('[lang.bash]\naliases = bash\ncommand = bash\noptions = -c\n'
+                '[lang.shell]\naliases = sh, shell\ncommand = sh\noptions = -c')
+    assert config_loader.find_language('sh') == 'shell'
+    assert config_loader.find_language('ba') is None
+
+def test_language_table():
+    config = ConfigParser()
+    config.read_dict({
+        'lang.python': {'aliases': 'py, python', 'command': 'python3 -u', 'options': '-c', 'timeout': '2m'},
+        'lang.javascript': {'aliases': 'js, javascript', 'command': 'node', 'options': '-e', 'delivery': 'FD'},
+        'lang.pypy': {'aliases': 'py, pypy', 'command': 'pypy', 'options': '-c', 'worker': 'none'},
+    })
+    languages = LanguageTable(config)
+    assert languages.aliases == ('py', 'python', 'js', 'javascript', 'pypy')
+    assert languages.find('py').name == 'python'
+    assert languages.find('pypy').worker == 'none'
+    assert languages.find('ruby') is None
+    python = languages['python']
+    assert (python.command, python.options, python.worker, python.limits.timeout) == (('python3', '-u'), ('-c',), 'python', 120)
+    javascript = languages['javascript']
+    assert (javascript.delivery, javascript.script_options) == ('fd', ('--preserve-symlinks-main',))
+    assert len(languages) == 3 and 'pypy' in languages
+
+def write_config(config_loader, text):
+    with open(config_loader.default_config_path, 'w') as f:
+        f.write(text)
+
+def test_snapshot_reused(config_loader):
+    write_config(config_loader, '[DEFAULT]\nhistsize = 7\nworkers = yes\n[lang.python]\naliases = py, python\ncommand = python\noptions = -c\ntimeout = 1m')
+    assert config_loader.find_language('py') == 'python'
+    assert os.path.exists(config_loader.snapshot_path)
+
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    with patch.object(ConfigLoader, '_load_config') as mock_load_config:
+        assert loader.get_histsize() == 7
+        assert loader.get_workers() is True
+        assert loader.languages.find('python').limits.timeout == 60
+        mock_load_config.assert_not_called()
+
+def test_compile_traced(config_loader):
+    write_config(config_loader, '[DEFAULT]\nhistsize = 7\n[lang.python]\naliases = py\ncommand = python\noptions = -c')
+    tracer = enable_tracing()
+    try:
+        assert config_loader.get_histsize() == 7
+        config_loader.get_all_aliases()
+    finally:
+        disable_tracing()
+    event, = tracer.events
+    assert (event["name"], event["cat"]) == ("load config", "config")
+    assert event["dur"] > 0
+
+def test_snapshot_invalidated(config_loader):
+    write_config(config_loader, '[DEFAULT]\nhistsize = 7\n[lang.python]\naliases = py\ncommand = python\noptions = -c')
+    assert config_loader.get_histsize() == 7
+    write_config(config_loader, '[DEFAULT]\nhistsize = 42\n[lang.python]\naliases = py, python3\ncommand = python\noptions = -c')
+
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    assert loader.get_histsize() == 42
+    assert loader.get_all_aliases() == ['py', 'python3']
+
+def test_snapshot_touched(config_loader):
+    write_config(config_loader, '[lang.python]\naliases = py\ncommand = python\noptions = -c')
+    config_loader.get_all_aliases()
+    stat = os.stat(config_loader.default_config_path)
+    os.utime(config_loader.default_config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    with patch.object(ConfigLoader, '_load_config') as mock_load_config:
+        assert loader.get_all_aliases() == ['py']
+        mock_load_config.assert_not_called()
+    with open(loader.snapshot_path) as f:
+        assert json.load(f)["layers"][0]["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+def test_find_project_config(tmp_path):
+    (tmp_path / PROJECT_CONFIG_NAME).write_text('[DEFAULT]\njobs = 2\n')
+    (tmp_path / 'docs' / 'guide').mkdir(parents=True)
+    assert find_project_config(tmp_path / 'docs' / 'guide') == tmp_path / PROJECT_CONFIG_NAME
+
+def test_project_layer(config_loader, tmp_path, monkeypatch):
+    write_config(config_loader, '[DEFAULT]\nhistsize = 7\njobs = 1\n[lang.python]\naliases = py, python\ncommand = python\noptions = -c')
+    project_path = tmp_path / PROJECT_CONFIG_NAME
+    project_path.write_text('[DEFAULT]\njobs = 4\ncache = yes\nignore = drafts/ *.tmp.md\n[lang.python]\ncommand = .venv/bin/python\n')
+    monkeypatch.chdir(tmp_path)
+
+    assert config_loader.layer_paths == [config_loader.default_config_path, project_path]
+    assert config_loader.get_histsize() == 7
+    assert config_loader.get_jobs() == 4
+    assert config_loader.get_cache() is True
+    assert config_loader.get_ignore_patterns() == ['drafts/', '*.tmp.md']
+    language = config_loader.languages['python']
+    assert language.command == ('.venv/bin/python',)
+    assert language.options == ('-c',)
+
+    sources = config_loader.sources
+    assert sources['DEFAULT']['histsize'] == config_loader.default_config_path
+    assert sources['DEFAULT']['jobs'] == project_path
+    assert sources['lang.python']['command'] == project_path
+    assert sources['lang.python']['options'] == config_loader.default_config_path
+
+def test_env_layer(config_loader, tmp_path, monkeypatch):
+    write_config(config_loader, '[DEFAULT]\njobs = 1\n[lang.python]\naliases = py\ncommand = python\noptions = -c')
+    assert config_loader.get_jobs() == 1
+    snapshot_path = config_loader.snapshot_path
+    env_path = tmp_path / 'ci.ini'
+    env_path.write_text('[DEFAULT]\njobs = 8\n')
+    monkeypatch.setenv('RUNMD_CONFIG', str(env_path))
+
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    assert loader.get_jobs() == 8
+    assert loader.snapshot_path != snapshot_path
+
+    monkeypatch.setenv('RUNMD_CONFIG', str(tmp_path / 'missing.ini'))
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    with pytest.raises(FileNotFoundError):
+        loader.get_jobs()
+
+def test_snapshot_invalidated_by_layer(config_loader, tmp_path, monkeypatch):
+    write_config(config_loader, '[DEFAULT]\njobs = 1\n')
+    project_path = tmp_path / PROJECT_CONFIG_NAME
+    project_path.write_text('[DEFAULT]\njobs = 2\n')
+    monkeypatch.chdir(tmp_path)
+    assert config_loader.get_jobs() == 2
+
+    project_path.write_text('[DEFAULT]\njobs = 3\n')
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    assert loader.get_jobs() == 3
+
+def test_invalid_default_setting(config_loader):
+    write_config(config_loader, '[DEFAULT]\njobs = many\n')
+    with pytest.raises(ValueError, match="jobs"):
+        config_loader.get_jobs()
+
+def test_history_backend(config_loader):
+    write_config(config_loader, '[DEFAULT]\nhistory_backend = SQLite\n')
+    assert config_loader.get_history_backend() == 'sqlite'
+
+    write_config(config_loader, '[DEFAULT]\nhistory_backend = csv\n')
+    loader = ConfigLoader()
+    loader.default_config_path = config_loader.default_config_path
+    with pytest.raises(ValueError, match="history_backend"):
+        loader.get_history_backend()
+
+def test_print_config(config_loader, tmp_path, monkeypatch, capsys):
+    write_config(config_loader, '[DEFAULT]\njobs = 1\n[lang.python]\naliases = py\ncommand = python\noptions = -c')
+    project_path = tmp_path / PROJECT_CONFIG_NAME
+    project_path.write_text('[DEFAULT]\njobs = 4\n')
+    monkeypatch.chdir(tmp_path)
+
+    print_config(config_loader)
+    output = capsys.readouterr().out
+    assert f"jobs = 4  ; {project_path}" in output
+    assert f"command = python  ; {config_loader.default_config_path}" in output
+
 def test_validate_lang_section(config_loader):
     with open(config_loader.default_config_path, 'w') as f:
         f.write('[lang.python]\naliases = py, python\ncommand = python\noptions =')
@@ -117,6 +281,14 @@ def test_validate_lang_section_invalid_options(config_loader):
     with pytest.raises(ValueError):
         config_loader._validate_lang_section('lang.python')
 
+def test_validate_lang_section_invalid_delivery(config_loader):
+    config = configparser.ConfigParser()
+    config.read_string('[lang.python]\naliases = py, python\ncommand = python\noptions = -c\ndelivery = pipe\n')
+    with pytest.raises(ValueError, match="invalid 'delivery' field"):
+        config_loader._validate_lang_section(config['lang.python'])
+    config['lang.python']['delivery'] = 'Stdin'
+    config_loader._validate_lang_section(config['lang.python'])
+
 #
 # class TestRunmdConfig(unittest.TestCase):
 #
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from runmd.block import Block
+from runmd.database import DATABASE_FILE_NAME, HistoryDatabase
+from runmd.history import record_history
+from runmd.report import RunReport
+
+class TestHistoryDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.hist_path = Path(self.tmpdir.name) / "runmd" / "history.jsonl"
+        patcher = patch("runmd.history.get_history_path", return_value=self.hist_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("runmd.database.get_history_path", return_value=self.hist_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open(self):
+        database = HistoryDatabase()
+        self.addCleanup(database.close)
+        return database
+
+    def report(self, *names):
+        report = RunReport("runmd run all")
+        for name in names:
+            report.record(Block(name=name, file='README.md', lang='bash', line=3), "OK", 0, 0.5)
+        return report
+
+    # --------------------------------------------------
+    # >> CREATE
+    # --------------------------------------------------
+
+    def test_create(self):
+        database = self.open()
+        self.assertEqual(database.path, self.hist_path.with_name(DATABASE_FILE_NAME))
+        self.assertEqual(database.connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        indexes = {row[0] for row in database.connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({"runs_root", "runs_date", "runs_status", "blocks_name"} <= indexes)
+
+    def test_import_history_log(self):
+        record_history(10, "runmd run a", True)
+        record_history(10, "runmd run b", False)
+        database = self.open()
+        self.assertEqual([run["id"] for run in database.query()], [0, 1])
+        self.assertEqual(database.record(10, "runmd run c", True), 2)
+
+    # --------------------------------------------------
+    # >> RECORD
+    # --------------------------------------------------
+
+    def test_record(self):
+        database = self.open()
+        run_id = database.record(10, "runmd run all", True, self.report("build", "test"))
+        self.assertEqual(database.find(run_id)["command"], "runmd run all")
+        blocks = database.connection.execute("SELECT name, wall FROM blocks WHERE run_id = ?", (run_id,)).fetchall()
+        self.assertEqual([tuple(block) for block in blocks], [("build", 0.5), ("test", 0.5)])
+        self.assertIsNone(database.find(run_id + 1))
+
+    def test_record_histsize(self):
+        database = self.open()
+        for i in range(5):
+            database.record(2, f"runmd run {i}", True, self.report("build"))
+        self.assertEqual([run["command"] for run in database.query()], ["runmd run 3", "runmd run 4"])
+        # The blocks of the deleted runs are deleted too
+        self.assertEqual(database.connection.execute("SELECT COUNT(*) FROM blocks").fetchone()[0], 2)
+
+    # --------------------------------------------------
+    # >> QUERY
+    # --------------------------------------------------
+
+    def test_query(self):
+        database = self.open()
+        database.record(10, "runmd run build", True, self.report("build"))
+        database.record(10, "runmd run test", False, self.report("test"))
+        database.connection.execute("UPDATE runs SET date = '2024-01-01T00:00:00', root = '/elsewhere' WHERE id = 1")
+
+        self.assertEqual([run["id"] for run in database.query(failed=True)], [2])
+        self.assertEqual([run["id"] for run in database.query(root=os.getcwd())], [2])
+        self.assertEqual([run["id"] for run in database.query(since="2025-01-01")], [2])
+        runs = database.query(block="build")
+        self.assertEqual([run["id"] for run in runs], [1])
+        self.assertEqual([block["name"] for block in runs[0]["blocks"]], ["build"])
+        self.assertEqual(database.query(block="build", failed=True), [])
+
+    def test_clear(self):
+        database = self.open()
+        database.record(10, "runmd run build", True, self.report("build"))
+        database.clear()
+        self.assertEqual(database.query(), [])
+        self.assertEqual(database.connection.execute("SELECT COUNT(*) FROM blocks").fetchone()[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
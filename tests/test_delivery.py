@@ -0,0 +1,62 @@
+import configparser
+import os
+import subprocess
+import sys
+import unittest
+from runmd.config import LanguageTable
+from runmd.delivery import MAX_ARGUMENT_SIZE, CodeDelivery, write_input
+
+class TestRunmdDelivery(unittest.TestCase):
+
+    def setUp(self):
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({
+            'lang.python': {'command': 'python', 'options': '-c', 'delivery': 'stdin', 'script_options': '-u'},
+            'lang.javascript': {'command': 'node', 'options': '-e', 'delivery': 'FD'},
+        })
+
+    # --------------------------------------------------
+    # >> CODE_DELIVERY
+    # --------------------------------------------------
+
+    def test_argv(self):
+        with CodeDelivery('print(1)', 'argv', ['-c'], ['-u']) as delivery:
+            self.assertEqual(delivery.arguments, ['-c', 'print(1)'])
+            self.assertIsNone(delivery.input)
+            self.assertEqual(delivery.pass_fds, ())
+
+    def test_auto(self):
+        self.assertEqual(CodeDelivery('print(1)', 'auto', ['-c']).mode, 'argv')
+        with CodeDelivery('#' * MAX_ARGUMENT_SIZE, 'auto', ['-c']) as delivery:
+            self.assertIn(delivery.mode, ('fd', 'stdin'))
+            self.assertNotIn('-c', delivery.arguments)
+
+    def test_stdin(self):
+        with CodeDelivery('print("é")', 'stdin', ['-c'], ['-u']) as delivery:
+            self.assertEqual(delivery.arguments, ['-u', '-'])
+            process = subprocess.Popen([sys.executable] + delivery.arguments, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            write_input(process.stdin, delivery.input)
+            self.assertEqual(process.stdout.read(), 'é\n'.encode())
+            process.wait()
+
+    @unittest.skipUnless(hasattr(os, 'memfd_create'), 'requires memfd_create')
+    def test_fd(self):
+        code = 'x = "%s"\nprint(len(x))' % ('a' * 4 * MAX_ARGUMENT_SIZE)
+        with CodeDelivery(code, 'fd', ['-c']) as delivery:
+            self.assertEqual(delivery.arguments, [f'/dev/fd/{delivery.fd}'])
+            output = subprocess.run([sys.executable] + delivery.arguments, pass_fds=delivery.pass_fds, capture_output=True)
+            fd = delivery.fd
+        self.assertEqual(output.stdout, b'%d\n' % (4 * MAX_ARGUMENT_SIZE))
+        self.assertIsNone(delivery.fd)
+        with self.assertRaises(OSError):
+            os.fstat(fd)
+
+    def test_for_language(self):
+        languages = LanguageTable(self.config)
+        delivery = CodeDelivery.for_language('print(1)', languages['python'])
+        self.assertEqual((delivery.mode, delivery.arguments), ('stdin', ['-u', '-']))
+        with CodeDelivery.for_language('1', languages['javascript']) as delivery:
+            self.assertEqual(delivery.arguments[0], '--preserve-symlinks-main')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import tempfile
+from pathlib import Path
+from runmd.discovery import glob_to_regex, find_markdown_files
+
+class TestDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        for relpath in ["a.md", "b.txt", "node_modules/x/n.md", ".hidden/h.md", "sub/build/b.md",
+                        "sub/c.md", "keep/k.md", "keep/skip.md", "keep/z.md", "deep/er/d.md"]:
+            path = self.root / relpath
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("# doc\n")
+        (self.root / ".gitignore").write_text("build/\nkeep/*.md\n!keep/k.md\n")
+        (self.root / "keep" / ".runmdignore").write_text("z.md\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def find(self, **kwargs):
+        return [path.relative_to(self.root).as_posix() for path in find_markdown_files(self.tmpdir.name, **kwargs)]
+
+    # --------------------------------------------------
+    # >> GLOB_TO_REGEX
+    # --------------------------------------------------
+
+    def test_glob_to_regex(self):
+        self.assertTrue(glob_to_regex("docs/**/*.md").match("docs/a/b/c.md"))
+        self.assertTrue(glob_to_regex("docs/**/*.md").match("docs/c.md"))
+        self.assertFalse(glob_to_regex("docs/*.md").match("docs/a/c.md"))
+        self.assertTrue(glob_to_regex("f[!0-9]?.md").match("fa1.md"))
+
+    # --------------------------------------------------
+    # >> FIND_MARKDOWN_FILES
+    # --------------------------------------------------
+
+    def test_find_markdown_files(self):
+        self.assertEqual(self.find(), ["a.md", "deep/er/d.md", "keep/k.md", "sub/c.md"])
+
+    def test_find_markdown_files_max_depth(self):
+        self.assertEqual(self.find(max_depth=1), ["a.md", "keep/k.md", "sub/c.md"])
+
+    def test_find_markdown_files_include(self):
+        self.assertEqual(self.find(include=["deep/**/*.md", "*.txt"]), ["b.txt", "deep/er/d.md"])
+
+    def test_find_markdown_files_ignore(self):
+        self.assertEqual(self.find(ignore=["deep/", "!keep/z.md", "c.md"]), ["a.md", "keep/k.md"])
+
+    def test_find_markdown_files_symlink_loop(self):
+        try:
+            (self.root / "sub" / "up").symlink_to("..", target_is_directory=True)
+        except (OSError, NotImplementedError):
+            self.skipTest("symbolic links are not supported")
+        self.assertEqual(self.find(), ["a.md", "deep/er/d.md", "keep/k.md", "sub/c.md"])
+
+    def test_find_markdown_files_no_exclusion(self):
+        self.assertIn("node_modules/x/n.md", self.find(skip_excluded=False))
+
+if __name__ == '__main__':
+    unittest.main()
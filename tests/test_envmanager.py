@@ -2,8 +2,9 @@ import unittest
 import dotenv
 import os
 from pathlib import Path
-from runmd.envmanager import load_dotenv, load_process_env, update_runenv_file, merge_envs
+from runmd.envmanager import SessionStore, load_dotenv, load_process_env, update_runenv_file, merge_envs
 import base64
+from unittest.mock import patch
 
 class TestEnvManager(unittest.TestCase):
 
@@ -44,4 +45,36 @@ class TestEnvManager(unittest.TestCase):
         env = {'VAR1': 'oldvalue1', 'VAR2': 'oldvalue2'}
         runenv = {'VAR1': 'dmFsdWUx', 'VAR2': 'dmFsdWUy', 'VAR3': 'dmFsdWUz'}
         merge_envs(env, runenv)
-        self.assertEqual(env, self.fake_env)
\ No newline at end of file
+        self.assertEqual(env, self.fake_env)
+
+
+    def test_session_store_load(self):
+        update_runenv_file({'VAR1': 'value1', '__': 'last line'})
+        session = SessionStore()
+        # VAR2 was written without encoding by setUp and is kept as is
+        self.assertEqual(session.values, {'VAR1': 'value1', 'VAR2': 'value2', '__': 'last line'})
+        env = {'VAR1': 'oldvalue1'}
+        session.apply(env)
+        self.assertEqual(env, session.values)
+
+    def test_session_store_flush(self):
+        with SessionStore() as session:
+            session.set('__', 'it\'s "quoted"')
+            session.set('VAR1', 'new value')
+        self.assertEqual(SessionStore().values, {'VAR1': 'new value', 'VAR2': 'value2', '__': 'it\'s "quoted"'})
+        self.assertEqual(dotenv.dotenv_values(".session")['VAR1'], 'bmV3IHZhbHVl')
+        self.assertEqual([name for name in os.listdir('.') if name.startswith('.session-')], [])
+
+    def test_session_store_single_write(self):
+        session = SessionStore()
+        with patch('runmd.envmanager.os.replace') as mock_replace:
+            session.flush()
+            mock_replace.assert_not_called()
+            for i in range(10):
+                session.set('__', f'line {i}')
+            session.flush()
+            session.flush()
+        mock_replace.assert_called_once()
+        for name in os.listdir('.'):
+            if name.startswith('.session-'):
+                os.remove(name)
@@ -7,7 +7,7 @@ import datetime
 import tempfile
 
 # Import the functions to test
-from runmd.history import get_history_path, load_history, write_history, update_history, print_history, clean_command
+from runmd.history import get_history_path, load_history, write_history, update_history, print_history, clean_command, record_history, find_history_entry, parse_history, parse_since, filter_history, LEGACY_HISTORY_FILE_NAME
 
 class TestHistoryFunctions(unittest.TestCase):
 
@@ -23,6 +23,86 @@ class TestHistoryFunctions(unittest.TestCase):
         self.assertEqual(updated_history[-1]['id'], 2)
         self.assertEqual(updated_history[-1]['command'], "run another.md")
 
+    # --------------------------------------------------
+    # >> RECORD_HISTORY
+    # --------------------------------------------------
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hist_path = Path(self.tmpdir.name) / "runmd" / "history.jsonl"
+        patcher = patch("runmd.history.get_history_path", return_value=self.hist_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_record_history(self):
+        record_history(10, "runmd run a", True)
+        record_history(10, "runmd run b", False)
+        lines = self.hist_path.read_text().splitlines()
+        self.assertEqual(len(lines), 2)
+        history = load_history()
+        self.assertEqual([entry["id"] for entry in history], [0, 1])
+        self.assertEqual(history[1]["command"], "runmd run b")
+        self.assertEqual(history[1]["status"], "FAIL")
+
+    def test_record_history_appends(self):
+        record_history(10, "runmd run a", True)
+        with patch("runmd.history.parse_history", wraps=parse_history) as mock_parse:
+            record_history(10, "runmd run b", True)
+            # Only the last line is decoded
+            self.assertEqual(mock_parse.call_count, 1)
+
+    def test_record_history_compaction(self):
+        for i in range(7):
+            record_history(3, f"runmd run {i}", True)
+        self.assertEqual([entry["id"] for entry in load_history()], [4, 5, 6])
+        record_history(3, "runmd run 7", True)
+        record_history(3, "runmd run 8", True)
+        self.assertEqual([entry["id"] for entry in load_history()], [4, 5, 6, 7, 8])
+        record_history(3, "runmd run 9", True)
+        self.assertEqual([entry["id"] for entry in load_history()], [7, 8, 9])
+
+    def test_record_history_truncated_line(self):
+        record_history(10, "runmd run a", True)
+        with open(self.hist_path, "a") as fhistory:
+            fhistory.write('{"id": 1, "comm')
+        record_history(10, "runmd run b", True)
+        self.assertEqual([entry["id"] for entry in load_history()], [0, 1])
+
+    def test_migrate_history(self):
+        legacy_path = self.hist_path.with_name(LEGACY_HISTORY_FILE_NAME)
+        legacy_path.parent.mkdir(parents=True)
+        legacy_path.write_text(json.dumps([{"id": 4, "date": "2024-01-01T12:00:00", "root": "/", "command": "runmd run a", "status": "SUCCESS"}], indent=2))
+        record_history(10, "runmd run b", True)
+        self.assertFalse(legacy_path.exists())
+        self.assertEqual([entry["id"] for entry in load_history()], [4, 5])
+
+    def test_find_history_entry(self):
+        history = [{"id": 4, "command": "runmd run a"}, {"id": 5, "command": "runmd run b"}]
+        self.assertEqual(find_history_entry(history, 5)["command"], "runmd run b")
+        self.assertIsNone(find_history_entry(history, 0))
+
+    # --------------------------------------------------
+    # >> FILTER_HISTORY
+    # --------------------------------------------------
+
+    def test_parse_since(self):
+        self.assertEqual(parse_since("2024-12-01"), "2024-12-01T00:00:00")
+        since = datetime.datetime.fromisoformat(parse_since("2d"))
+        self.assertAlmostEqual((datetime.datetime.now() - since).total_seconds(), 2 * 86400, delta=60)
+        with self.assertRaises(ValueError):
+            parse_since("yesterday")
+
+    def test_filter_history(self):
+        history = [
+            {"id": 1, "date": "2024-01-01T12:00:00", "root": os.getcwd(), "command": "runmd run a", "status": "SUCCESS"},
+            {"id": 2, "date": "2024-02-01T12:00:00", "root": "/elsewhere", "command": "runmd run b", "status": "FAIL"},
+            {"id": 3, "date": "2024-03-01T12:00:00", "root": os.getcwd(), "command": "runmd run c", "status": "FAIL"},
+        ]
+        self.assertEqual([entry["id"] for entry in filter_history(history, root=".")], [1, 3])
+        self.assertEqual([entry["id"] for entry in filter_history(history, failed=True)], [2, 3])
+        self.assertEqual([entry["id"] for entry in filter_history(history, since="2024-02-01", root=".")], [3])
+
     # --------------------------------------------------
     # >> PRINT_HISTORY
     # --------------------------------------------------
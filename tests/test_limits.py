@@ -0,0 +1,114 @@
+import configparser
+import os
+import signal
+import subprocess
+import unittest
+try:
+    import resource
+except ImportError:
+    resource = None
+from runmd.block import Block
+from runmd.limits import (
+    STATUS_FAILED,
+    STATUS_OK,
+    STATUS_OOM,
+    STATUS_TIMEOUT,
+    ResourceLimits,
+    exit_status,
+    parse_duration,
+    parse_size,
+)
+
+class TestRunmdLimits(unittest.TestCase):
+
+    def setUp(self):
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({'lang.python': {'command': 'python', 'timeout': '2m', 'max_memory': '1G'}})
+
+    # --------------------------------------------------
+    # >> PARSE
+    # --------------------------------------------------
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("90"), 90)
+        self.assertEqual(parse_duration("1.5s"), 1.5)
+        self.assertEqual(parse_duration("2m"), 120)
+        self.assertEqual(parse_duration("1H"), 3600)
+        self.assertEqual(parse_duration("500ms"), 0.5)
+        self.assertIsNone(parse_duration("soon"))
+        self.assertIsNone(parse_duration("0"))
+        self.assertIsNone(parse_duration(None))
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertEqual(parse_size("512M"), 512 << 20)
+        self.assertEqual(parse_size("2GiB"), 2 << 30)
+        self.assertEqual(parse_size("1.5k"), 1536)
+        self.assertIsNone(parse_size("lots"))
+
+    # --------------------------------------------------
+    # >> RESOURCE_LIMITS
+    # --------------------------------------------------
+
+    def test_from_section(self):
+        self.config['lang.python']['max_cpu'] = 'never'
+        limits = ResourceLimits.from_section(self.config['lang.python'])
+        self.assertEqual((limits.timeout, limits.max_memory, limits.max_cpu), (120, 1 << 30, None))
+
+    def test_resolve(self):
+        defaults = ResourceLimits.from_section(self.config['lang.python'])
+        block = Block(name='a', lang='python', max_memory=1 << 20, max_cpu=5)
+        limits = ResourceLimits.resolve(block, defaults)
+        self.assertEqual((limits.timeout, limits.max_memory, limits.max_cpu), (120, 1 << 20, 5))
+        self.assertEqual(ResourceLimits.resolve(block, defaults, timeout=3).timeout, 3)
+        block.timeout = 1
+        self.assertEqual(ResourceLimits.resolve(block, defaults, timeout=3).timeout, 1)
+
+    def test_no_limits(self):
+        limits = ResourceLimits.resolve(Block(name='a', lang='bash'), ResourceLimits())
+        self.assertFalse(limits)
+        self.assertIsNone(limits.preexec())
+
+    def test_isolated(self):
+        self.assertFalse(ResourceLimits().isolated)
+        self.assertEqual(ResourceLimits(timeout=1).isolated, os.name == "posix")
+
+    @unittest.skipUnless(hasattr(resource, "prlimit"), "requires resource.prlimit")
+    def test_apply(self):
+        limits = ResourceLimits(max_memory=1 << 30, max_cpu=1.5)
+        self.assertIsNone(limits.preexec())
+        process = subprocess.Popen(["sleep", "5"])
+        try:
+            limits.apply(process.pid)
+            self.assertEqual(resource.prlimit(process.pid, resource.RLIMIT_AS), (1 << 30, 1 << 30))
+            self.assertEqual(resource.prlimit(process.pid, resource.RLIMIT_CPU), (2, 3))
+        finally:
+            process.kill()
+            process.wait()
+        # Exited processes are ignored
+        limits.apply(process.pid)
+
+    # --------------------------------------------------
+    # >> EXIT_STATUS
+    # --------------------------------------------------
+
+    def test_exit_status(self):
+        limits = ResourceLimits(max_memory=1 << 20, max_cpu=1)
+        self.assertEqual(exit_status(0, limits), STATUS_OK)
+        self.assertEqual(exit_status(0, limits, timed_out=True), STATUS_TIMEOUT)
+        self.assertEqual(exit_status(-signal.SIGXCPU, limits), STATUS_TIMEOUT)
+        self.assertEqual(exit_status(128 + signal.SIGKILL, limits, shell=True), STATUS_TIMEOUT)
+        self.assertEqual(exit_status(1, limits, last_line="MemoryError"), STATUS_OOM)
+        self.assertEqual(exit_status(-signal.SIGSEGV, limits), STATUS_OOM)
+        self.assertEqual(exit_status(1, limits, last_line="ValueError"), STATUS_FAILED)
+        self.assertEqual(exit_status(-signal.SIGSEGV, ResourceLimits()), STATUS_FAILED)
+
+    def test_exit_status_high_exit_code(self):
+        limits = ResourceLimits(max_memory=1 << 30)
+        self.assertEqual(exit_status(137, limits), STATUS_FAILED)
+        self.assertEqual(exit_status(200, limits), STATUS_FAILED)
+        self.assertEqual(exit_status(255, limits, shell=True), STATUS_FAILED)
+        self.assertEqual(exit_status(128 + signal.SIGSEGV, limits, shell=True), STATUS_OOM)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 import re
-from runmd.parser import compile_pattern, detect_shebang,parse_markdown
+import os
+import tempfile
+from runmd.block import Block
+from unittest.mock import patch
+from runmd.parser import compile_pattern, detect_shebang, iter_blocks, parse_attributes, parse_depends, parse_limits, parse_markdown
 
 class TestRunmdParser(unittest.TestCase):
 
@@ -42,8 +46,140 @@ class TestRunmdParser(unittest.TestCase):
         languages = ["python", "ruby"]
         blocklist = []
         expected = [
-            {'name': 'hello-python', 'tag': 'sometag', 'file': file_path, 'lang':'python', 'code': '# run with runmd run hello-python\nprint("Hello from Python!")', 'exec': True}, 
-            {'name': 'hello-ruby', 'tag': '', 'file': file_path, 'lang': 'ruby', 'code': '# run with runmd run hello-ruby\nputs "Hello from Ruby!"', 'exec': True}
+            Block(name='hello-python', tag='sometag', file=file_path, lang='python', code='# run with runmd run hello-python\nprint("Hello from Python!")', exec=True, start=78, end=140, line=5),
+            Block(name='hello-ruby', tag='', file=file_path, lang='ruby', code='# run with runmd run hello-ruby\nputs "Hello from Ruby!"', exec=True, start=187, end=243, line=12)
             ]
         blocklist = parse_markdown(file_path, languages)
-        self.assertListEqual(blocklist, expected)
\ No newline at end of file
+        self.assertListEqual(blocklist, expected)
+
+    def test_parse_markdown_tilde_and_indented_fences(self):
+        content = (
+            "~~~~python {name=tilde, tag=t1}\n"
+            "print(1)\n"
+            "```\n"
+            "~~~~\n"
+            "\n"
+            "    ```ruby {name=indented,tag=docker}\n"
+            "    if true\n"
+            "      puts 1\n"
+            "    end\n"
+            "    ```\n"
+        )
+        with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False) as tmp:
+            tmp.write(content)
+        try:
+            blocklist = parse_markdown(tmp.name, ["python", "ruby"])
+            self.assertEqual([block.name for block in blocklist], ["tilde", "indented"])
+            self.assertEqual([block.line for block in blocklist], [1, 6])
+            self.assertEqual(blocklist[0].code, "print(1)\n```")
+            self.assertEqual(blocklist[1].code, "if true\n  puts 1\nend")
+            self.assertEqual(blocklist[1].tag, "docker")
+        finally:
+            os.remove(tmp.name)
+
+    def test_parse_markdown_crlf(self):
+        content = (
+            b"# Title\r\n"
+            b"```sh {name=one, tag=x}\r\n"
+            b"#!/bin/bash\r\n"
+            b"echo one\r\n"
+            b"ls /tmp\r\n"
+            b"```\r\n"
+            b"\r\n"
+            b"  ```sh {name=two}\r\n"
+            b"  echo two\r\n"
+            b"  ```\r\n"
+        )
+        with tempfile.NamedTemporaryFile("wb", suffix=".md", delete=False) as tmp:
+            tmp.write(content)
+        try:
+            blocklist = parse_markdown(tmp.name, ["sh"])
+            self.assertEqual([block.name for block in blocklist], ["one", "two"])
+            self.assertEqual(blocklist[0].tag, "x")
+            self.assertEqual(blocklist[0].code, "#!/bin/bash\necho one\nls /tmp")
+            self.assertEqual(blocklist[0].shebang, "/bin/bash")
+            self.assertEqual(blocklist[1].code, "echo two")
+        finally:
+            os.remove(tmp.name)
+
+    def test_parse_markdown_unterminated_fence(self):
+        content = "".join(f"```python {{name=b{i}, tag=t\nx = 1\n" for i in range(500))
+        with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False) as tmp:
+            tmp.write(content + "```python {name=last}\nprint(1)\n")
+        try:
+            blocklist = parse_markdown(tmp.name, ["python"])
+        finally:
+            os.remove(tmp.name)
+        self.assertListEqual(blocklist, [])
+
+    def test_parse_markdown_block_shebang(self):
+        content = (
+            "#!/bin/sh\n"
+            "```bash {name=first}\n"
+            "\n"
+            "#!/usr/bin/env   bash  \n"
+            "echo 1\n"
+            "```\n"
+            "```bash {name=second}\n"
+            "echo 2\n"
+            "#!/bin/zsh\n"
+            "```\n"
+        )
+        with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False) as tmp:
+            tmp.write(content)
+        try:
+            blocklist = parse_markdown(tmp.name, ["bash"])
+        finally:
+            os.remove(tmp.name)
+        self.assertEqual([block.name for block in blocklist], ["first", "second"])
+        self.assertEqual([block.shebang for block in blocklist], ["/usr/bin/env   bash", None])
+
+    def test_parse_markdown_cache_attribute(self):
+        content = (
+            "```bash {name=first, cache=true}\necho 1\n```\n"
+            "```bash {name=second, cache=no}\necho 2\n```\n"
+            "```bash {name=third}\necho 3\n```\n"
+        )
+        with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False) as tmp:
+            tmp.write(content)
+        try:
+            blocklist = parse_markdown(tmp.name, ["bash"])
+        finally:
+            os.remove(tmp.name)
+        self.assertEqual([block.cache for block in blocklist], [True, False, False])
+
+    def test_parse_limits(self):
+        limits = parse_limits({"name": "a", "timeout": "2m", "max_memory": "512M", "max_cpu": "10"})
+        self.assertEqual(limits, {"timeout": 120, "max_memory": 512 << 20, "max_cpu": 10})
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(parse_limits({"name": "a", "timeout": "soon"}), {})
+        mock_print.assert_called_once_with("Warning: Ignoring invalid timeout 'soon' of code block 'a'.")
+
+    # --------------------------------------------------
+    # >> ITER_BLOCKS
+    # --------------------------------------------------
+
+    def test_iter_blocks_is_lazy(self):
+        opened = []
+
+        def paths():
+            for path in ["tests/test_markdown.md", "missing.md"]:
+                opened.append(path)
+                yield path
+
+        blocks = iter_blocks(paths(), ["python", "ruby"])
+        self.assertEqual(next(blocks).name, "hello-python")
+        self.assertEqual(opened, ["tests/test_markdown.md"])
+        self.assertEqual(next(blocks).name, "hello-ruby")
+
+    # --------------------------------------------------
+    # >> PARSE_ATTRIBUTES
+    # --------------------------------------------------
+
+    def test_parse_attributes(self):
+        result = parse_attributes("name=build, tag=ci, depends=fetch,lint")
+        self.assertEqual(result, {"name": "build", "tag": "ci", "depends": "fetch,lint"})
+
+    def test_parse_depends(self):
+        self.assertEqual(parse_depends("fetch, lint,"), ("fetch", "lint"))
+        self.assertEqual(parse_depends(""), ())
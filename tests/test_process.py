@@ -1,8 +1,15 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import ANY, patch, AsyncMock, MagicMock
 from pathlib import Path
-from runmd.process import process_markdown_files, list_command, show_code_block, show_command, run_command
+from runmd.block import Block
+from runmd.config import LanguageTable
+from runmd.parser import iter_blocks, parse_markdown
+from runmd.process import arun_command, resolve_jobs, find_block, process_markdown_files, parse_files, list_command, show_code_block, show_command, run_command
+import asyncio
 import configparser
+import os
+import sys
+import tempfile
 from io import StringIO
 import re
 
@@ -27,7 +34,7 @@ class TestMarkdownProcessing(unittest.TestCase):
         mock_instance.config = configparser.ConfigParser()
         mock_instance.get_all_aliases = mock_get_languages
         mock_get_languages.return_value = ["python"]
-        mock_parse_markdown.return_value = [{'name': 'hello-python', 'tag': 'sometag', 'lang': 'python', 'file': Path('tests/test_markdown.md'), 'code': 'print("Hello World")', 'exec': True}]
+        mock_parse_markdown.return_value = [Block(name='hello-python', tag='sometag', lang='python', file=Path('tests/test_markdown.md'), code='print("Hello World")', exec=True)]
 
         mock_instance.config.add_section('lang.python')
         mock_instance.config.set('lang.python', 'aliases', 'py, python')
@@ -39,7 +46,38 @@ class TestMarkdownProcessing(unittest.TestCase):
 
         # Assertions
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]['name'], 'hello-python')
+        self.assertEqual(result[0].name, 'hello-python')
+
+    # --------------------------------------------------
+    # >> FIND_BLOCK
+    # --------------------------------------------------
+
+    def test_find_block_stops_at_first_match(self):
+        config = MagicMock()
+        config.get_all_aliases.return_value = ["python"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ["a.md", "b.md"]:
+                with open(os.path.join(tmpdir, name), "w") as fmd:
+                    fmd.write(f"```python {{name={name[0]}}}\nprint(1)\n```\n")
+
+            with patch('runmd.process.iter_blocks', wraps=iter_blocks) as mock_iter_blocks:
+                result = find_block(tmpdir, config, 'a')
+                self.assertEqual([block.name for block in result], ['a'])
+                self.assertEqual(mock_iter_blocks.call_count, 1)
+
+                self.assertEqual(len(find_block(tmpdir, config, 'missing')), 0)
+
+    # --------------------------------------------------
+    # >> PARSE_FILES
+    # --------------------------------------------------
+
+    def test_parse_files_parallel(self):
+        file_paths = [Path('tests/test_markdown.md'), Path('missing.md'), Path('README.md')]
+        with patch('builtins.print'):
+            sequential = parse_files(file_paths, ["python", "ruby", "bash", "sh"], jobs=1)
+            parallel = parse_files(file_paths, ["python", "ruby", "bash", "sh"], jobs=2)
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(parallel[1], ([], None))
 
     # --------------------------------------------------
     # >> LIST_COMMAND
@@ -47,7 +85,7 @@ class TestMarkdownProcessing(unittest.TestCase):
 
     @patch('builtins.print')
     def test_list_command(self, mock_print):
-        blocklist = [{'name': 'test_block',  'tag': 'sometag','lang': 'python', 'file': Path('test.md')}]
+        blocklist = [Block(name='test_block', tag='sometag', lang='python', file=Path('test.md'))]
         
         # Call the function to be tested
         list_command(blocklist, 'sometag')
@@ -69,7 +107,7 @@ class TestMarkdownProcessing(unittest.TestCase):
     @patch('runmd.process.show_code_block')
     @patch('builtins.print')
     def test_show_command(self, mock_print, mock_show_code_block):
-        blocklist = [{'name': 'test_block', 'tag': 'sometag', 'lang': 'python', 'code': 'print("Hello World")'}]
+        blocklist = [Block(name='test_block', tag='sometag', lang='python', code='print("Hello World")')]
         
         show_command(blocklist, 'test_block')
         
@@ -79,7 +117,7 @@ class TestMarkdownProcessing(unittest.TestCase):
     @patch('runmd.process.show_code_block')
     @patch('builtins.print')
     def test_show_command_invalid_block_name(self, mock_print, mock_show_code_block):
-        blocklist = [{'name': 'test_block', 'tag': 'sometag', 'lang': 'python', 'code': 'print("Hello World")'}]
+        blocklist = [Block(name='test_block', tag='sometag', lang='python', code='print("Hello World")')]
 
         show_command(blocklist, 'fake_block')
         
@@ -92,7 +130,7 @@ class TestMarkdownProcessing(unittest.TestCase):
     @patch('runmd.process.run_code_block')
     @patch('builtins.print')
     def test_run_command(self, mock_print, mock_run_code_block):
-        blocklist = [{'name': 'test_block',  'tag': 'sometag', 'lang': 'python', 'code': 'print("Hello World")', 'exec': True}]
+        blocklist = [Block(name='test_block', tag='sometag', lang='python', code='print("Hello World")', exec=True)]
         env_vars = {'MY_ENV': 'value'}
         
         self.config.add_section('lang.python')
@@ -102,12 +140,48 @@ class TestMarkdownProcessing(unittest.TestCase):
 
         run_command(blocklist, 'test_block', None, self.config, env_vars)
         
-        mock_run_code_block.assert_called_once_with('test_block', 'python', 'print("Hello World")', 'sometag', self.config, env_vars)
+        mock_run_code_block.assert_called_once_with(blocklist[0], self.config, env_vars, None, session=ANY, results=None, timeout=None, report=None)
         mock_print.assert_not_called()
 
+    @patch('runmd.process.arun_graph', new_callable=AsyncMock)
+    @patch('runmd.process.run_code_block')
+    def test_run_command_sequential_by_default(self, mock_run_code_block, mock_arun_graph):
+        blocklist = [Block(name=name, tag='t', lang='bash', code='true', exec=True) for name in ['one', 'two']]
+        mock_run_code_block.return_value = True
+
+        self.assertTrue(run_command(blocklist, None, 't', self.config, {}, jobs=None))
+        self.assertEqual([call[0][0].name for call in mock_run_code_block.call_args_list], ['one', 'two'])
+        mock_arun_graph.assert_not_called()
+
+    @patch('runmd.process.run_code_block')
+    def test_run_command_block_edits_its_file(self, mock_run_code_block):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'doc.md')
+            with open(path, 'w') as f:
+                f.write('```bash {name=one, tag=t}\necho one\n```\n```bash {name=two, tag=t}\necho two\n```\n')
+            blocklist = parse_markdown(path, ['bash'])
+
+            codes = []
+            def run(block, *args, **kwargs):
+                codes.append(block.code)
+                with open(path, 'r+') as f:
+                    content = f.read()
+                    f.seek(0)
+                    f.write('# Prepended by a block\n' + content)
+                return True
+            mock_run_code_block.side_effect = run
+
+            self.assertTrue(run_command(blocklist, None, 't', self.config, {}))
+        self.assertEqual(codes, ['echo one', 'echo two'])
+
+    def test_resolve_jobs(self):
+        self.assertEqual(resolve_jobs(None), 1)
+        self.assertEqual(resolve_jobs(3), 3)
+        self.assertEqual(resolve_jobs(0), os.cpu_count() or 1)
+
     @patch('builtins.print')
     def test_run_command_invalid_block_name(self, mock_print):
-        blocklist = [{'name': 'test_block',  'tag': 'sometag', 'lang': 'python', 'code': 'print("Hello World")', 'exec': True}]
+        blocklist = [Block(name='test_block', tag='sometag', lang='python', code='print("Hello World")', exec=True)]
         env_vars = {'MY_ENV': 'value'}
 
         self.config.add_section('lang.python')
@@ -119,11 +193,47 @@ class TestMarkdownProcessing(unittest.TestCase):
         
         mock_print.assert_any_call("Error: Code block with name 'fake_block' not found.")
 
+    @patch('runmd.process.arun_code_block', new_callable=AsyncMock)
+    @patch('builtins.print')
+    def test_run_command_with_depends(self, mock_print, mock_run_code_block):
+        blocklist = [
+            Block(name='build', tag='', lang='bash', file=Path('test.md'), code='make', depends=('fetch',)),
+            Block(name='fetch', tag='', lang='bash', file=Path('test.md'), code='git pull'),
+        ]
+        mock_run_code_block.return_value = True
+
+        self.assertTrue(run_command(blocklist, 'build', None, self.config, {}))
+        self.assertEqual([call[0][0].name for call in mock_run_code_block.call_args_list], ['fetch', 'build'])
+
+    @patch('builtins.print')
+    def test_arun_command_timeout(self, mock_print):
+        config = MagicMock()
+        config.config = configparser.ConfigParser()
+        config.config.read_dict({'lang.python': {'aliases': 'python', 'command': sys.executable, 'options': '-c'}})
+        config.languages = LanguageTable(config.config)
+        blocklist = [
+            Block(name='slow', tag='t', lang='python', code='import time\ntime.sleep(10)'),
+            Block(name='fast', tag='t', lang='python', code='import sys\nprint("out")\nprint("err", file=sys.stderr)'),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                success = asyncio.run(arun_command(blocklist, None, 't', config, {}, jobs=2, keep_going=True, timeout=1))
+            finally:
+                os.chdir(cwd)
+
+        self.assertFalse(success)
+        output = "".join(str(call[0][0]) for call in mock_print.call_args_list)
+        self.assertIn("timed out after 1s", output)
+        self.assertIn("out", output)
+        self.assertIn("err", output)
+
     @patch('runmd.process.run_code_block')
     @patch('builtins.print')
     def test_run_command_with_tag(self, mock_print, mock_run_code_block):
-        blocklist = [{'name': 'test_block1',  'tag': 'sometag1', 'lang': 'python', 'code': 'print("Hello World")', 'exec': True}, 
-                     {'name': 'test_block2',  'tag': 'sometag2', 'lang': 'python', 'code': 'print("Hello World")', 'exec': True}]
+        blocklist = [Block(name='test_block1', tag='sometag1', lang='python', code='print("Hello World")', exec=True), 
+                     Block(name='test_block2', tag='sometag2', lang='python', code='print("Hello World")', exec=True)]
         env_vars = {'MY_ENV': 'value'}
         
         self.config.add_section('lang.python')
@@ -133,14 +243,14 @@ class TestMarkdownProcessing(unittest.TestCase):
 
         run_command(blocklist, None, 'sometag1', self.config, env_vars)
         
-        mock_run_code_block.assert_called_once_with('test_block1', 'python', 'print("Hello World")', 'sometag1', self.config, env_vars)
+        mock_run_code_block.assert_called_once_with(blocklist[0], self.config, env_vars, None, session=ANY, results=None, timeout=None, report=None)
         mock_print.assert_not_called()
 
     @patch('runmd.process.run_code_block')
     @patch('builtins.print')
     def test_run_command_invalid_tag(self, mock_print, mock_run_code_block):
-        blocklist = [{'name': 'test_block1',  'tag': 'sometag1', 'lang': 'python', 'code': 'print("Hello World")', 'exec': True}, 
-                     {'name': 'test_block2',  'tag': 'sometag2', 'lang': 'python', 'code': 'print("Hello World")', 'exec': True}]
+        blocklist = [Block(name='test_block1', tag='sometag1', lang='python', code='print("Hello World")', exec=True), 
+                     Block(name='test_block2', tag='sometag2', lang='python', code='print("Hello World")', exec=True)]
         env_vars = {'MY_ENV': 'value'}
         
         self.config.add_section('lang.python')
@@ -0,0 +1,38 @@
+import unittest
+from runmd.block import Block
+from runmd.registry import BlockRegistry
+
+class TestBlockRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.blocks = [
+            Block(name='fetch', tag='ci', file='a.md', lang='bash', code='echo 1', exec=True),
+            Block(name='build', tag='', file='a.md', lang='python', code='print(2)', exec=True),
+            Block(name='test', tag='ci', file='b.md', lang='bash', code='echo 3', exec=True),
+            Block(name='build', tag='ci', file='b.md', lang='bash', code='echo 4', exec=True),
+        ]
+        self.registry = BlockRegistry(self.blocks)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.registry), 4)
+        self.assertEqual(list(self.registry), self.blocks)
+        self.assertEqual(self.registry[2].name, 'test')
+
+    def test_get(self):
+        self.assertIs(self.registry.get('build'), self.blocks[1])
+        self.assertIsNone(self.registry.get('missing'))
+
+    def test_indexes(self):
+        self.assertEqual(self.registry.with_name('build'), [self.blocks[1], self.blocks[3]])
+        self.assertEqual(self.registry.with_tag('ci'), [self.blocks[0], self.blocks[2], self.blocks[3]])
+        self.assertEqual(self.registry.in_file('a.md'), self.blocks[:2])
+        self.assertEqual(self.registry.with_lang('python'), [self.blocks[1]])
+
+    def test_select(self):
+        self.assertEqual(self.registry.select('all'), self.blocks)
+        self.assertEqual(self.registry.select('build', None), [self.blocks[1], self.blocks[3]])
+        self.assertEqual(self.registry.select('fetch', 'ci'), [self.blocks[0], self.blocks[2], self.blocks[3]])
+        self.assertEqual(self.registry.select('missing', 'other'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import resource
+import tempfile
+import unittest
+from runmd.block import Block
+from runmd.report import REPORT_FORMAT_VERSION, RunReport, format_size, usage_fields
+
+class TestRunmdReport(unittest.TestCase):
+
+    def setUp(self):
+        self.report = RunReport("runmd run all")
+        self.block = Block(name='build', tag='ci', file='README.md', lang='bash', line=12)
+        self.usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    # --------------------------------------------------
+    # >> USAGE
+    # --------------------------------------------------
+
+    def test_usage_fields(self):
+        fields = usage_fields(self.usage)
+        self.assertEqual(set(fields), {"user", "system", "max_rss_kb"})
+        self.assertGreater(fields["max_rss_kb"], 0)
+        self.assertEqual(usage_fields(None), {"user": None, "system": None, "max_rss_kb": None})
+
+    def test_format_size(self):
+        self.assertEqual(format_size(None), "-")
+        self.assertEqual(format_size(512), "512 KiB")
+        self.assertEqual(format_size(2048), "2.0 MiB")
+        self.assertEqual(format_size(3 << 20), "3.00 GiB")
+
+    # --------------------------------------------------
+    # >> RUN_REPORT
+    # --------------------------------------------------
+
+    def test_record(self):
+        self.report.record(self.block, "OK", 0, 1.5, self.usage)
+        self.report.record(self.block, "OK", 0, 0.001, cached=True)
+        first, second = self.report.blocks
+        self.assertEqual(first["name"], "build")
+        self.assertEqual(first["file"], "README.md")
+        self.assertEqual(first["line"], 12)
+        self.assertEqual(first["wall"], 1.5)
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertIsNone(second["max_rss_kb"])
+
+    def test_write(self):
+        self.report.record(self.block, "FAILED", 1, 0.5, self.usage)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "run.json")
+            self.report.write(path, False)
+            with open(path) as freport:
+                data = json.load(freport)
+        self.assertEqual(data["version"], REPORT_FORMAT_VERSION)
+        self.assertEqual(data["command"], "runmd run all")
+        self.assertFalse(data["success"])
+        self.assertEqual(data["blocks"][0]["status"], "FAILED")
+        self.assertEqual(data["blocks"][0]["returncode"], 1)
+
+    def test_print_summary(self):
+        self.report.record(self.block, "OK", 0, 0.25, self.usage)
+        self.report.record(Block(name='cached_step', lang='bash'), "OK", 0, 0.0, cached=True)
+        out = io.StringIO()
+        self.report.print_summary(out)
+        lines = out.getvalue().strip().splitlines()
+        self.assertEqual(lines[0].split(), ["BLOCK", "STATUS", "EXIT", "WALL", "USER", "SYS", "MAX", "RSS"])
+        self.assertTrue(lines[1].startswith("build "))
+        self.assertIn("0.25s", lines[1])
+        self.assertIn("OK (cached)", lines[2])
+        self.assertTrue(lines[2].endswith("-"))
+
+    def test_print_summary_empty(self):
+        out = io.StringIO()
+        self.report.print_summary(out)
+        self.assertEqual(out.getvalue(), "")
+
+if __name__ == '__main__':
+    unittest.main()
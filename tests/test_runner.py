@@ -1,33 +1,235 @@
 import unittest
+import asyncio
+import io
+import os
 import re
-from runmd.runner import detect_shebang
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from runmd.block import Block
+from runmd.cache import ResultCache
+from runmd.config import LanguageTable
+from runmd.report import RunReport
+from runmd.runner import OutputRelay, arun_code_block, find_interpreter, get_command, run_code_block
+from runmd.workers import WorkerPool
 import configparser
 
 class TestRunmdRunner(unittest.TestCase):
 
     def setUp(self):
         self.config = configparser.ConfigParser()
-
-    # --------------------------------------------------
-    # >> DETECT_SHEBANG
-    # --------------------------------------------------
-
-    def test_detect_shebang(self):
         self.config.add_section('lang.bash')
         self.config.set('lang.bash', 'aliases', 'sh, bash')
         self.config.set('lang.bash', 'command', 'bash')
         self.config.set('lang.bash', 'options', '-c')
+        self.languages = LanguageTable(self.config)
+        find_interpreter.cache_clear()
+
+    # --------------------------------------------------
+    # >> GET_COMMAND
+    # --------------------------------------------------
 
-        code = '#!/bin/bash\necho "toto"'
-        result = detect_shebang(code, "lang.bash", self.config)
+    def test_get_command_shebang(self):
+        block = Block(name='toto', lang='bash', code='#!/bin/bash\necho "toto"', shebang='/bin/bash')
+        with patch('runmd.runner.shutil.which', side_effect=lambda name: name):
+            result = get_command(block, self.languages["bash"])
         self.assertEqual(result, ["/bin/bash"])
 
-    def test_detect_shebang_none(self):
-        self.config.add_section('lang.bash')
-        self.config.set('lang.bash', 'aliases', 'sh, bash')
-        self.config.set('lang.bash', 'command', 'bash')
-        self.config.set('lang.bash', 'options', '-c')
-    
-        code = '#No shebang here\necho "toto"'
-        result = detect_shebang(code, "lang.bash", self.config)
-        self.assertEqual(result, ["bash"])
\ No newline at end of file
+    def test_get_command_shebang_env(self):
+        block = Block(name='toto', lang='bash', code='echo "toto"', shebang='/usr/bin/env bash')
+        with patch('runmd.runner.shutil.which', side_effect=lambda name: name):
+            result = get_command(block, self.languages["bash"])
+        self.assertEqual(result, ["/usr/bin/env", "bash"])
+
+    def test_get_command_none(self):
+        block = Block(name='toto', lang='bash', code='#No shebang here\necho "toto"')
+        with patch('runmd.runner.shutil.which', return_value='/usr/bin/bash') as mock_which:
+            result = get_command(block, self.languages["bash"])
+            get_command(block, self.languages["bash"])
+        self.assertEqual(result, ["/usr/bin/bash"])
+        mock_which.assert_called_once_with('bash')
+
+    def test_get_command_not_found(self):
+        block = Block(name='toto', lang='bash', code='echo "toto"')
+        with patch('runmd.runner.shutil.which', return_value=None):
+            result = get_command(block, self.languages["bash"])
+        self.assertEqual(result, ["bash"])
+
+    # --------------------------------------------------
+    # >> OUTPUT_RELAY
+    # --------------------------------------------------
+
+    def test_output_relay(self):
+        out = io.StringIO()
+        relay = OutputRelay(out)
+        data = "  first\nsecond é\n\n".encode() + b"bad \xff\n"
+        for i in range(len(data)):
+            relay.feed(data[i:i + 1])
+        self.assertEqual(relay.close(), "bad \ufffd")
+        self.assertEqual(out.getvalue(), "  first\nsecond é\n\nbad \ufffd\n")
+
+    def test_output_relay_without_final_newline(self):
+        out = io.StringIO()
+        relay = OutputRelay(out)
+        relay.feed(b"one\ntw")
+        relay.feed(b"o")
+        self.assertEqual(relay.last_line, "one")
+        self.assertEqual(relay.close(), "two")
+        self.assertEqual(out.getvalue(), "one\ntwo\n")
+
+    def test_session_keeps_last_line_of_stdout(self):
+        self.config.add_section('lang.python')
+        self.config.set('lang.python', 'aliases', 'python')
+        self.config.set('lang.python', 'command', sys.executable)
+        self.config.set('lang.python', 'options', '-c')
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        bash = Block(name='streams', lang='bash', code='echo out; sleep 0.1; echo err >&2')
+        python = Block(name='streams', lang='python', code='import sys\nprint("out")\nprint("err", file=sys.stderr)')
+
+        with WorkerPool(config) as pool:
+            runs = [
+                lambda session: run_code_block(bash, config, {}, out=io.StringIO(), session=session),
+                lambda session: asyncio.run(arun_code_block(bash, config, {}, out=io.StringIO(), session=session)),
+                lambda session: run_code_block(python, config, {}, pool, out=io.StringIO(), session=session),
+            ]
+            for run in runs:
+                session = MagicMock()
+                self.assertTrue(run(session))
+                session.set.assert_called_once_with("__", "out")
+
+    # --------------------------------------------------
+    # >> RESULT_CACHE
+    # --------------------------------------------------
+
+    def test_run_code_block_result_cache(self):
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        block = Block(name='hello', lang='bash', code='echo "$RANDOM"; echo done; exit 3', cache=True)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.dict(os.environ, {"XDG_CACHE_HOME": tmpdir}):
+                results = ResultCache()
+                session = MagicMock()
+                first, second = io.StringIO(), io.StringIO()
+                self.assertFalse(run_code_block(block, config, {}, out=first, session=session, results=results))
+                self.assertFalse(run_code_block(block, config, {}, out=second, session=session, results=results))
+
+        self.assertEqual((results.hits, results.misses), (1, 1))
+        self.assertEqual(first.getvalue(), second.getvalue())
+        session.set.assert_called_with("__", "done")
+
+    # --------------------------------------------------
+    # >> RESOURCE_LIMITS
+    # --------------------------------------------------
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "requires /proc")
+    def test_run_code_block_timeout_kills_descendants(self):
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        block = Block(name='hang', lang='bash', code='sleep 30 &\necho $!\nwait', timeout=0.5)
+
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                self.assertFalse(run_code_block(block, config, {}, out=out))
+            finally:
+                os.chdir(cwd)
+
+        self.assertIn("timed out after 0.5s (TIMEOUT)", out.getvalue())
+        pid = int(re.search(r"^(\d+)$", out.getvalue(), re.MULTILINE).group(1))
+        for _ in range(100):
+            try:
+                with open(f"/proc/{pid}/stat") as fstat:
+                    state = fstat.read().rsplit(")", 1)[1].split()[0]
+            except OSError:
+                state = "gone"
+            if state in ("gone", "Z"):
+                break
+            time.sleep(0.01)
+        self.assertIn(state, ("gone", "Z"))
+
+    @unittest.skipUnless(os.name == "posix", "requires POSIX sessions")
+    def test_run_code_block_session(self):
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        code = 'python3 -c "import os; print(os.getsid(0))"'
+        for timeout, same_session in ((None, True), (30, False)):
+            block = Block(name='sid', lang='bash', code=code, timeout=timeout)
+            for engine in ('sync', 'async'):
+                out = io.StringIO()
+                if engine == 'sync':
+                    self.assertTrue(run_code_block(block, config, {}, out=out, session=MagicMock()))
+                else:
+                    self.assertTrue(asyncio.run(arun_code_block(block, config, {}, out=out, session=MagicMock())))
+                sid = int(out.getvalue().split()[-1])
+                self.assertEqual(sid == os.getsid(0), same_session, (timeout, engine))
+
+    def test_run_code_block_exit_code_under_memory_limit(self):
+        self.config.add_section('lang.python')
+        self.config.set('lang.python', 'aliases', 'python')
+        self.config.set('lang.python', 'command', 'python')
+        self.config.set('lang.python', 'options', '-c')
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        for lang, code in (('bash', 'exit 200'), ('python', 'raise SystemExit(137)')):
+            block = Block(name='exits', lang=lang, code=code, max_memory=1 << 30)
+            report = RunReport()
+            out = io.StringIO()
+            self.assertFalse(run_code_block(block, config, {}, out=out, session=MagicMock(), report=report))
+            self.assertEqual(report.blocks[0]["status"], "FAILED")
+            self.assertNotIn("(OOM)", out.getvalue())
+
+    # --------------------------------------------------
+    # >> ASYNC_RUNNER
+    # --------------------------------------------------
+
+    @unittest.skipUnless(hasattr(os, "pidfd_open"), "requires os.pidfd_open")
+    def test_arun_code_block_without_threads(self):
+        self.config.set('lang.bash', 'delivery', 'stdin')
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        # Larger than a pipe buffer, so the input is written while the block runs
+        padding = "#" * 100000 + "\n"
+        blocks = [Block(name=f'b{i}', lang='bash', code=f'{padding}sleep 0.1; echo block {i}') for i in range(8)]
+        outs = [io.StringIO() for _ in blocks]
+
+        async def run_all():
+            return await asyncio.gather(*(
+                arun_code_block(block, config, {}, out=out, session=MagicMock())
+                for block, out in zip(blocks, outs)
+            ))
+
+        with patch('runmd.runner.threading.Thread', wraps=threading.Thread) as thread:
+            self.assertEqual(asyncio.run(run_all()), [True] * 8)
+        thread.assert_not_called()
+        for i, out in enumerate(outs):
+            self.assertIn(f"block {i}", out.getvalue())
+
+    # --------------------------------------------------
+    # >> RUN_REPORT
+    # --------------------------------------------------
+
+    @unittest.skipUnless(hasattr(os, "wait4"), "requires os.wait4")
+    def test_run_code_block_report(self):
+        config = MagicMock()
+        config.languages = LanguageTable(self.config)
+        busy = 'i=0; while [ $i -lt 20000 ]; do i=$((i+1)); done; exit 2'
+        first = Block(name='first', lang='bash', code=busy)
+        second = Block(name='second', lang='bash', code=busy)
+
+        report = RunReport()
+        session = MagicMock()
+        self.assertFalse(run_code_block(first, config, {}, out=io.StringIO(), session=session, report=report))
+        self.assertFalse(asyncio.run(arun_code_block(second, config, {}, out=io.StringIO(), session=session, report=report)))
+
+        self.assertEqual([entry["name"] for entry in report.blocks], ['first', 'second'])
+        for entry in report.blocks:
+            self.assertEqual((entry["status"], entry["returncode"]), ("FAILED", 2))
+            self.assertGreater(entry["user"] + entry["system"], 0)
+            self.assertGreater(entry["max_rss_kb"], 0)
+            self.assertGreater(entry["wall"], 0)
@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+from runmd.block import Block
+from runmd.registry import BlockRegistry
+from runmd.scheduler import BlockGraph
+
+class TestRunmdScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = BlockRegistry([
+            Block(name='fetch', lang='bash', tag='ci'),
+            Block(name='lint', lang='bash', tag='ci'),
+            Block(name='build', lang='bash', tag='ci', depends=('fetch', 'lint')),
+            Block(name='deploy', lang='bash', depends=('build',)),
+            Block(name='docs', lang='bash', tag='ci'),
+        ])
+
+    # --------------------------------------------------
+    # >> BUILD
+    # --------------------------------------------------
+
+    def test_graph_adds_dependencies(self):
+        graph = BlockGraph(self.registry, self.registry.with_name('deploy'))
+        self.assertEqual(graph.nodes, [0, 1, 2, 3])
+        self.assertEqual(graph.dependencies[2], {0, 1})
+
+    def test_unknown_dependency(self):
+        registry = BlockRegistry([Block(name='a', lang='bash', depends=('missing',))])
+        with self.assertRaisesRegex(ValueError, "unknown block 'missing'"):
+            BlockGraph(registry, list(registry))
+
+    def test_cycle(self):
+        registry = BlockRegistry([
+            Block(name='a', lang='bash', depends=('b',)),
+            Block(name='b', lang='bash', depends=('a',)),
+        ])
+        with self.assertRaisesRegex(ValueError, "a -> b -> a"):
+            BlockGraph(registry, list(registry))
+
+    # --------------------------------------------------
+    # >> RUN
+    # --------------------------------------------------
+
+    def test_run_order(self):
+        order = []
+        graph = BlockGraph(self.registry, list(self.registry))
+        self.assertTrue(graph.run(lambda block: order.append(block.name) or True))
+        self.assertEqual(order, ['fetch', 'lint', 'build', 'deploy', 'docs'])
+
+    def test_run_concurrently(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def run_block(block):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return True
+
+        graph = BlockGraph(self.registry, self.registry.with_tag('ci'))
+        self.assertTrue(graph.run(run_block, jobs=3))
+        self.assertEqual(peak[0], 3)
+
+    def test_run_fail_fast(self):
+        order = []
+        graph = BlockGraph(self.registry, list(self.registry))
+        success = graph.run(lambda block: order.append(block.name) or block.name != 'fetch')
+        self.assertFalse(success)
+        self.assertEqual(order, ['fetch'])
+        self.assertEqual([block.name for block in graph.skipped], ['lint', 'build', 'deploy', 'docs'])
+
+    def test_run_keep_going(self):
+        order = []
+        graph = BlockGraph(self.registry, list(self.registry))
+        success = graph.run(lambda block: order.append(block.name) or block.name != 'fetch', keep_going=True)
+        self.assertFalse(success)
+        self.assertEqual(order, ['fetch', 'lint', 'docs'])
+        self.assertEqual([block.name for block in graph.skipped], ['build', 'deploy'])
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from runmd.block import Block
+from runmd.process import parse_files
+from runmd.trace import BlockTrace, Tracer, disable_tracing, enable_tracing, get_tracer, span, timed_call
+
+class TestRunmdTrace(unittest.TestCase):
+
+    def tearDown(self):
+        disable_tracing()
+
+    # --------------------------------------------------
+    # >> TRACER
+    # --------------------------------------------------
+
+    def test_span_disabled(self):
+        self.assertIsNone(get_tracer())
+        with span("nothing"):
+            pass
+        self.assertIsNone(disable_tracing())
+
+    def test_span(self):
+        tracer = enable_tracing()
+        with span("discover files", "discovery", files=2):
+            time.sleep(0.01)
+        event, = tracer.events
+        self.assertEqual((event["name"], event["cat"], event["ph"]), ("discover files", "discovery", "X"))
+        self.assertGreaterEqual(event["dur"], 10000)
+        self.assertEqual(event["args"], {"files": 2})
+        self.assertIs(disable_tracing(), tracer)
+
+    def test_lanes(self):
+        tracer = Tracer()
+        first, second = tracer.acquire_lane(), tracer.acquire_lane()
+        self.assertEqual((first, second), (1, 2))
+        tracer.release_lane(first)
+        self.assertEqual(tracer.acquire_lane(), 1)
+        names = [event["args"]["name"] for event in tracer.to_dict()["traceEvents"] if event["ph"] == "M"]
+        self.assertEqual(names, ["runmd", "main", "block lane 1", "block lane 2"])
+
+    def test_add_call_other_process(self):
+        tracer = Tracer()
+        result, pid, start, end = timed_call(len, "abc")
+        self.assertEqual(tracer.add_call("parse", "parse", (result, pid + 1, start, end)), 3)
+        events = tracer.to_dict()["traceEvents"]
+        self.assertIn({"name": "process_name", "ph": "M", "pid": pid + 1, "tid": pid + 1, "args": {"name": "runmd parser"}}, events)
+        self.assertEqual(events[-1]["pid"], pid + 1)
+
+    def test_block_trace(self):
+        tracer = enable_tracing()
+        block = Block(name='hello', lang='bash', file='README.md', line=3)
+        trace = BlockTrace(block)
+        self.assertEqual(trace.lane, 1)
+        trace.finish("OK", 0, first_output=trace.start + 0.002)
+        first_output, whole = tracer.events
+        self.assertEqual((first_output["name"], first_output["ph"], first_output["tid"]), ("first output", "i", 1))
+        self.assertEqual(whole["name"], "hello")
+        self.assertEqual(whole["args"]["status"], "OK")
+        self.assertAlmostEqual(whole["args"]["time_to_first_output_ms"], 2, places=2)
+        self.assertEqual(tracer.acquire_lane(), 1)
+
+    def test_write_parse_files(self):
+        tracer = enable_tracing()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name in ("a.md", "b.md"):
+                paths.append(os.path.join(tmpdir, name))
+                with open(paths[-1], "w") as fmd:
+                    fmd.write("```bash {name=%s}\necho hi\n```\n" % name[0])
+            results = parse_files(paths, ["bash"], jobs=2)
+            self.assertEqual([blocks[0].name for blocks, _ in results], ["a", "b"])
+
+            trace_path = os.path.join(tmpdir, "trace.json")
+            tracer.write(trace_path)
+            with open(trace_path) as ftrace:
+                events = json.load(ftrace)["traceEvents"]
+        parsed = [event for event in events if event.get("cat") == "parse"]
+        self.assertEqual([event["name"] for event in parsed], [f"parse {path}" for path in paths])
+        self.assertTrue(all(event["pid"] != os.getpid() for event in parsed))
+
+if __name__ == '__main__':
+    unittest.main()
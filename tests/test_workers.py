@@ -0,0 +1,101 @@
+import configparser
+import io
+import os
+import shutil
+import sys
+import unittest
+from unittest.mock import MagicMock
+from runmd.config import LanguageTable
+from runmd.workers import WorkerPool, encode_frame, read_frame
+
+class TestRunmdWorkers(unittest.TestCase):
+
+    def setUp(self):
+        self.config = MagicMock()
+        self.config.config = configparser.ConfigParser()
+        self.config.config.read_dict({
+            'lang.python': {'aliases': 'py, python', 'command': 'python', 'options': '-c'},
+            'lang.bash': {'aliases': 'sh, bash', 'command': 'bash', 'options': '-c'},
+            'lang.javascript': {'aliases': 'js', 'command': 'node', 'options': '-e'},
+        })
+        self.config.languages = LanguageTable(self.config.config)
+
+    # --------------------------------------------------
+    # >> FRAMES
+    # --------------------------------------------------
+
+    def test_frame_round_trip(self):
+        stream = io.BytesIO(encode_frame(b"O", "é\n".encode()) + encode_frame(b"E", b"0"))
+        self.assertEqual(read_frame(stream), (b"O", "é\n".encode()))
+        self.assertEqual(read_frame(stream), (b"E", b"0"))
+        self.assertIsNone(read_frame(stream))
+
+    def test_read_frame_truncated(self):
+        self.assertIsNone(read_frame(io.BytesIO(b"O10\nabc")))
+
+    # --------------------------------------------------
+    # >> WORKER_POOL
+    # --------------------------------------------------
+
+    def test_python_worker(self):
+        with WorkerPool(self.config, max_blocks=2) as pool:
+            worker = pool.acquire('python', [sys.executable])
+            output = b"".join(chunk for _, chunk in worker.execute('import os\nprint(os.environ["FOO"])', {"FOO": "bar"}))
+            self.assertEqual(output, b"bar\n")
+            self.assertEqual(worker.returncode, 0)
+
+            # A busy worker is not shared
+            other = pool.acquire('python', [sys.executable])
+            self.assertIsNot(other, worker)
+            pool.release('python', other)
+
+            pool.release('python', worker)
+            self.assertIs(pool.acquire('python', [sys.executable]), worker)
+            list(worker.execute('import sys\nsys.exit(3)', {}))
+            self.assertEqual(worker.returncode, 3)
+            pool.release('python', worker)
+
+            # Recycled after max_blocks
+            self.assertIsNot(pool.acquire('python', [sys.executable]), worker)
+            self.assertFalse(worker.alive)
+
+    def test_worker_streams(self):
+        with WorkerPool(self.config) as pool:
+            worker = pool.acquire('python', [sys.executable])
+            code = 'import sys\nprint("a", end="")\nprint("b", file=sys.stderr)\nsys.stdout.buffer.write(b"c\\n")'
+            self.assertEqual(list(worker.execute(code, {})), [(1, b"a"), (2, b"b\n"), (1, b"c\n")])
+
+    def test_python_worker_error(self):
+        with WorkerPool(self.config) as pool:
+            worker = pool.acquire('python', [sys.executable])
+            output = b"".join(chunk for _, chunk in worker.execute('raise ValueError("boom")', {}))
+            self.assertIn(b"ValueError: boom", output)
+            self.assertEqual(worker.returncode, 1)
+
+            list(worker.execute('import os\nos._exit(4)', {}))
+            self.assertEqual(worker.returncode, 4)
+            self.assertFalse(worker.alive)
+
+    def test_python_worker_isolation(self):
+        with WorkerPool(self.config) as pool:
+            worker = pool.acquire('python', [sys.executable])
+            output = b"".join(chunk for _, chunk in worker.execute('import os, sys\nprint(repr(sys.stdin.read()))\nos.chdir("/")', {}))
+            self.assertEqual(output, b"''\n")
+            output = b"".join(chunk for _, chunk in worker.execute('import os\nprint(os.getcwd())', {}))
+            self.assertEqual(output.decode().strip(), os.getcwd())
+            self.assertEqual(worker.returncode, 0)
+
+    @unittest.skipUnless(shutil.which('node'), "requires node")
+    def test_node_worker_isolation(self):
+        with WorkerPool(self.config) as pool:
+            worker = pool.acquire('javascript', ['node'])
+            code = 'let data = ""; for await (const chunk of process.stdin) data += chunk;\nconsole.log(JSON.stringify(data)); process.chdir("/");'
+            output = b"".join(chunk for _, chunk in worker.execute(code, {}))
+            self.assertEqual(output, b'""\n')
+            output = b"".join(chunk for _, chunk in worker.execute('console.log(process.cwd())', {}))
+            self.assertEqual(output.decode().strip(), os.getcwd())
+            self.assertEqual(worker.returncode, 0)
+
+    def test_no_worker_for_language(self):
+        with WorkerPool(self.config) as pool:
+            self.assertIsNone(pool.acquire('bash', ['bash']))